@@ -13,6 +13,7 @@ from .scoring import *
 from .training import *
 from .lr_scheduler import *
 
-__all__ = ['Callback', 'EpochTimer', 'PrintLog', 'ProgressBar',
-           'LRScheduler', 'WarmRestartLR', 'CyclicLR', 'GradientNormClipping',
-           'BatchScoring', 'EpochScoring', 'Checkpoint']
+__all__ = ['Callback', 'BatchRetention', 'EpochTimer', 'HistoryLogger',
+           'PrintLog', 'ProgressBar', 'LRScheduler', 'WarmRestartLR',
+           'CyclicLR', 'GradientNormClipping', 'BatchScoring',
+           'EpochScoring', 'PassthroughScoring', 'Checkpoint']
@@ -12,9 +12,12 @@ from tabulate import tabulate
 from skorch.utils import Ansi
 from skorch.dataset import get_len
 from skorch.callbacks import Callback
+from skorch.callbacks.scoring import get_async_scorings
+from skorch.callbacks.scoring import wait_for_scores
 
 
-__all__ = ['EpochTimer', 'PrintLog', 'ProgressBar']
+__all__ = ['BatchRetention', 'EpochTimer', 'HistoryLogger', 'PrintLog',
+           'ProgressBar']
 
 
 class EpochTimer(Callback):
@@ -50,6 +53,11 @@ class PrintLog(Callback):
     of columns varies between epochs, e.g. if the valid loss is only
     present on every other epoch.
 
+    If scores are computed by asynchronous ``EpochScoring`` callbacks,
+    the row of an epoch is printed once all of its scores are
+    recorded. Rows are always printed in order, the remaining ones at
+    the end of training.
+
     Parameters
     ----------
     keys_ignored : str or list of str (default='batches')
@@ -87,6 +95,8 @@ class PrintLog(Callback):
 
     def initialize(self):
         self.first_iteration_ = True
+        self.async_scorings_ = []
+        self.epochs_to_print_ = []
         return self
 
     def format_row(self, row, key, color):
@@ -158,10 +168,31 @@ class PrintLog(Callback):
         if (self.sink is not print) or verbose:
             self.sink(text)
 
+    # pylint: disable=unused-argument
+    def on_train_begin(self, net, **kwargs):
+        self.async_scorings_ = get_async_scorings(net)
+
     # pylint: disable=unused-argument
     def on_epoch_end(self, net, **kwargs):
-        data = net.history[-1]
-        verbose = net.verbose
+        self.epochs_to_print_.append(len(net.history) - 1)
+        self._print_completed_epochs(net)
+
+    # pylint: disable=unused-argument
+    def on_train_end(self, net, **kwargs):
+        for cb in self.async_scorings_:
+            cb.wait(net)
+        self._print_completed_epochs(net)
+
+    def _print_completed_epochs(self, net):
+        while self.epochs_to_print_:
+            idx = self.epochs_to_print_[0]
+            if any(cb.has_pending(net, epoch=idx + 1)
+                   for cb in self.async_scorings_):
+                break
+            del self.epochs_to_print_[0]
+            self._print_row(net.history[idx], net.verbose)
+
+    def _print_row(self, data, verbose):
         tabulated = self.table(data)
 
         if self.first_iteration_:
@@ -276,3 +307,112 @@ class ProgressBar(Callback):
         if self.batches_per_epoch == 'count':
             self.batches_per_epoch = self.pbar.n
         self.pbar.close()
+
+
+class HistoryLogger(Callback):
+    """Streams the net's history to an append-only log file, with
+    one JSON document per epoch, and optionally keeps only the most
+    recent epochs in memory.
+
+    Each epoch, including its batches, is written once it is
+    completed, i.e. when the next epoch starts or the training ends.
+    Older epochs are read back from the log lazily when they are
+    accessed through ``net.history``. Thus memory usage stays constant
+    even for very long training runs, and a crashed training can be
+    recovered from the log using
+    :meth:`~skorch.history.History.from_log`.
+
+    All values recorded in the history must be JSON encodable (numpy
+    scalars and arrays are converted).
+
+    Scores of asynchronous ``EpochScoring`` callbacks that are
+    recorded after their epoch was written are only kept in memory,
+    except for those of the last epoch, which are waited for at the
+    end of training.
+
+    Examples
+    --------
+    >>> net = NeuralNet(..., callbacks=[HistoryLogger('history.jsonl',
+    ...                                               keep_last=10)])
+    >>> net.fit(X, y)
+    >>> history = History.from_log('history.jsonl')
+
+    Parameters
+    ----------
+    f : str or pathlib.Path
+      Path of the log file. If the file already exists, epochs are
+      appended to it.
+
+    keep_last : int or None (default=None)
+      Number of most recent epochs that are kept in memory. If None,
+      all epochs are kept in memory and only written to the log.
+
+    """
+    def __init__(self, f, keep_last=None):
+        self.f = f
+        self.keep_last = keep_last
+
+    # pylint: disable=unused-argument
+    def on_train_begin(self, net, **kwargs):
+        net.history.log_to(self.f, keep_last=self.keep_last)
+
+    # pylint: disable=unused-argument
+    def on_train_end(self, net, **kwargs):
+        # write the scores that are still computed in the background
+        wait_for_scores(net)
+        net.history.flush()
+
+
+class BatchRetention(Callback):
+    """Determines which batch rows of the net's history are kept once
+    an epoch is completed.
+
+    Callbacks still have access to all batch rows of the current epoch;
+    the policy is applied when the next epoch starts and, for the last
+    epoch, when the training ends. This keeps the history small for
+    long training runs, which in turn shrinks pickled nets and the
+    output of ``save_history``. See
+    :meth:`~skorch.history.History.retain_batches` for details.
+
+    Examples
+    --------
+    >>> # keep every 10th batch row
+    >>> net = NeuralNet(..., callbacks=[BatchRetention('every', every=10)])
+    >>> # only keep summary statistics of the batch values
+    >>> net = NeuralNet(..., callbacks=[BatchRetention('summary')])
+
+    Parameters
+    ----------
+    policy : str (default='all')
+      One of 'all', 'every', 'reservoir' or 'summary'.
+
+    every : int or None (default=None)
+      Keep every n-th batch row for policy 'every'.
+
+    size : int or None (default=None)
+      Number of randomly sampled batch rows to keep for policy
+      'reservoir'.
+
+    random_state : int, RandomState instance or None (default=None)
+      Random state used for policy 'reservoir'.
+
+    """
+    def __init__(self, policy='all', every=None, size=None,
+                 random_state=None):
+        self.policy = policy
+        self.every = every
+        self.size = size
+        self.random_state = random_state
+
+    # pylint: disable=unused-argument
+    def on_train_begin(self, net, **kwargs):
+        net.history.retain_batches(
+            policy=self.policy,
+            every=self.every,
+            size=self.size,
+            random_state=self.random_state,
+        )
+
+    # pylint: disable=unused-argument
+    def on_train_end(self, net, **kwargs):
+        net.history.flush()
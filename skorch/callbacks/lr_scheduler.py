@@ -91,12 +91,19 @@ class LRScheduler(Callback):
             scheduler_kwargs['last_batch_idx'] = last_batch_idx
         return policy(net.optimizer_, **scheduler_kwargs)
 
+    @staticmethod
+    def _get_batch_cnt(epoch):
+        # batch rows may have been dropped, see History.retain_batches
+        if 'n_batches' in epoch:
+            return epoch['n_batches']
+        return len(epoch['batches'])
+
     def _get_batch_idx(self, net):
         if not net.history:
             return -1
         epoch = len(net.history) - 1
-        current_batch_idx = len(net.history[-1, 'batches']) - 1
-        batch_cnt = len(net.history[-2, 'batches']) if epoch >= 1 else 0
+        current_batch_idx = self._get_batch_cnt(net.history[-1]) - 1
+        batch_cnt = self._get_batch_cnt(net.history[-2]) if epoch >= 1 else 0
         return epoch * batch_cnt + current_batch_idx
 
 
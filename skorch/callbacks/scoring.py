@@ -1,41 +1,157 @@
 """ Callbacks for calculating scores."""
 
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from copy import deepcopy
 from functools import partial
+from numbers import Integral
+from numbers import Real
+import warnings
 
 import numpy as np
+import torch
 from sklearn.metrics.scorer import (
     check_scoring, _BaseScorer, make_scorer)
 from sklearn.model_selection._validation import _score
+from sklearn.utils import check_random_state
 
 from skorch.utils import data_from_dataset
 from skorch.utils import is_skorch_dataset
+from skorch.utils import select_outputs
+from skorch.utils import to_device
 from skorch.utils import to_numpy
 from skorch.callbacks import Callback
 from skorch.dataset import Dataset
+from skorch.dataset import get_len
+from skorch.history import BatchColumns
+from skorch.history import LoggedEpoch
+from skorch.metrics import StreamingMetric
+from skorch.metrics import get_metric
 
-__all__ = ['BatchScoring', 'EpochScoring']
+__all__ = ['BatchScoring', 'EpochScoring', 'PassthroughScoring']
+
+
+def _forward_iter_cached(y_preds, device='cpu', outputs=None, reducer=None):
+    for yp in y_preds:
+        yield to_device(select_outputs(yp, outputs, reducer), device)
+
+
+def _shallow_copy(net):
+    """Return a copy of the net that shares all attributes with it;
+    ``copy.copy`` would copy the module through pickling."""
+    net_copy = type(net).__new__(type(net))
+    net_copy.__dict__.update(net.__dict__)
+    return net_copy
 
 
 @contextmanager
-def cache_net_infer(net, use_caching, y_preds):
+def cache_net_infer(net, use_caching, y_preds, y_preds_concat=None):
     """Caching context for ``skorch.NeuralNet`` instance. Returns
-    a modified version of the net whose ``infer`` method will
-    subsequently return cached predictions. Leaving the context
-    will undo the overwrite of the ``infer`` method."""
+    a shallow copy of the net whose ``infer`` and ``forward_iter``
+    methods return cached predictions. Overwriting ``forward_iter``
+    means that predicting with the copy, e.g. through
+    ``net.predict``, doesn't iterate over the data again. If
+    ``y_preds_concat`` is given, ``forward_iter`` yields it as a
+    single batch instead of yielding the batches in ``y_preds``.
+
+    The net itself is not modified, so that it can be used
+    concurrently, e.g. from other threads, while the context is
+    active."""
     if not use_caching:
         yield net
         return
-    y_preds = iter(y_preds)
-    net.infer = lambda *a, **kw: next(y_preds)
+    cached_net = _shallow_copy(net)
+    y_preds_iter = iter(y_preds)
+    cached_net.infer = lambda *a, **kw: next(y_preds_iter)
+    y_preds_forward = y_preds if y_preds_concat is None else [y_preds_concat]
+    # pylint: disable=unused-argument
+    cached_net.forward_iter = (
+        lambda X, training=False, device='cpu', outputs=None, reducer=None:
+        _forward_iter_cached(y_preds_forward, device, outputs, reducer))
+    yield cached_net
+
+
+def _concatenate_tensors(batches):
+    """Concatenate tensors of the same shape except for the first
+    dimension into a buffer on the CPU that is allocated once."""
+    first = batches[0]
+    n = sum(len(batch) for batch in batches)
+    out = torch.empty((n,) + tuple(first.shape[1:]), dtype=first.dtype)
+    start = 0
+    for batch in batches:
+        out[start:start + len(batch)].copy_(batch.detach())
+        start += len(batch)
+    return out
+
+
+class _PredictionStore:
+    """Targets and predictions of one epoch, collected once and shared
+    by all caching ``EpochScoring`` callbacks of a net that score the
+    same data.
+
+    Each batch is only stored once, no matter how many callbacks add
+    it. The targets are converted once per target extractor and the
+    predictions are concatenated once, when first requested.
 
-    try:
-        yield net
-    finally:
-        # By setting net.infer we define an attribute `infer`
-        # that precedes the bound method `infer`. By deleting
-        # the entry from the attribute dict we undo this.
-        del net.__dict__['infer']
+    """
+    def __init__(self):
+        self.y_trues = []
+        self.y_preds = []
+        self.clear()
+
+    def clear(self):
+        # clear in place, callbacks may hold references to the lists
+        del self.y_trues[:]
+        del self.y_preds[:]
+        self._y_trues_extracted = {}
+        self._y_preds_concat = None
+
+    def add(self, y, y_pred, y_is_placeholder):
+        if self.y_preds and self.y_preds[-1] is y_pred:
+            # already added by another callback
+            return
+        if not y_is_placeholder:
+            self.y_trues.append(y)
+        self.y_preds.append(y_pred)
+
+    def get_y_true(self, target_extractor):
+        """Return the concatenated targets after applying
+        ``target_extractor`` to each batch, or None if there are no
+        targets."""
+        y_true = self._y_trues_extracted.get(target_extractor)
+        if y_true is None and self.y_trues:
+            y_true = np.concatenate(
+                [target_extractor(y) for y in self.y_trues])
+            self._y_trues_extracted[target_extractor] = y_true
+        return y_true
+
+    def get_y_pred(self):
+        """Return the concatenated predictions, a tensor or a tuple of
+        tensors, or None if they cannot be concatenated."""
+        if self._y_preds_concat is None and self.y_preds:
+            first = self.y_preds[0]
+            if isinstance(first, tuple):
+                outputs = list(zip(*self.y_preds))
+            else:
+                outputs = [self.y_preds]
+            if not all(isinstance(batch, torch.Tensor) and batch.dim()
+                       for output in outputs for batch in output):
+                return None
+            y_pred = tuple(_concatenate_tensors(list(output))
+                           for output in outputs)
+            self._y_preds_concat = (
+                y_pred if isinstance(first, tuple) else y_pred[0])
+        return self._y_preds_concat
+
+
+def _get_prediction_store(net, on_train):
+    """Return the prediction store of ``net`` for the training or
+    validation data; it is created on first use."""
+    stores = net.__dict__.setdefault('_prediction_stores', {})
+    store = stores.get(on_train)
+    if store is None:
+        store = stores[on_train] = _PredictionStore()
+    return store
 
 
 def convert_sklearn_metric_function(scoring):
@@ -53,6 +169,21 @@ def convert_sklearn_metric_function(scoring):
     return scoring
 
 
+def _get_avg_batch_score(history, name, on_train):
+    """Average of the batch values of ``name`` in the last epoch,
+    weighted by the batch sizes."""
+    bs_key = 'train_batch_size' if on_train else 'valid_batch_size'
+
+    batches = history[-1, 'batches']
+    if isinstance(batches, BatchColumns):
+        # running sums are maintained by the history
+        return batches.weighted_average(name, bs_key)
+
+    weights, scores = list(zip(
+        *history[-1, 'batches', :, [bs_key, name]]))
+    return np.average(scores, weights=weights)
+
+
 class ScoringBase(Callback):
     """Base class for scoring.
 
@@ -85,14 +216,51 @@ class ScoringBase(Callback):
             return self.scoring_.func.__name__
         if isinstance(self.scoring_, _BaseScorer):
             return self.scoring_._score_func.__name__
+        if isinstance(self.scoring_, StreamingMetric):
+            return self.scoring_.name or type(self.scoring_).__name__
         return self.scoring_.__name__
 
     def initialize(self):
         self.best_score_ = np.inf if self.lower_is_better else -np.inf
         self.scoring_ = convert_sklearn_metric_function(self.scoring)
         self.name_ = self._get_name()
+        if self._is_streaming():
+            # don't change the state of the metric passed by the user
+            self.scoring_ = deepcopy(self.scoring_)
         return self
 
+    def _is_streaming(self):
+        return isinstance(self.scoring_, StreamingMetric)
+
+    def _get_metric(self, net):
+        """Return the streaming metric that replaces the sklearn scorer
+        given by name, or None if there is none."""
+        if not (isinstance(self.scoring, str) and self.use_caching):
+            return None
+
+        # pylint: disable=cyclic-import
+        from skorch.net import NeuralNetClassifier
+        from skorch.net import NeuralNetRegressor
+
+        if isinstance(net, NeuralNetClassifier):
+            return get_metric(self.scoring, 'classification')
+        if isinstance(net, NeuralNetRegressor):
+            return get_metric(self.scoring, 'regression')
+        return None
+
+    # pylint: disable=unused-argument
+    def on_train_begin(self, net, **kwargs):
+        metric = self._get_metric(net)
+        if metric is not None:
+            self.scoring_ = metric
+
+    def _update_metric(self, X, y, y_pred):
+        """Update the streaming metric with a batch; the prediction
+        stays on its device."""
+        if isinstance(y_pred, tuple):
+            y_pred = y_pred[0]
+        self.scoring_.update(self.target_extractor(y), y_pred)
+
     def _scoring(self, net, X_test, y_test):
         """Resolve scoring and apply it to data. Use cached prediction
         instead of running inference again, if available."""
@@ -133,12 +301,15 @@ class BatchScoring(ScoringBase):
 
     Parameters
     ----------
-    scoring : None, str, or callable
+    scoring : None, str, callable, or StreamingMetric
       If None, use the ``score`` method of the model. If str, it should
       be a valid sklearn metric (e.g. "f1_score", "accuracy_score"). If
       a callable, it should have the signature (model, X, y), and it
       should return a scalar. This works analogously to the ``scoring``
-      parameter in sklearn's ``GridSearchCV`` et al.
+      parameter in sklearn's ``GridSearchCV`` et al. If an instance of
+      :class:`~skorch.metrics.StreamingMetric`, it is computed on the
+      module's output of each batch. Some scorers given by name are
+      replaced by streaming metrics as well (see ``EpochScoring``).
 
     lower_is_better : bool (default=True)
       Whether lower (e.g. log loss) or higher (e.g. accuracy) scores
@@ -164,6 +335,12 @@ class BatchScoring(ScoringBase):
         if training != self.on_train:
             return
 
+        if self._is_streaming():
+            self.scoring_.reset()
+            self._update_metric(X, y, kwargs['y_pred'])
+            net.history.record_batch(self.name_, self.scoring_.compute())
+            return
+
         y_preds = [kwargs['y_pred']]
         with cache_net_infer(net, self.use_caching, y_preds) as cached_net:
             y = self.target_extractor(y)
@@ -174,15 +351,7 @@ class BatchScoring(ScoringBase):
                 pass
 
     def get_avg_score(self, history):
-        if self.on_train:
-            bs_key = 'train_batch_size'
-        else:
-            bs_key = 'valid_batch_size'
-
-        weights, scores = list(zip(
-            *history[-1, 'batches', :, [bs_key, self.name_]]))
-        score_avg = np.average(scores, weights=weights)
-        return score_avg
+        return _get_avg_batch_score(history, self.name_, self.on_train)
 
     # pylint: disable=unused-argument
     def on_epoch_end(self, net, **kwargs):
@@ -238,14 +407,67 @@ class EpochScoring(ScoringBase):
         >>> ds = torchvision.datasets.MNIST(root=mnist_path)
         >>> net.fit(ds)
 
+    Instead of a scorer, you may pass a streaming metric from
+    :mod:`skorch.metrics`. It is updated with the targets and the
+    module's output after each batch and only keeps a small summary
+    of the predictions, so that the score is computed in constant
+    memory instead of caching all predictions of the epoch:
+
+        >>> from skorch.metrics import Accuracy
+        >>> net = MyNet(callbacks=[
+        ...     EpochScoring(Accuracy(), lower_is_better=False)])
+
+    The scorers 'accuracy', 'top_k_accuracy', 'roc_auc', 'f1',
+    'precision' and 'recall' (with or without the suffixes '_micro',
+    '_macro' and '_weighted') of a ``NeuralNetClassifier`` and 'r2' of
+    a ``NeuralNetRegressor`` are automatically replaced by the
+    corresponding streaming metric if ``use_caching=True`` (see
+    :func:`skorch.metrics.get_metric`). These metrics are computed with
+    torch on the device of the module's output, so that the
+    predictions are neither cached nor copied to the host. The module
+    should return probabilities for 'roc_auc'. To use the sklearn
+    scorer instead, pass the metric function, e.g.
+    ``sklearn.metrics.accuracy_score``.
+
+    Scores that take longer to compute than an epoch, e.g. bootstrap
+    confidence intervals, can be computed in a background thread by
+    setting ``asynchronous=True``. The cached targets and predictions
+    of the epoch are handed to the thread, training continues, and the
+    score is recorded in the history row of its epoch once it is done.
+    Callbacks that depend on the score have to wait for it:
+    ``Checkpoint`` waits if it monitors the score, ``PrintLog`` prints
+    the rows of epochs with pending scores as soon as they are
+    complete, and all pending scores are recorded at the end of
+    training. In your own callbacks, use :func:`wait_for_scores`.
+    Note that the scoring function is called with a copy of the net
+    whose history and module keep changing while the score is
+    computed, so it should only predict with the net.
+
+    Scoring on the training data is about as expensive as a training
+    epoch. If an estimate is good enough for monitoring, set
+    ``max_samples`` to score only a random sample of the training
+    data. With ``use_caching=True``, a uniform sample of the
+    predictions is drawn while they stream by (reservoir sampling),
+    so that only ``max_samples`` predictions are kept in memory; the
+    sample changes from epoch to epoch. Note that the scoring function
+    still receives the whole training dataset as ``X``, but predicting
+    with the net returns the predictions of the sampled rows. With
+    ``use_caching=False``, the same subset of the training data is
+    scored in each epoch, so that only ``max_samples`` samples are
+    predicted. Pass an int as ``random_state`` for reproducible
+    samples.
+
     Parameters
     ----------
-    scoring : None, str, or callable (default=None)
+    scoring : None, str, callable, or StreamingMetric (default=None)
       If None, use the ``score`` method of the model. If str, it
       should be a valid sklearn scorer (e.g. "f1", "accuracy"). If a
       callable, it should have the signature (model, X, y), and it
       should return a scalar. This works analogously to the
-      ``scoring`` parameter in sklearn's ``GridSearchCV`` et al.
+      ``scoring`` parameter in sklearn's ``GridSearchCV`` et al. If
+      an instance of :class:`~skorch.metrics.StreamingMetric`, it is
+      updated after each batch (see above); ``use_caching`` has no
+      effect in that case.
 
     lower_is_better : bool (default=True)
       Whether lower scores should be considered better or worse.
@@ -270,16 +492,104 @@ class EpochScoring(ScoringBase):
       don't know how to extract ``y_true`` from an arbitrary
       dataset).
 
+    asynchronous : bool (default=False)
+      Compute the score in a background thread (see above). Requires
+      ``use_caching=True``; has no effect for streaming metrics.
+
+    max_samples : None, int, or float (default=None)
+      If not None, only score a random sample of this many training
+      samples, or of this fraction of the training samples if a float
+      (see above). Requires ``on_train=True``; has no effect for
+      streaming metrics, which don't store predictions anyway.
+
+    random_state : int, RandomState instance or None (default=None)
+      Random state used to draw the samples for ``max_samples``.
+
+    Attributes
+    ----------
+    pending_ : list of (int, Future) tuples
+      Epochs and background jobs of the scores that were not recorded
+      yet.
+
+    sample_indices_ : None or numpy.ndarray
+      The indices of the training samples that are scored if
+      ``max_samples`` is set and ``use_caching=False``.
+
     """
+    def __init__(
+            self,
+            scoring,
+            lower_is_better=True,
+            on_train=False,
+            name=None,
+            target_extractor=to_numpy,
+            use_caching=True,
+            asynchronous=False,
+            max_samples=None,
+            random_state=None,
+    ):
+        super().__init__(
+            scoring,
+            lower_is_better=lower_is_better,
+            on_train=on_train,
+            name=name,
+            target_extractor=target_extractor,
+            use_caching=use_caching,
+        )
+        self.asynchronous = asynchronous
+        self.max_samples = max_samples
+        self.random_state = random_state
+
     def _initialize_cache(self):
         self.y_trues_ = []
         self.y_preds_ = []
+        self.n_samples_cached_ = 0
+        self.sample_size_ = None
+        self.y_true_sample_ = None
+        self.y_pred_sample_ = None
+
+    def _check_max_samples(self):
+        max_samples = self.max_samples
+        if max_samples is None:
+            return
+        if not self.on_train:
+            raise ValueError("max_samples requires on_train=True.")
+        if isinstance(max_samples, Integral):
+            valid = max_samples > 0
+        elif isinstance(max_samples, Real):
+            valid = 0 < max_samples <= 1
+        else:
+            valid = False
+        if not valid:
+            raise ValueError(
+                "max_samples should be a positive int or a float in "
+                "(0, 1], got {!r} instead.".format(max_samples))
 
     def initialize(self):
+        if self.asynchronous and not self.use_caching:
+            raise ValueError(
+                "Asynchronous scoring requires use_caching=True.")
+        self._check_max_samples()
         super().initialize()
         self._initialize_cache()
+        self.executor_ = None
+        self.pending_ = []
+        self.rng_ = check_random_state(self.random_state)
+        self.sample_indices_ = None
         return self
 
+    def _get_sample_size(self, dataset):
+        """Return the number of samples to score, or None if the
+        whole dataset is scored."""
+        if self.max_samples is None or dataset is None:
+            return None
+        n = len(dataset)
+        if isinstance(self.max_samples, Integral):
+            size = self.max_samples
+        else:
+            size = max(int(self.max_samples * n), 1)
+        return size if size < n else None
+
     # pylint: disable=arguments-differ
     def on_epoch_begin(self, net, dataset_train, dataset_valid, **kwargs):
         self._initialize_cache()
@@ -288,21 +598,115 @@ class EpochScoring(ScoringBase):
         # pylint: disable=attribute-defined-outside-init
         self.y_is_placeholder_ = isinstance(ds, Dataset) and ds.y is None
 
+        if self._is_streaming():
+            if self.y_is_placeholder_ and ds is not None:
+                raise ValueError(
+                    "Streaming metrics require a target, but y is None.")
+            self.scoring_.reset()
+            return
+
+        self.sample_size_ = self._get_sample_size(ds)
+        if self.use_caching and self.sample_size_ is None:
+            store = _get_prediction_store(net, self.on_train)
+            store.clear()
+            self.y_trues_, self.y_preds_ = store.y_trues, store.y_preds
+
+    def _update_metric(self, X, y, y_pred):
+        super()._update_metric(X, y, y_pred)
+        self.n_samples_cached_ += get_len(X)
+
     # pylint: disable=arguments-differ
-    def on_batch_end(self, net, y, y_pred, training, **kwargs):
-        if not self.use_caching or training != self.on_train:
+    def on_batch_end(self, net, X, y, y_pred, training, **kwargs):
+        if training != self.on_train:
+            return
+        if self._is_streaming():
+            self._update_metric(X, y, y_pred)
+            return
+        if not self.use_caching:
+            return
+        if self.sample_size_ is not None:
+            self._sample_batch(y, y_pred)
+            self.n_samples_cached_ += get_len(X)
             return
 
         # We collect references to the prediction and target data
-        # emitted by the training process. Since we don't copy the
-        # data, all *Scoring callback instances use the same
-        # underlying data. This is also the reason why we don't run
+        # emitted by the training process in a store that is shared
+        # by all EpochScoring instances of the net, each batch is
+        # only added once. This is also the reason why we don't run
         # self.target_extractor(y) here but on epoch end, so that
         # there are no copies of parts of y hanging around during
         # training.
+        store = _get_prediction_store(net, self.on_train)
+        store.add(y, y_pred, self.y_is_placeholder_)
+        self.n_samples_cached_ += get_len(X)
+
+    def _sample_batch(self, y, y_pred):
+        """Update the reservoir sample of targets and predictions with
+        the rows of a batch."""
+        outputs = y_pred if isinstance(y_pred, tuple) else (y_pred,)
+        if not all(isinstance(yp, torch.Tensor) and yp.dim()
+                   for yp in outputs):
+            raise TypeError(
+                "max_samples with use_caching=True requires the module "
+                "to return tensors or tuples of tensors.")
+
+        size = self.sample_size_
+        n_batch = len(outputs[0])
+        # Algorithm R: the t-th sample replaces a random slot of the
+        # reservoir with probability size / (t + 1). Samples that go
+        # to the same slot in one batch are resolved in favor of the
+        # last one, as if they were processed one by one.
+        positions = np.arange(
+            self.n_samples_cached_, self.n_samples_cached_ + n_batch)
+        slots = np.where(
+            positions < size,
+            positions,
+            (self.rng_.random_sample(n_batch) * (positions + 1)).astype(int),
+        )
+        rows = np.flatnonzero(slots < size)
+        slots = slots[rows]
+        _, last = np.unique(slots[::-1], return_index=True)
+        rows = rows[len(rows) - 1 - last]
+        slots = slots[len(slots) - 1 - last]
+        if not len(rows):
+            return
+
         if not self.y_is_placeholder_:
-            self.y_trues_.append(y)
-        self.y_preds_.append(y_pred)
+            y_true = np.asarray(self.target_extractor(y))
+            if self.y_true_sample_ is None:
+                self.y_true_sample_ = np.empty(
+                    (size,) + y_true.shape[1:], dtype=y_true.dtype)
+            self.y_true_sample_[slots] = y_true[rows]
+
+        if self.y_pred_sample_ is None:
+            buffers = tuple(
+                torch.empty((size,) + tuple(yp.shape[1:]),
+                            dtype=yp.dtype, device=yp.device)
+                for yp in outputs)
+            self.y_pred_sample_ = (
+                buffers if isinstance(y_pred, tuple) else buffers[0])
+        buffers = self.y_pred_sample_
+        if not isinstance(buffers, tuple):
+            buffers = (buffers,)
+        for buffer, yp in zip(buffers, outputs):
+            buffer[torch.as_tensor(slots, device=yp.device)] = (
+                yp.detach()[torch.as_tensor(rows, device=yp.device)])
+
+    def _get_subsample(self, dataset):
+        """Return the fixed random subset of ``dataset`` that is
+        scored; it is only drawn again if the size of the dataset
+        changes."""
+        n = len(dataset)
+        indices = self.sample_indices_
+        if (
+                indices is None or
+                len(indices) != self.sample_size_ or
+                indices[-1] >= n
+        ):
+            indices = np.sort(self.rng_.choice(
+                n, self.sample_size_, replace=False))
+            self.sample_indices_ = indices
+        return torch.utils.data.Subset(dataset, indices)
 
     # pylint: disable=unused-argument,arguments-differ
     def on_epoch_end(
@@ -313,20 +717,45 @@ class EpochScoring(ScoringBase):
             **kwargs):
 
         dataset = dataset_train if self.on_train else dataset_valid
+        self._record_finished(net)
 
-        if self.use_caching:
+        if self._is_streaming():
+            self._on_epoch_end_streaming(net, dataset)
+            return
+
+        if self.use_caching and self.sample_size_ is not None:
+            if self.n_samples_cached_ < len(dataset):
+                # training phase was cut short, see below
+                return
+            X_test = dataset
+            y_pred_concat = self.y_pred_sample_
+            y_pred = [y_pred_concat]
+            y_test = self.y_true_sample_
+        elif self.use_caching:
+            if (
+                    self.on_train and
+                    dataset is not None and
+                    self.n_samples_cached_ < len(dataset)
+            ):
+                # The training phase was cut short, e.g. because the
+                # training budget was exhausted; there are not enough
+                # cached predictions to score the whole dataset.
+                return
             X_test = dataset
-            y_pred = self.y_preds_
-            y_test = [self.target_extractor(y) for y in self.y_trues_]
+            store = _get_prediction_store(net, self.on_train)
+            y_pred = store.y_preds
+            y_pred_concat = store.get_y_pred()
             # In case of y=None we will not have gathered any samples.
             # We expect the scoring function to deal with y_test=None.
-            y_test = np.concatenate(y_test) if y_test else None
+            y_test = store.get_y_true(self.target_extractor)
         else:
+            if self.sample_size_ is not None:
+                dataset = self._get_subsample(dataset)
             if is_skorch_dataset(dataset):
                 X_test, y_test = data_from_dataset(dataset)
             else:
                 X_test, y_test = dataset, None
-            y_pred = []
+            y_pred, y_pred_concat = [], None
             if y_test is not None:
                 # We allow y_test to be None but the scoring function has
                 # to be able to deal with it (i.e. called without y_test).
@@ -335,18 +764,200 @@ class EpochScoring(ScoringBase):
         if X_test is None:
             return
 
-        with cache_net_infer(net, self.use_caching, y_pred) as cached_net:
+        if self.asynchronous:
+            self._submit(net, X_test, y_test, y_pred, y_pred_concat)
+            return
+
+        with cache_net_infer(
+                net, self.use_caching, y_pred, y_pred_concat) as cached_net:
             current_score = self._scoring(cached_net, X_test, y_test)
+            self._record_score(cached_net.history, current_score)
 
-            cached_net.history.record(self.name_, current_score)
+    def _on_epoch_end_streaming(self, net, dataset):
+        if dataset is None or not self.n_samples_cached_:
+            return
+        if self.on_train and self.n_samples_cached_ < len(dataset):
+            # training phase was cut short, see on_epoch_end
+            return
+        self._record_score(net.history, self.scoring_.compute())
 
-            is_best = self._is_best_score(current_score)
-            if is_best is None:
+    def _record_score(self, history, current_score, epoch=None):
+        if epoch is None:
+            record = history.record
+        else:
+            row = history[epoch - 1]
+            if isinstance(row, LoggedEpoch):
+                warnings.warn(
+                    "Epoch {} was already removed from the history, the "
+                    "score '{}' is not recorded.".format(epoch, self.name_))
                 return
+            record = row.__setitem__
 
-            cached_net.history.record(self.name_ + '_best', bool(is_best))
-            if is_best:
-                self.best_score_ = current_score
+        record(self.name_, current_score)
 
-    def on_train_end(self, *args, **kwargs):
+        is_best = self._is_best_score(current_score)
+        if is_best is None:
+            return
+
+        record(self.name_ + '_best', bool(is_best))
+        if is_best:
+            self.best_score_ = current_score
+
+    def _score_snapshot(self, net, X_test, y_test, y_pred, y_pred_concat):
+        with cache_net_infer(net, True, y_pred, y_pred_concat) as cached_net:
+            return self._scoring(cached_net, X_test, y_test)
+
+    def _submit(self, net, X_test, y_test, y_pred, y_pred_concat):
+        """Compute the score of the current epoch in the background."""
+        if self.executor_ is None:
+            # a single worker, so that scores finish in order
+            self.executor_ = ThreadPoolExecutor(max_workers=1)
+        # The prediction store is cleared in place on the next epoch,
+        # hence the copy of the list. The net is copied as well, so
+        # that the worker sees the attributes of this epoch.
+        snapshot = _shallow_copy(net)
+        future = self.executor_.submit(
+            self._score_snapshot, snapshot, X_test, y_test, list(y_pred),
+            y_pred_concat)
+        self.pending_.append((net.history[-1, 'epoch'], future))
+
+    def _record_finished(self, net, wait=False):
+        """Record the scores of finished background jobs, in the
+        order of their epochs."""
+        while self.pending_:
+            epoch, future = self.pending_[0]
+            if not (wait or future.done()):
+                break
+            current_score = future.result()
+            del self.pending_[0]
+            self._record_score(net.history, current_score, epoch=epoch)
+
+    def has_pending(self, net, epoch=None):
+        """Whether the score of the given epoch, or of any epoch if
+        None, is still being computed. Scores that are done are
+        recorded first."""
+        self._record_finished(net)
+        return any(epoch is None or pending_epoch == epoch
+                   for pending_epoch, _ in self.pending_)
+
+    def wait(self, net):
+        """Block until all pending scores are recorded in the
+        history."""
+        self._record_finished(net, wait=True)
+
+    # pylint: disable=unused-argument
+    def on_train_end(self, net, **kwargs):
+        self.wait(net)
+        if self.executor_ is not None:
+            self.executor_.shutdown()
+            self.executor_ = None
         self._initialize_cache()
+        if self.use_caching:
+            _get_prediction_store(net, self.on_train).clear()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # threads and futures cannot be pickled, pending scores are lost
+        state['executor_'] = None
+        if 'pending_' in state:
+            state['pending_'] = []
+        return state
+
+
+def get_async_scorings(net, names=None):
+    """Return the asynchronous ``EpochScoring`` callbacks of the net,
+    only those whose score is in ``names`` if given."""
+    return [
+        cb for _, cb in net.callbacks_
+        if isinstance(cb, EpochScoring) and cb.asynchronous and
+        (names is None or cb.name_ in names)
+    ]
+
+
+def wait_for_scores(net, names=None):
+    """Block until the asynchronous ``EpochScoring`` callbacks of the
+    net have recorded their pending scores in the history.
+
+    Parameters
+    ----------
+    net : skorch.NeuralNet
+      The net whose callbacks are waited for.
+
+    names : None or collection of str (default=None)
+      If given, only wait for the callbacks that record scores with
+      these names.
+
+    """
+    for cb in get_async_scorings(net, names):
+        cb.wait(net)
+
+
+class PassthroughScoring(Callback):
+    """Creates scores on epoch level based on batch level scores.
+
+    This callback doesn't calculate any new scores but instead passes
+    through a score that was created on the batch level, e.g. the
+    loss recorded by the net's ``fit_loop``. Based on that score, an
+    average across the batches is created (honoring the batch sizes)
+    and recorded in the history for the given epoch. In contrast to
+    ``BatchScoring``, nothing is computed for each batch.
+
+    For the train and valid loss, the average is taken from the
+    running sums that ``fit_loop`` maintains during each epoch. For
+    other scores, or if the net uses a custom fit loop, it is
+    determined from the batch values stored in the history.
+
+    Parameters
+    ----------
+    name : str
+      Name of the score recorded on a batch level in the history.
+
+    lower_is_better : bool (default=True)
+      Whether lower scores should be considered better or worse.
+
+    on_train : bool (default=False)
+      Whether this should be called during train or validation.
+
+    """
+    def __init__(
+            self,
+            name,
+            lower_is_better=True,
+            on_train=False,
+    ):
+        self.name = name
+        self.lower_is_better = lower_is_better
+        self.on_train = on_train
+
+    def initialize(self):
+        self.best_score_ = np.inf if self.lower_is_better else -np.inf
+        return self
+
+    def _is_best_score(self, current_score):
+        if self.lower_is_better is None:
+            return None
+        if self.lower_is_better:
+            return current_score < self.best_score_
+        return current_score > self.best_score_
+
+    def get_avg_score(self, net):
+        totals = getattr(net, '_running_losses', {}).get(self.name)
+        if totals is not None and totals[1]:
+            return totals[0] / totals[1]
+        return _get_avg_batch_score(net.history, self.name, self.on_train)
+
+    # pylint: disable=unused-argument
+    def on_epoch_end(self, net, **kwargs):
+        history = net.history
+        try:
+            score_avg = self.get_avg_score(net)
+        except KeyError:
+            return
+
+        is_best = self._is_best_score(score_avg)
+        if is_best:
+            self.best_score_ = score_avg
+
+        history.record(self.name, score_avg)
+        if is_best is not None:
+            history.record(self.name + '_best', bool(is_best))
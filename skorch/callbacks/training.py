@@ -1,6 +1,7 @@
 """ Callbacks related to training progress. """
 
 from skorch.callbacks import Callback
+from skorch.callbacks.scoring import wait_for_scores
 from skorch.exceptions import SkorchException
 
 
@@ -56,6 +57,10 @@ class Checkpoint(Callback):
       **Note:** If you supply a lambda expression as monitor, you cannot
       pickle the wrapper anymore as lambdas cannot be pickled. You can
       mitigate this problem by using importable functions instead.
+
+      If the monitored value is computed by an asynchronous
+      ``EpochScoring``, the callback waits for it. If ``monitor`` is
+      a function, it waits for all asynchronous scores.
     """
     def __init__(
             self,
@@ -69,8 +74,13 @@ class Checkpoint(Callback):
         if self.monitor is None:
             do_checkpoint = True
         elif callable(self.monitor):
+            wait_for_scores(net)
             do_checkpoint = self.monitor(net)
         else:
+            name = self.monitor
+            if name.endswith('_best'):
+                name = name[:-len('_best')]
+            wait_for_scores(net, names=(self.monitor, name))
             try:
                 do_checkpoint = net.history[-1, self.monitor]
             except KeyError as e:
@@ -1,5 +1,17 @@
 """Contains history class and helper functions."""
 
+from collections.abc import Mapping
+from collections.abc import MutableMapping
+from collections.abc import Sequence
+import json
+import struct
+import zipfile
+
+import numpy as np
+from sklearn.utils import check_random_state
+
+from skorch.utils import open_file_like
+
 
 # pylint: disable=invalid-name
 class _missingno:
@@ -18,12 +30,441 @@ def _incomplete_mapper(x):
     return x
 
 
+_DTYPE_BOOL = np.dtype(bool)
+_DTYPE_INT = np.dtype(np.int64)
+_DTYPE_FLOAT = np.dtype(np.float64)
+_DTYPE_OBJECT = np.dtype(object)
+_INT_MIN, _INT_MAX = np.iinfo(np.int64).min, np.iinfo(np.int64).max
+
+
+def _column_dtype(value):
+    """Return the numpy dtype used to store ``value`` in a batch
+    column, ``object`` if it has no fixed-width representation."""
+    if isinstance(value, (bool, np.bool_)):
+        return _DTYPE_BOOL
+    if isinstance(value, (int, np.integer)):
+        if _INT_MIN <= value <= _INT_MAX:
+            return _DTYPE_INT
+        return _DTYPE_OBJECT
+    if isinstance(value, (float, np.floating)):
+        return _DTYPE_FLOAT
+    return _DTYPE_OBJECT
+
+
+class _BatchColumn:
+    """Values of a single key across the batches of one epoch.
+
+    The values are kept in a typed numpy array together with a
+    boolean mask that indicates for which batches the key was
+    recorded. When values of different types are recorded, the column
+    falls back to ``object`` dtype so that all values are returned
+    unchanged.
+
+    """
+    def __init__(self, capacity, dtype):
+        self.values = np.zeros(capacity, dtype=dtype)
+        self.mask = np.zeros(capacity, dtype=bool)
+
+    def resize(self, capacity):
+        values = np.zeros(capacity, dtype=self.values.dtype)
+        mask = np.zeros(capacity, dtype=bool)
+        n = min(capacity, len(self.mask))
+        values[:n] = self.values[:n]
+        mask[:n] = self.mask[:n]
+        self.values, self.mask = values, mask
+
+    def set(self, idx, value):
+        dtype = self.values.dtype
+        if dtype != object and _column_dtype(value) != dtype:
+            self.values = self.values.astype(object)
+        self.values[idx] = value
+        self.mask[idx] = True
+
+    def get(self, idx):
+        value = self.values[idx]
+        if self.values.dtype != object:
+            value = value.item()
+        return value
+
+
+class BatchRow(MutableMapping):
+    """Dict-like view on a single row of :class:`.BatchColumns`.
+
+    Reading and writing items goes directly to the underlying
+    columns.
+
+    """
+    def __init__(self, batches, idx):
+        self._batches = batches
+        self._idx = idx
+
+    def __getitem__(self, key):
+        column = self._batches.columns_.get(key)
+        if column is None or not column.mask[self._idx]:
+            raise KeyError(key)
+        return column.get(self._idx)
+
+    def __setitem__(self, key, value):
+        self._batches.set(self._idx, key, value)
+
+    def __delitem__(self, key):
+        self._batches.delete(self._idx, key)
+
+    def __iter__(self):
+        for key, column in list(self._batches.columns_.items()):
+            if column.mask[self._idx]:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class BatchColumns(Sequence):
+    """Column-oriented storage for the batch rows of one epoch.
+
+    Instead of one dict per batch, each key is stored as a typed
+    numpy array together with a mask that indicates which batches
+    contain the key. This keeps memory usage low for long training
+    runs and allows :class:`.History` to answer queries like
+    ``history[:, 'batches', :, 'train_loss']`` without touching each
+    batch individually.
+
+    ``BatchColumns`` behaves like a list of dicts: indexing returns a
+    :class:`.BatchRow` that can be read from and written to like a
+    dict, and it compares equal to a list containing the same dicts.
+
+    Besides the columns, ``BatchColumns`` maintains the number of
+    batches containing each key and, for each aggregate requested
+    through :meth:`weighted_average`, running weighted sums. These
+    are updated whenever a value is recorded, so that querying them
+    does not depend on the number of batches.
+
+    Parameters
+    ----------
+    rows : iterable of dicts (default=())
+      Initial batch rows.
+
+    aggregates : iterable of tuples (default=())
+      Pairs of ``(key, weights_key)`` for which running weighted
+      sums should be maintained from the start; ``weights_key`` may
+      be ``None`` for unweighted sums. Other aggregates are added
+      the first time they are requested.
+
+    Attributes
+    ----------
+    columns_ : dict
+      Maps each key to its column.
+
+    """
+    _initial_capacity = 8
+
+    def __init__(self, rows=(), aggregates=()):
+        self.columns_ = {}
+        self._len = 0
+        self._capacity = 0
+        self._counts = {}
+        # (key, weights_key) -> [sum of w * x, sum of w, number of rows]
+        self._aggregates = {}
+        # key -> aggregates that depend on this key
+        self._aggregates_by_key = {}
+        for key, weights_key in aggregates:
+            self._add_aggregate(key, weights_key, [0.0, 0.0, 0])
+        for row in rows:
+            self.append(row)
+
+    def __len__(self):
+        return self._len
+
+    def _normalize_index(self, idx):
+        if idx < 0:
+            idx += self._len
+        if not 0 <= idx < self._len:
+            raise IndexError("batch index out of range")
+        return idx
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [BatchRow(self, i) for i in range(*idx.indices(self._len))]
+        return BatchRow(self, self._normalize_index(idx))
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield BatchRow(self, i)
+
+    def __eq__(self, other):
+        if isinstance(other, (BatchColumns, list)):
+            return self.to_list() == [dict(row) for row in other]
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(self.to_list())
+
+    def __getstate__(self):
+        # don't pickle the unused capacity
+        state = self.__dict__.copy()
+        state['columns_'] = {}
+        for key, column in self.columns_.items():
+            trimmed = _BatchColumn(0, column.values.dtype)
+            trimmed.values = column.values[:self._len].copy()
+            trimmed.mask = column.mask[:self._len].copy()
+            state['columns_'][key] = trimmed
+        state['_capacity'] = self._len
+        return state
+
+    def append(self, row):
+        """Add a new batch row containing the items of ``row``."""
+        if self._len == self._capacity:
+            self._capacity = max(2 * self._capacity, self._initial_capacity)
+            for column in self.columns_.values():
+                column.resize(self._capacity)
+        self._len += 1
+        for key, value in dict(row).items():
+            self.set(self._len - 1, key, value)
+
+    def set(self, idx, key, value):
+        """Set the value of ``key`` in the batch row at ``idx``."""
+        idx = self._normalize_index(idx)
+        column = self.columns_.get(key)
+        if column is None:
+            column = _BatchColumn(self._capacity, _column_dtype(value))
+            self.columns_[key] = column
+            self._counts[key] = 0
+
+        aggregates = self._aggregates_by_key.get(key)
+        if aggregates:
+            self._update_aggregates(idx, aggregates, -1)
+        if not column.mask[idx]:
+            self._counts[key] += 1
+        column.set(idx, value)
+        if aggregates:
+            self._update_aggregates(idx, aggregates, 1)
+
+    def delete(self, idx, key):
+        """Remove ``key`` from the batch row at ``idx``."""
+        idx = self._normalize_index(idx)
+        column = self.columns_.get(key)
+        if column is None or not column.mask[idx]:
+            raise KeyError(key)
+
+        aggregates = self._aggregates_by_key.get(key)
+        if aggregates:
+            self._update_aggregates(idx, aggregates, -1)
+        column.mask[idx] = False
+        self._counts[key] -= 1
+
+    def count(self, key):
+        """Return the number of batches that contain ``key``."""
+        return self._counts.get(key, 0)
+
+    def _add_aggregate(self, key, weights_key, aggregate):
+        self._aggregates[key, weights_key] = aggregate
+        for k in {key, weights_key} - {None}:
+            self._aggregates_by_key.setdefault(k, []).append(
+                (key, weights_key))
+
+    def _remove_aggregate(self, key, weights_key):
+        del self._aggregates[key, weights_key]
+        for k in {key, weights_key} - {None}:
+            self._aggregates_by_key[k].remove((key, weights_key))
+
+    def _update_aggregates(self, idx, aggregates, sign):
+        columns = self.columns_
+        for key, weights_key in list(aggregates):
+            column = columns.get(key)
+            if column is None or not column.mask[idx]:
+                continue
+            value = column.get(idx)
+            weight = 1
+            if weights_key is not None:
+                column = columns.get(weights_key)
+                if column is None or not column.mask[idx]:
+                    continue
+                weight = column.get(idx)
+            aggregate = self._aggregates[key, weights_key]
+            try:
+                aggregate[0] += sign * weight * value
+                aggregate[1] += sign * weight
+            except TypeError:
+                # not numeric, compute from scratch when requested
+                self._remove_aggregate(key, weights_key)
+                continue
+            aggregate[2] += sign
+
+    def _compute_aggregate(self, key, weights_key):
+        columns = [self.columns_.get(key)]
+        if weights_key is not None:
+            columns.append(self.columns_.get(weights_key))
+        if any(column is None for column in columns):
+            return [0.0, 0.0, 0]
+
+        mask = np.logical_and.reduce(
+            [column.mask[:self._len] for column in columns])
+        values = columns[0].values[:self._len][mask]
+        weights = (np.ones(len(values)) if weights_key is None
+                   else columns[1].values[:self._len][mask])
+        return [
+            float((weights * values).sum()),
+            float(weights.sum()),
+            int(mask.sum()),
+        ]
+
+    def aggregate_keys(self):
+        """Return the ``(key, weights_key)`` pairs for which running
+        aggregates are maintained."""
+        return list(self._aggregates)
+
+    def weighted_average(self, key, weights_key=None):
+        """Return the average of ``key`` over all batches, weighted by
+        the values of ``weights_key`` if given.
+
+        Only batches that contain both keys are taken into account.
+        The first call computes the running sums for this pair of
+        keys, subsequent calls only look them up.
+
+        Raises
+        ------
+        KeyError
+          If no batch contains both keys.
+
+        """
+        aggregate = self._aggregates.get((key, weights_key))
+        if aggregate is None:
+            aggregate = self._compute_aggregate(key, weights_key)
+            self._add_aggregate(key, weights_key, aggregate)
+        sum_weighted, sum_weights, n = aggregate
+        if not n:
+            raise KeyError(key if self.count(key) == 0 else weights_key)
+        return sum_weighted / sum_weights
+
+    def select(self, idx, key):
+        """Fast path for ``batches[idx]`` followed by selecting
+        ``key``, which may be a single key or a tuple/list of keys.
+
+        Returns the same result as the generic history indexing or
+        raises a ``KeyError`` if none of the selected batches contains
+        ``key``.
+
+        """
+        keys = key if isinstance(key, (tuple, list)) else (key,)
+        columns = [self.columns_.get(k) for k in keys]
+
+        if not isinstance(idx, slice):
+            idx = self._normalize_index(idx)
+            for k, column in zip(keys, columns):
+                if column is None or not column.mask[idx]:
+                    raise KeyError(k)
+            values = tuple(column.get(idx) for column in columns)
+            return values if keys is key else values[0]
+
+        if not len(range(*idx.indices(self._len))):
+            return []
+        for k, column in zip(keys, columns):
+            if column is None:
+                raise KeyError(k)
+
+        masks = [column.mask[:self._len][idx] for column in columns]
+        mask = np.logical_and.reduce(masks)
+        if not mask.any():
+            raise KeyError(next(k for k, m in zip(keys, masks) if not m.all()))
+        values = [column.values[:self._len][idx][mask].tolist()
+                  for column in columns]
+        return list(zip(*values)) if keys is key else values[0]
+
+    @classmethod
+    def from_arrays(cls, arrays, n):
+        """Create batch columns directly from arrays, without copying
+        them.
+
+        Parameters
+        ----------
+        arrays : dict
+          Maps each key to a tuple of values and mask, both arrays of
+          length ``n``.
+
+        n : int
+          Number of batch rows.
+
+        """
+        batches = cls()
+        batches._len = batches._capacity = n
+        for key, (values, mask) in arrays.items():
+            column = _BatchColumn(0, values.dtype)
+            column.values, column.mask = values, mask
+            batches.columns_[key] = column
+            batches._counts[key] = int(mask.sum())
+        return batches
+
+    def arrays(self):
+        """Return a dict that maps each key to a tuple of values and
+        mask, both arrays with one entry per batch row."""
+        return {
+            key: (column.values[:self._len], column.mask[:self._len])
+            for key, column in self.columns_.items()
+        }
+
+    def keep(self, indices):
+        """Only keep the batch rows at the given indices, in the given
+        order, and drop all others."""
+        indices = np.asarray(indices, dtype=int)
+        columns = {}
+        for key, column in self.columns_.items():
+            column.values = column.values[:self._len][indices]
+            column.mask = column.mask[:self._len][indices]
+            if column.mask.any():
+                columns[key] = column
+        self.columns_ = columns
+        self._len = self._capacity = len(indices)
+        self._counts = {
+            key: int(column.mask.sum()) for key, column in columns.items()}
+        for key, weights_key in self.aggregate_keys():
+            self._aggregates[key, weights_key][:] = self._compute_aggregate(
+                key, weights_key)
+
+    def summarize(self):
+        """Return summary statistics (count, mean, std, min, max) for
+        each column with numeric values."""
+        summary = {}
+        for key, column in self.columns_.items():
+            values = column.values[:self._len][column.mask[:self._len]]
+            try:
+                values = values.astype(np.float64)
+            except (TypeError, ValueError):
+                continue
+            if not len(values):
+                continue
+            summary[key] = {
+                'count': len(values),
+                'mean': values.mean().item(),
+                'std': values.std().item(),
+                'min': values.min().item(),
+                'max': values.max().item(),
+            }
+        return summary
+
+    def to_list(self):
+        """Return the batch rows as a list of dicts."""
+        rows = [{} for _ in range(self._len)]
+        for key, column in self.columns_.items():
+            values = column.values[:self._len].tolist()
+            for i in np.flatnonzero(column.mask[:self._len]):
+                rows[i][key] = values[i]
+        return rows
+
+
+_LIST_TYPES = (list, BatchColumns)
+
+
 # pylint: disable=missing-docstring
 def partial_index(l, idx):
     needs_unrolling = (
-        isinstance(l, list) and len(l) > 0 and isinstance(l[0], list))
+        isinstance(l, _LIST_TYPES) and len(l) > 0 and
+        isinstance(l[0], _LIST_TYPES))
     types = int, tuple, list, slice
-    needs_indirection = isinstance(l, list) and not isinstance(idx, types)
+    needs_indirection = (
+        isinstance(l, _LIST_TYPES) and not isinstance(idx, types))
 
     if needs_unrolling or needs_indirection:
         return [partial_index(n, idx) for n in l]
@@ -59,6 +500,108 @@ def filter_missing(x):
     return x
 
 
+def _load_npz(f, mmap_mode=None):
+    """Load all arrays from an npz file into a dict.
+
+    If ``mmap_mode`` is not None, arrays stored without compression are
+    memory-mapped (``np.load`` does not support that for npz files).
+
+    """
+    if mmap_mode is None:
+        with np.load(f) as npz:
+            return {name: npz[name] for name in npz.files}
+
+    arrays = {}
+    with zipfile.ZipFile(f) as zf, open(f, 'rb') as fp:
+        for info in zf.infolist():
+            name = info.filename[:-len('.npy')]
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(zf.open(info))
+                continue
+            # skip the local file header of the zip member
+            fp.seek(info.header_offset + 26)
+            len_name, len_extra = struct.unpack('<HH', fp.read(4))
+            fp.seek(len_name + len_extra, 1)
+            version = np.lib.format.read_magic(fp)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(fp)
+            else:
+                header = np.lib.format.read_array_header_2_0(fp)
+            shape, fortran_order, dtype = header
+            if not shape or 0 in shape:
+                arrays[name] = np.zeros(shape, dtype=dtype)
+                continue
+            arrays[name] = np.memmap(
+                f, dtype=dtype, mode=mmap_mode, offset=fp.tell(),
+                shape=shape, order='F' if fortran_order else 'C')
+    return arrays
+
+
+def _epoch_to_dict(epoch):
+    """Return an epoch row as a plain dict, with its batches as a list
+    of dicts."""
+    if isinstance(epoch, LoggedEpoch):
+        return epoch.load()
+    if isinstance(epoch, dict) and isinstance(
+            epoch.get('batches'), BatchColumns):
+        return dict(epoch, batches=epoch['batches'].to_list())
+    return epoch
+
+
+def _json_default(obj):
+    # numpy scalars and arrays, e.g. scores returned by sklearn
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError("Object of type {} is not JSON serializable".format(
+        type(obj).__name__))
+
+
+class LoggedEpoch(Mapping):
+    """Read-only placeholder for an epoch row that was written to the
+    history log and dropped from memory (see :meth:`History.log_to`).
+
+    The epoch is read from the log whenever one of its items is
+    accessed; nothing besides the location in the log is kept in
+    memory.
+
+    Parameters
+    ----------
+    f : str or pathlib.Path
+      Path to the history log.
+
+    offset : int
+      Byte offset of the epoch's line in the log.
+
+    """
+    def __init__(self, f, offset):
+        self.f = f
+        self.offset = offset
+
+    def load(self):
+        """Read the epoch from the log and return it as a dict, with
+        the batches as a list of dicts."""
+        with open(self.f, 'rb') as fp:
+            fp.seek(self.offset)
+            return json.loads(fp.readline().decode('utf-8'))
+
+    def __getitem__(self, key):
+        value = self.load()[key]
+        if key == 'batches':
+            value = BatchColumns(value)
+        return value
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self.load())
+
+    def __repr__(self):
+        return 'LoggedEpoch({!r}, offset={})'.format(self.f, self.offset)
+
+
 class History(list):
     """History contains the information about the training history of
     a :class:`.NeuralNet`, facilitating some of the more common tasks
@@ -72,6 +615,13 @@ class History(list):
     contains a list of dicts for each batch. For convenience, it has
     enhanced slicing notation and some methods to write new items.
 
+    The batches of each epoch are stored column-wise in a
+    :class:`.BatchColumns` object, which behaves like a list of dicts
+    but keeps one typed array per key. This keeps memory usage low
+    and makes queries on batch columns fast, even for runs with
+    hundreds of thousands of batches. Use :meth:`to_list` to get the
+    history as plain lists and dicts, e.g. for JSON serialization.
+
     To access items from history, you may pass a tuple of up to four
     items:
 
@@ -122,9 +672,385 @@ class History(list):
 
     """
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for i, epoch in enumerate(self):
+            if isinstance(epoch, dict) and isinstance(
+                    epoch.get('batches'), list):
+                self[i] = dict(epoch, batches=BatchColumns(epoch['batches']))
+
+    def retain_batches(
+            self,
+            policy='all',
+            every=None,
+            size=None,
+            random_state=None,
+    ):
+        """Set which batch rows are kept once an epoch is completed.
+
+        An epoch counts as completed once the next epoch is started or
+        :meth:`flush` is called, so callbacks still see all batch rows
+        of the current epoch, e.g. to compute epoch averages. The
+        policy is also applied to epochs that were completed before
+        calling this method.
+
+        Unless all rows are kept, the original number of batches is
+        recorded as ``'n_batches'`` in the epoch.
+
+        Parameters
+        ----------
+        policy : str (default='all')
+          One of:
+
+          * ``'all'``: keep all batch rows
+          * ``'every'``: keep every ``every``-th batch row, starting
+            with the first
+          * ``'reservoir'``: keep ``size`` batch rows sampled
+            uniformly at random
+          * ``'summary'``: drop all batch rows and instead record
+            count, mean, std, min and max of each numeric batch
+            column as ``'batches_summary'`` in the epoch
+
+        every : int or None (default=None)
+          Keep every n-th batch for policy ``'every'``.
+
+        size : int or None (default=None)
+          Number of batch rows to keep for policy ``'reservoir'``.
+
+        random_state : int, RandomState instance or None (default=None)
+          Random state used for policy ``'reservoir'``.
+
+        """
+        if policy not in ('all', 'every', 'reservoir', 'summary'):
+            raise ValueError(
+                "Unknown batch retention policy '{}', use one of 'all', "
+                "'every', 'reservoir', 'summary'.".format(policy))
+        if policy == 'every' and not (every and every > 0):
+            raise ValueError("Policy 'every' requires every > 0.")
+        if policy == 'reservoir' and not (size and size > 0):
+            raise ValueError("Policy 'reservoir' requires size > 0.")
+
+        self._batch_retention = (
+            policy, every, size, check_random_state(random_state))
+        if not hasattr(self, '_n_batches_retained'):
+            self._n_batches_retained = 0
+        self._retain_batches(len(self) - 1)
+
+    def _retain_batches(self, stop):
+        """Apply the batch retention policy to the epochs up to
+        ``stop`` that it was not applied to yet."""
+        retention = getattr(self, '_batch_retention', None)
+        if retention is None:
+            return
+
+        policy, every, size, rng = retention
+        for i in range(self._n_batches_retained, stop):
+            epoch = super().__getitem__(i)
+            batches = epoch.get('batches') if isinstance(
+                epoch, dict) else None
+            if policy == 'all' or not isinstance(batches, BatchColumns):
+                continue
+
+            epoch['n_batches'] = len(batches)
+            if policy == 'every':
+                batches.keep(np.arange(0, len(batches), every))
+            elif policy == 'reservoir':
+                if len(batches) > size:
+                    batches.keep(np.sort(
+                        rng.choice(len(batches), size, replace=False)))
+            else:
+                epoch['batches_summary'] = batches.summarize()
+                batches.keep([])
+        self._n_batches_retained = max(self._n_batches_retained, stop)
+
+    def log_to(self, f, keep_last=None):
+        """Stream completed epochs, including their batches, to an
+        append-only log file with one JSON document per line.
+
+        An epoch counts as completed once the next epoch is started or
+        :meth:`flush` is called. Epochs already in the history are
+        written right away, except for the current one. If the
+        training crashes, all completed epochs can be recovered with
+        :meth:`from_log`.
+
+        Parameters
+        ----------
+        f : str or pathlib.Path
+          Path of the log file. If it exists, new epochs are appended
+          to it.
+
+        keep_last : int or None (default=None)
+          If not None, only keep this many of the most recent epochs
+          in memory. Older epochs are replaced by
+          :class:`.LoggedEpoch` placeholders that read from the log
+          on access, so that memory usage stays constant for long
+          training runs. Indexing the history works as before.
+
+        """
+        if keep_last is not None and keep_last < 1:
+            raise ValueError(
+                "keep_last must be at least 1, got {}.".format(keep_last))
+        if getattr(self, '_log_f', None) == f:
+            # already logging to this file
+            self._log_keep_last = keep_last
+            self._drop_logged_epochs()
+            return
+
+        self._log_f = f
+        self._log_keep_last = keep_last
+        self._log_offsets = []
+        self._retain_batches(len(self) - 1)
+        self._write_log(len(self) - 1)
+        self._drop_logged_epochs()
+
+    def flush(self):
+        """Consider all epochs, including the current one, as
+        completed.
+
+        This applies the batch retention policy (see
+        :meth:`retain_batches`) and writes all epochs that were not
+        logged yet to the history log (see :meth:`log_to`). Items
+        recorded in an epoch after it was written are not reflected
+        in the log.
+
+        """
+        self._retain_batches(len(self))
+        self._write_log(len(self))
+        self._drop_logged_epochs()
+
+    def _write_log(self, stop):
+        f = getattr(self, '_log_f', None)
+        if f is None:
+            return
+
+        n_logged = len(self._log_offsets)
+        if stop > n_logged:
+            with open(f, 'ab') as fp:
+                for i in range(n_logged, stop):
+                    self._log_offsets.append(fp.tell())
+                    line = json.dumps(
+                        _epoch_to_dict(super().__getitem__(i)),
+                        default=_json_default)
+                    fp.write(line.encode('utf-8') + b'\n')
+
+    def _drop_logged_epochs(self):
+        """Replace logged epochs that are not among the last
+        ``keep_last`` epochs by placeholders."""
+        if getattr(self, '_log_keep_last', None) is None:
+            return
+        stop = min(len(self._log_offsets), len(self) - self._log_keep_last)
+        for i in range(stop - 1, -1, -1):
+            if isinstance(super().__getitem__(i), LoggedEpoch):
+                break
+            self[i] = LoggedEpoch(self._log_f, self._log_offsets[i])
+
+    @classmethod
+    def from_log(cls, f):
+        """Load a history from a log written through :meth:`log_to`.
+
+        Parameters
+        ----------
+        f : str or pathlib.Path
+          Path to the history log.
+
+        """
+        with open(f, 'rb') as fp:
+            return cls(json.loads(line.decode('utf-8')) for line in fp
+                       if line.strip())
+
+    def _epochs_with_batch_columns(self):
+        for epoch in self:
+            if isinstance(epoch, LoggedEpoch):
+                epoch = epoch.load()
+            if not isinstance(epoch.get('batches'), BatchColumns):
+                epoch = dict(
+                    epoch, batches=BatchColumns(epoch.get('batches', [])))
+            yield epoch
+
+    def _concat_batch_columns(self):
+        """Concatenate the batch columns of all epochs.
+
+        Returns the offsets at which each epoch's batches start (plus
+        the total number of batches) and a dict mapping each key to a
+        tuple of values and mask. Keys whose type differs between
+        epochs get ``object`` dtype.
+
+        """
+        batches = [epoch['batches'] for epoch in
+                   self._epochs_with_batch_columns()]
+        offsets = np.zeros(len(batches) + 1, dtype=np.int64)
+        np.cumsum([len(b) for b in batches], out=offsets[1:])
+
+        dtypes = {}
+        for b in batches:
+            for key, column in b.columns_.items():
+                dtypes.setdefault(key, set()).add(column.values.dtype)
+
+        columns = {}
+        for key, key_dtypes in dtypes.items():
+            dtype = key_dtypes.pop() if len(key_dtypes) == 1 else object
+            values = np.zeros(offsets[-1], dtype=dtype)
+            mask = np.zeros(offsets[-1], dtype=bool)
+            for start, b in zip(offsets, batches):
+                column = b.columns_.get(key)
+                if column is not None:
+                    values[start:start + len(b)] = column.values[:len(b)]
+                    mask[start:start + len(b)] = column.mask[:len(b)]
+            columns[key] = values, mask
+        return offsets, columns
+
+    def to_npz(self, f):
+        """Save the history in a compact binary format.
+
+        The batch values of all epochs are stored as one array per
+        key, together with a mask that indicates in which batches the
+        key is present, in an uncompressed npz file. Epoch values and
+        batch values without a fixed-width type (e.g. strings) are
+        stored as JSON in a small schema header. Use :meth:`from_npz`
+        to load the history again.
+
+        Parameters
+        ----------
+        f : file-like object or str
+          File to write to. No ``.npz`` suffix is added to the name.
+
+        """
+        epochs = []
+        for epoch in self._epochs_with_batch_columns():
+            epochs.append({k: v for k, v in epoch.items() if k != 'batches'})
+        offsets, columns = self._concat_batch_columns()
+
+        arrays = {'batch_offsets': offsets}
+        schema_columns = []
+        for i, (key, (values, mask)) in enumerate(columns.items()):
+            arrays['batch_mask_{}'.format(i)] = mask
+            if values.dtype == object:
+                schema_columns.append({
+                    'key': key, 'dtype': 'json',
+                    'values': values[mask].tolist()})
+            else:
+                schema_columns.append({'key': key, 'dtype': values.dtype.str})
+                arrays['batch_values_{}'.format(i)] = values
+
+        schema = {
+            'version': 1,
+            'epochs': epochs,
+            'batch_columns': schema_columns,
+        }
+        schema = json.dumps(schema, default=_json_default).encode('utf-8')
+        arrays['schema'] = np.frombuffer(schema, dtype=np.uint8)
+
+        with open_file_like(f, 'wb') as fp:
+            np.savez(fp, **arrays)
+
+    @classmethod
+    def from_npz(cls, f, mmap_mode=None):
+        """Load a history that was saved with :meth:`to_npz`.
+
+        Parameters
+        ----------
+        f : file-like object or str
+          File to read from.
+
+        mmap_mode : None or str (default=None)
+          If not None, memory-map the batch columns instead of
+          loading them into memory; requires ``f`` to be a path. Use
+          ``'r'`` for read-only access or ``'c'`` to allow modifying
+          the loaded batches in memory (see ``numpy.memmap``).
+
+        """
+        arrays = _load_npz(f, mmap_mode=mmap_mode)
+        schema = json.loads(arrays['schema'].tobytes().decode('utf-8'))
+        offsets = arrays['batch_offsets']
+
+        columns = {}
+        for i, column in enumerate(schema['batch_columns']):
+            mask = arrays['batch_mask_{}'.format(i)]
+            if column['dtype'] == 'json':
+                values = np.empty(len(mask), dtype=object)
+                for idx, value in zip(np.flatnonzero(mask), column['values']):
+                    values[idx] = value
+            else:
+                values = arrays['batch_values_{}'.format(i)]
+            columns[column['key']] = values, mask
+
+        history = cls()
+        for epoch, start, stop in zip(
+                schema['epochs'], offsets[:-1], offsets[1:]):
+            batch_arrays = {}
+            for key, (values, mask) in columns.items():
+                if mask[start:stop].any():
+                    batch_arrays[key] = values[start:stop], mask[start:stop]
+            batches = BatchColumns.from_arrays(batch_arrays, stop - start)
+            history.append(dict(epoch, batches=batches))
+        return history
+
+    def to_arrays(self):
+        """Return the batch values of all epochs as numpy arrays.
+
+        Returns
+        -------
+        arrays : dict
+          Contains ``'epoch_idx'``, the index of the epoch each batch
+          belongs to, and for each batch key a masked array that masks
+          the batches in which the key is not present.
+
+        """
+        offsets, columns = self._concat_batch_columns()
+        arrays = {'epoch_idx': np.repeat(
+            np.arange(len(offsets) - 1), np.diff(offsets))}
+        for key, (values, mask) in columns.items():
+            arrays[key] = np.ma.MaskedArray(values, mask=~mask)
+        return arrays
+
+    def to_dataframe(self, level='epoch'):
+        """Return the history as a ``pandas.DataFrame``.
+
+        Requires pandas to be installed.
+
+        Parameters
+        ----------
+        level : str (default='epoch')
+          If ``'epoch'``, return one row per epoch with the epoch
+          values. If ``'batch'``, return one row per batch with the
+          batch values and an ``'epoch_idx'`` column; missing values
+          are NaN.
+
+        """
+        try:
+            import pandas as pd
+        except ImportError:
+            raise ImportError("to_dataframe requires pandas to be installed.")
+
+        if level == 'epoch':
+            return pd.DataFrame([
+                {k: v for k, v in epoch.items() if k != 'batches'}
+                for epoch in self._epochs_with_batch_columns()])
+        if level == 'batch':
+            return pd.DataFrame(self.to_arrays())
+        raise ValueError(
+            "level must be 'epoch' or 'batch', got '{}'.".format(level))
+
     def new_epoch(self):
-        """Register a new epoch row."""
-        self.append({'batches': []})
+        """Register a new epoch row.
+
+        Running aggregates that were used on the batches of the
+        previous epoch are maintained for the new epoch right away.
+        The previous epoch is now completed: the batch retention
+        policy is applied to it (see :meth:`retain_batches`) and, if
+        the history is logged (see :meth:`log_to`), it is written to
+        the log.
+
+        """
+        self._retain_batches(len(self))
+        self._write_log(len(self))
+        aggregates = ()
+        if self and isinstance(self[-1], dict):
+            batches = self[-1].get('batches')
+            if isinstance(batches, BatchColumns):
+                aggregates = batches.aggregate_keys()
+        self.append({'batches': BatchColumns(aggregates=aggregates)})
+        self._drop_logged_epochs()
 
     def new_batch(self):
         """Register a new batch row for the current epoch."""
@@ -145,16 +1071,80 @@ class History(list):
         batch.
 
         """
-        self[-1]['batches'][-1][attr] = value
+        batches = self[-1]['batches']
+        if isinstance(batches, BatchColumns):
+            batches.set(-1, attr, value)
+        else:
+            batches[-1][attr] = value
 
     def to_list(self):
-        """Return history object as a list."""
-        return list(self)
+        """Return history object as a list of dicts, with the batches
+        of each epoch as a list of dicts."""
+        return [_epoch_to_dict(epoch) for epoch in self]
+
+    def _getitem_batch_columns(self, i):
+        """Answer ``history[epochs, 'batches', batches, keys]`` directly
+        from the batch columns. Returns ``None`` if the query cannot
+        be answered that way."""
+        idx_epoch, part, idx_batch, key = i
+        keys = key if isinstance(key, (tuple, list)) else (key,)
+        # pylint: disable=too-many-boolean-expressions
+        if (
+                part != 'batches' or
+                not isinstance(idx_epoch, (int, slice)) or
+                not isinstance(idx_batch, (int, slice)) or
+                not all(isinstance(k, str) for k in keys)
+        ):
+            return None
+
+        epochs = super().__getitem__(idx_epoch)
+        single_epoch = not isinstance(idx_epoch, slice)
+        if single_epoch:
+            epochs = [epochs]
+        for epoch in epochs:
+            if not (isinstance(epoch, dict) and
+                    isinstance(epoch.get('batches'), BatchColumns)):
+                return None
+
+        if single_epoch:
+            return epochs[0]['batches'].select(idx_batch, key)
+
+        result, error = [], None
+        for epoch in epochs:
+            try:
+                result.append(epoch['batches'].select(idx_batch, key))
+            except KeyError as e:
+                error = error or e
+        if epochs and not result:
+            raise error
+        return result
+
+    def _getitem_epoch_key(self, i):
+        """Answer ``history[epoch, key]`` for a single epoch and key
+        without going through the generic indexing. Returns ``None``
+        if the query cannot be answered that way."""
+        idx_epoch, key = i
+        if not isinstance(idx_epoch, int) or not isinstance(key, str):
+            return None
+        epoch = super().__getitem__(idx_epoch)
+        if not isinstance(epoch, dict):
+            return None
+        return epoch[key]
 
     def __getitem__(self, i):
         if isinstance(i, (int, slice)):
             return super().__getitem__(i)
 
+        if isinstance(i, tuple) and len(i) == 2:
+            x = self._getitem_epoch_key(i)
+            if x is not None:
+                return x
+
+        if isinstance(i, tuple) and len(i) == 4:
+            x = self._getitem_batch_columns(i)
+            if x is not None:
+                return x
+
         x = self
         if isinstance(i, tuple):
             for part in i:
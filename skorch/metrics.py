@@ -0,0 +1,654 @@
+"""Streaming metrics that are computed incrementally from batches of
+predictions.
+
+Instead of caching all predictions of an epoch and computing the score
+at the end, a streaming metric keeps a small summary of the batches it
+has seen, e.g. the number of correct predictions, and computes the
+score from that. Its memory usage is therefore independent of the
+number of samples.
+
+The metrics are implemented with torch operations. When they are
+updated with tensors, their state lives on the same device as the
+predictions, so that no data has to be transferred to the host until
+the score is computed. Numpy arrays and lists work as well.
+
+Streaming metrics can be passed as ``scoring`` to
+:class:`~skorch.callbacks.EpochScoring` and
+:class:`~skorch.callbacks.BatchScoring`. The scoring callbacks also
+use them automatically in place of some sklearn scorers, see
+:func:`get_metric`.
+
+"""
+
+from functools import partial
+
+import numpy as np
+import torch
+
+
+__all__ = ['StreamingMetric', 'Accuracy', 'TopKAccuracy', 'LogLoss',
+           'MeanSquaredError', 'MeanAbsoluteError', 'R2',
+           'ConfusionMatrix', 'Precision', 'Recall', 'F1', 'ROCAUC',
+           'get_metric']
+
+
+def _as_tensor(X, device=None):
+    """Return X as a tensor without gradient, moved to ``device`` if
+    given."""
+    if isinstance(X, torch.Tensor):
+        X = X.detach()
+    else:
+        X = torch.as_tensor(np.asarray(X))
+    if device is not None:
+        X = X.to(device)
+    return X
+
+
+def _to_labels(y_pred):
+    """Convert class scores or probabilities of shape (n, n_classes)
+    to labels; 1d predictions are considered to be labels already."""
+    if y_pred.dim() > 1:
+        return y_pred.argmax(dim=1)
+    return y_pred.long()
+
+
+def _positive_proba(y_pred):
+    """Return the probability of the positive class; 2d predictions
+    are considered to be probabilities of shape (n, 2)."""
+    if y_pred.dim() > 1:
+        return y_pred[:, 1]
+    return y_pred
+
+
+def _add(total, value):
+    """Add a tensor to a running total that may be a python number
+    or a tensor on another device."""
+    if isinstance(total, torch.Tensor):
+        value = value.to(total.device)
+    return total + value
+
+
+class StreamingMetric:
+    """Base class for streaming metrics.
+
+    Subclasses need to implement the following methods:
+
+    * ``reset()``: Set the state to that of a metric that has not
+      seen any data.
+    * ``update(y_true, y_pred)``: Update the state with a batch of
+      targets and predictions.
+    * ``merge(other)``: Add the state of another metric of the same
+      kind, e.g. one that was updated with a different part of the
+      data.
+    * ``compute()``: Return the score for all data seen so far.
+
+    The ``name`` attribute is used by
+    :class:`~skorch.callbacks.EpochScoring` as the default name of
+    the score.
+
+    """
+    name = None
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        raise NotImplementedError
+
+    def update(self, y_true, y_pred):
+        raise NotImplementedError
+
+    def merge(self, other):
+        raise NotImplementedError
+
+    def compute(self):
+        raise NotImplementedError
+
+    def _check_mergeable(self, other):
+        if type(other) is not type(self):
+            raise TypeError("Cannot merge {} with {}.".format(
+                type(self).__name__, type(other).__name__))
+
+    def _check_not_empty(self, count):
+        if not count:
+            raise ValueError("{} has not seen any data.".format(
+                type(self).__name__))
+
+    def __repr__(self):
+        return '{}()'.format(type(self).__name__)
+
+
+class _MeanMetric(StreamingMetric):
+    """Metric that is the mean of a per-sample (or per-element)
+    quantity."""
+    def reset(self):
+        self.total_ = 0.0
+        self.count_ = 0
+
+    def merge(self, other):
+        self._check_mergeable(other)
+        self.total_ = _add(self.total_, _as_tensor(other.total_))
+        self.count_ += other.count_
+        return self
+
+    def compute(self):
+        self._check_not_empty(self.count_)
+        return float(self.total_) / self.count_
+
+
+class Accuracy(_MeanMetric):
+    """Fraction of correctly classified samples.
+
+    ``y_pred`` may be labels or class scores/probabilities of shape
+    (n_samples, n_classes), in which case the class with the highest
+    score is taken.
+
+    """
+    name = 'accuracy'
+
+    def update(self, y_true, y_pred):
+        y_pred = _as_tensor(y_pred)
+        y_true = _as_tensor(y_true, y_pred.device).reshape(-1)
+        correct = (_to_labels(y_pred) == y_true).sum()
+        self.total_ = _add(self.total_, correct)
+        self.count_ += len(y_true)
+        return self
+
+
+class TopKAccuracy(_MeanMetric):
+    """Fraction of samples whose true class is among the ``k``
+    classes with the highest scores.
+
+    ``y_pred`` are class scores or probabilities of shape
+    (n_samples, n_classes).
+
+    Parameters
+    ----------
+    k : int (default=2)
+      Number of classes with the highest scores that are considered
+      correct.
+
+    """
+    name = 'top_k_accuracy'
+
+    def __init__(self, k=2):
+        self.k = k
+        super().__init__()
+
+    def update(self, y_true, y_pred):
+        y_pred = _as_tensor(y_pred)
+        if y_pred.dim() != 2:
+            raise ValueError("TopKAccuracy requires scores of shape "
+                             "(n_samples, n_classes).")
+        y_true = _as_tensor(y_true, y_pred.device).reshape(-1, 1)
+        k = min(self.k, y_pred.shape[1])
+        top_k = y_pred.topk(k, dim=1).indices
+        correct = (top_k == y_true).any(dim=1).sum()
+        self.total_ = _add(self.total_, correct)
+        self.count_ += len(y_true)
+        return self
+
+    def __repr__(self):
+        return '{}(k={})'.format(type(self).__name__, self.k)
+
+
+class LogLoss(_MeanMetric):
+    """Mean negative log-likelihood of the true classes.
+
+    ``y_pred`` are probabilities of shape (n_samples, n_classes) or,
+    for binary classification, the probabilities of the positive
+    class.
+
+    Parameters
+    ----------
+    eps : float (default=1e-15)
+      Probabilities are clipped to ``[eps, 1 - eps]``.
+
+    """
+    name = 'log_loss'
+
+    def __init__(self, eps=1e-15):
+        self.eps = eps
+        super().__init__()
+
+    def update(self, y_true, y_pred):
+        y_pred = _as_tensor(y_pred).double()
+        y_true = _as_tensor(y_true, y_pred.device).reshape(-1).long()
+        if y_pred.dim() > 1:
+            proba = y_pred.gather(1, y_true.reshape(-1, 1)).reshape(-1)
+        else:
+            proba = torch.where(y_true == 1, y_pred, 1 - y_pred)
+        proba = proba.clamp(self.eps, 1 - self.eps)
+        self.total_ = _add(self.total_, -proba.log().sum())
+        self.count_ += len(y_true)
+        return self
+
+    def __repr__(self):
+        return '{}(eps={})'.format(type(self).__name__, self.eps)
+
+
+def _regression_inputs(y_true, y_pred):
+    y_pred = _as_tensor(y_pred).double()
+    y_true = _as_tensor(y_true, y_pred.device).double()
+    if y_true.shape != y_pred.shape and y_true.numel() == y_pred.numel():
+        # e.g. y of shape (n,) and predictions of shape (n, 1)
+        y_true = y_true.reshape(y_pred.shape)
+    return y_true, y_pred
+
+
+class MeanSquaredError(_MeanMetric):
+    """Mean squared error over all samples and outputs."""
+    name = 'mean_squared_error'
+
+    def update(self, y_true, y_pred):
+        y_true, y_pred = _regression_inputs(y_true, y_pred)
+        self.total_ = _add(self.total_, ((y_pred - y_true) ** 2).sum())
+        self.count_ += y_pred.numel()
+        return self
+
+
+class MeanAbsoluteError(_MeanMetric):
+    """Mean absolute error over all samples and outputs."""
+    name = 'mean_absolute_error'
+
+    def update(self, y_true, y_pred):
+        y_true, y_pred = _regression_inputs(y_true, y_pred)
+        self.total_ = _add(self.total_, (y_pred - y_true).abs().sum())
+        self.count_ += y_pred.numel()
+        return self
+
+
+class R2(StreamingMetric):
+    """Coefficient of determination, averaged uniformly over outputs
+    like ``sklearn.metrics.r2_score``.
+
+    The mean and the sum of squared deviations of the targets are
+    updated per batch with the parallel algorithm of Chan et al., so
+    the result does not suffer from the cancellation of the naive
+    sum-of-squares formula.
+
+    """
+    name = 'r2'
+
+    def reset(self):
+        self.count_ = 0
+        self.mean_ = None
+        self.sum_squares_ = None
+        self.sum_squared_errors_ = None
+
+    def _combine(self, count, mean, sum_squares, sum_squared_errors):
+        if not self.count_:
+            self.count_ = count
+            self.mean_ = mean
+            self.sum_squares_ = sum_squares
+            self.sum_squared_errors_ = sum_squared_errors
+            return
+
+        device = self.mean_.device
+        mean = mean.to(device)
+        total = self.count_ + count
+        delta = mean - self.mean_
+        self.sum_squares_ = (
+            self.sum_squares_ + sum_squares.to(device) +
+            delta ** 2 * self.count_ * count / total)
+        self.mean_ = self.mean_ + delta * count / total
+        self.sum_squared_errors_ = (
+            self.sum_squared_errors_ + sum_squared_errors.to(device))
+        self.count_ = total
+
+    def update(self, y_true, y_pred):
+        y_true, y_pred = _regression_inputs(y_true, y_pred)
+        if not len(y_true):
+            return self
+        y_true = y_true.reshape(len(y_true), -1)
+        y_pred = y_pred.reshape(len(y_pred), -1)
+        mean = y_true.mean(dim=0)
+        self._combine(
+            len(y_true),
+            mean,
+            ((y_true - mean) ** 2).sum(dim=0),
+            ((y_true - y_pred) ** 2).sum(dim=0),
+        )
+        return self
+
+    def merge(self, other):
+        self._check_mergeable(other)
+        if other.count_:
+            self._combine(other.count_, other.mean_, other.sum_squares_,
+                          other.sum_squared_errors_)
+        return self
+
+    def compute(self):
+        self._check_not_empty(self.count_)
+        if self.count_ < 2:
+            return float('nan')
+        numerator = self.sum_squared_errors_.cpu().numpy()
+        denominator = self.sum_squares_.cpu().numpy()
+        # same conventions as sklearn for constant targets
+        scores = np.ones_like(numerator)
+        valid = (numerator != 0) & (denominator != 0)
+        scores[valid] = 1 - numerator[valid] / denominator[valid]
+        scores[(numerator != 0) & (denominator == 0)] = 0.0
+        return float(scores.mean())
+
+
+class ConfusionMatrix(StreamingMetric):
+    """Confusion matrix of integer class labels; rows correspond to
+    the true classes, columns to the predicted classes.
+
+    ``y_pred`` may be labels or class scores/probabilities of shape
+    (n_samples, n_classes). The matrix grows as new classes are seen.
+    With scores, the number of classes is taken from their shape, so
+    that updating the matrix does not require synchronizing with the
+    device.
+
+    Parameters
+    ----------
+    n_classes : int or None (default=None)
+      Initial number of classes.
+
+    """
+    name = 'confusion_matrix'
+
+    def __init__(self, n_classes=None):
+        self.n_classes = n_classes
+        super().__init__()
+
+    def reset(self):
+        n = self.n_classes or 0
+        self.matrix_ = torch.zeros((n, n), dtype=torch.int64)
+
+    def _resize(self, n, device=None):
+        matrix = self.matrix_
+        if device is not None:
+            matrix = matrix.to(device)
+        k = len(matrix)
+        if n > k:
+            resized = torch.zeros(
+                (n, n), dtype=torch.int64, device=matrix.device)
+            resized[:k, :k] = matrix
+            matrix = resized
+        self.matrix_ = matrix
+
+    def update(self, y_true, y_pred):
+        y_pred = _as_tensor(y_pred)
+        y_true = _as_tensor(y_true, y_pred.device).reshape(-1).long()
+        if not len(y_true):
+            return self
+        labels = _to_labels(y_pred)
+        if y_pred.dim() > 1:
+            n = y_pred.shape[1]
+        else:
+            n = int(torch.max(y_true.max(), labels.max())) + 1
+        self._resize(n, device=y_pred.device)
+        n = len(self.matrix_)
+        self.matrix_.view(-1).index_add_(
+            0, y_true * n + labels, torch.ones_like(labels))
+        return self
+
+    def merge(self, other):
+        self._check_mergeable(other)
+        self._resize(len(other.matrix_))
+        k = len(other.matrix_)
+        self.matrix_[:k, :k] += other.matrix_.to(self.matrix_.device)
+        return self
+
+    def compute(self):
+        return self.matrix_.cpu().numpy().copy()
+
+    def __repr__(self):
+        return '{}(n_classes={})'.format(type(self).__name__, self.n_classes)
+
+
+class _ConfusionMatrixScore(ConfusionMatrix):
+    """Score derived from the confusion matrix, with the same
+    ``average`` options as the corresponding sklearn metrics."""
+    def __init__(self, average='binary', pos_label=1, n_classes=None):
+        self.average = average
+        self.pos_label = pos_label
+        super().__init__(n_classes=n_classes)
+
+    def _per_class(self, tp, n_pred, n_true):
+        raise NotImplementedError
+
+    def compute(self):
+        matrix = super().compute()
+        tp = np.diag(matrix).astype(np.float64)
+        n_pred = matrix.sum(axis=0).astype(np.float64)
+        n_true = matrix.sum(axis=1).astype(np.float64)
+        # only classes that occurred in targets or predictions
+        present = (n_pred + n_true) > 0
+
+        if self.average == 'binary':
+            if present[2:].any():
+                raise ValueError(
+                    "Target is multiclass but average='binary'. Please "
+                    "choose another average setting.")
+            idx = self.pos_label
+            if idx >= len(tp):
+                return 0.0
+            return float(self._per_class(tp[idx:idx + 1], n_pred[idx:idx + 1],
+                                         n_true[idx:idx + 1])[0])
+        if self.average == 'micro':
+            return float(self._per_class(
+                tp.sum(keepdims=True), n_pred.sum(keepdims=True),
+                n_true.sum(keepdims=True))[0])
+
+        scores = self._per_class(tp, n_pred, n_true)[present]
+        if self.average == 'macro':
+            return float(scores.mean())
+        if self.average == 'weighted':
+            return float(np.average(scores, weights=n_true[present]))
+        raise ValueError(
+            "average must be one of 'binary', 'micro', 'macro', "
+            "'weighted', got '{}'.".format(self.average))
+
+    @staticmethod
+    def _divide(a, b):
+        return np.divide(a, b, out=np.zeros_like(a), where=b > 0)
+
+    def __repr__(self):
+        return '{}(average={!r}, pos_label={})'.format(
+            type(self).__name__, self.average, self.pos_label)
+
+
+class Precision(_ConfusionMatrixScore):
+    """Precision computed from the confusion matrix.
+
+    Parameters
+    ----------
+    average : str (default='binary')
+      One of 'binary', 'micro', 'macro', 'weighted' (see
+      ``sklearn.metrics.precision_score``).
+
+    pos_label : int (default=1)
+      The positive class for ``average='binary'``.
+
+    n_classes : int or None (default=None)
+      Initial number of classes.
+
+    """
+    name = 'precision'
+
+    def _per_class(self, tp, n_pred, n_true):
+        return self._divide(tp, n_pred)
+
+
+class Recall(_ConfusionMatrixScore):
+    """Recall computed from the confusion matrix.
+
+    Parameters
+    ----------
+    average : str (default='binary')
+      One of 'binary', 'micro', 'macro', 'weighted' (see
+      ``sklearn.metrics.recall_score``).
+
+    pos_label : int (default=1)
+      The positive class for ``average='binary'``.
+
+    n_classes : int or None (default=None)
+      Initial number of classes.
+
+    """
+    name = 'recall'
+
+    def _per_class(self, tp, n_pred, n_true):
+        return self._divide(tp, n_true)
+
+
+class F1(_ConfusionMatrixScore):
+    """F1 score computed from the confusion matrix.
+
+    Parameters
+    ----------
+    average : str (default='binary')
+      One of 'binary', 'micro', 'macro', 'weighted' (see
+      ``sklearn.metrics.f1_score``).
+
+    pos_label : int (default=1)
+      The positive class for ``average='binary'``.
+
+    n_classes : int or None (default=None)
+      Initial number of classes.
+
+    """
+    name = 'f1'
+
+    def _per_class(self, tp, n_pred, n_true):
+        return self._divide(2 * tp, n_pred + n_true)
+
+
+class ROCAUC(StreamingMetric):
+    """Area under the ROC curve for binary classification,
+    approximated with histograms of the predicted probabilities.
+
+    The predicted probabilities of the positive and negative samples
+    are counted in ``n_bins`` equally sized bins between 0 and 1.
+    Samples within the same bin are treated as ties, so the result is
+    exact if no two samples of different classes share a bin, and
+    otherwise deviates by at most the fraction of such pairs.
+
+    ``y_pred`` are probabilities of the positive class or
+    probabilities of shape (n_samples, 2). Since the bins only cover
+    the interval between 0 and 1, computing the score raises an error
+    if any prediction was outside of it, e.g. because the module
+    returns logits.
+
+    Parameters
+    ----------
+    n_bins : int (default=10000)
+      Number of bins of the histograms.
+
+    """
+    name = 'roc_auc'
+
+    def __init__(self, n_bins=10000):
+        self.n_bins = n_bins
+        super().__init__()
+
+    def reset(self):
+        self.hist_pos_ = torch.zeros(self.n_bins, dtype=torch.float64)
+        self.hist_neg_ = torch.zeros(self.n_bins, dtype=torch.float64)
+        self.min_ = torch.tensor(np.inf, dtype=torch.float64)
+        self.max_ = torch.tensor(-np.inf, dtype=torch.float64)
+
+    def _to(self, device):
+        self.hist_pos_ = self.hist_pos_.to(device)
+        self.hist_neg_ = self.hist_neg_.to(device)
+        self.min_ = self.min_.to(device)
+        self.max_ = self.max_.to(device)
+
+    def update(self, y_true, y_pred):
+        proba = _positive_proba(_as_tensor(y_pred)).reshape(-1).double()
+        y_true = _as_tensor(y_true, proba.device).reshape(-1)
+        if not len(proba):
+            return self
+        self._to(proba.device)
+        bins = (proba * self.n_bins).long().clamp(0, self.n_bins - 1)
+        is_pos = (y_true == 1).double()
+        # index_add_ instead of bincount, which would synchronize
+        self.hist_pos_.index_add_(0, bins, is_pos)
+        self.hist_neg_.index_add_(0, bins, 1 - is_pos)
+        self.min_ = torch.min(self.min_, proba.min())
+        self.max_ = torch.max(self.max_, proba.max())
+        return self
+
+    def merge(self, other):
+        self._check_mergeable(other)
+        if other.n_bins != self.n_bins:
+            raise ValueError("Cannot merge ROCAUC with different n_bins.")
+        device = self.hist_pos_.device
+        self.hist_pos_ += other.hist_pos_.to(device)
+        self.hist_neg_ += other.hist_neg_.to(device)
+        self.min_ = torch.min(self.min_, other.min_.to(device))
+        self.max_ = torch.max(self.max_, other.max_.to(device))
+        return self
+
+    def compute(self):
+        if float(self.min_) < 0 or float(self.max_) > 1:
+            raise ValueError(
+                "ROCAUC requires probabilities between 0 and 1, got "
+                "predictions between {} and {}.".format(
+                    float(self.min_), float(self.max_)))
+        hist_pos = self.hist_pos_.cpu().numpy()
+        hist_neg = self.hist_neg_.cpu().numpy()
+        # lower the threshold bin by bin, starting with the highest
+        tps = np.concatenate([[0], np.cumsum(hist_pos[::-1])])
+        fps = np.concatenate([[0], np.cumsum(hist_neg[::-1])])
+        if not tps[-1] or not fps[-1]:
+            raise ValueError("Only one class present in y_true. ROC AUC "
+                             "score is not defined in that case.")
+        tpr = tps / tps[-1]
+        fpr = fps / fps[-1]
+        return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+    def __repr__(self):
+        return '{}(n_bins={})'.format(type(self).__name__, self.n_bins)
+
+
+_CLASSIFICATION_METRICS = {
+    'accuracy': Accuracy,
+    'top_k_accuracy': TopKAccuracy,
+    'roc_auc': ROCAUC,
+}
+for _name, _cls in [('f1', F1), ('precision', Precision), ('recall', Recall)]:
+    _CLASSIFICATION_METRICS[_name] = _cls
+    for _average in ('micro', 'macro', 'weighted'):
+        _CLASSIFICATION_METRICS[_name + '_' + _average] = partial(
+            _cls, average=_average)
+
+_REGRESSION_METRICS = {
+    'r2': R2,
+}
+
+_METRICS = {
+    'classification': _CLASSIFICATION_METRICS,
+    'regression': _REGRESSION_METRICS,
+}
+
+
+def get_metric(scoring, task):
+    """Return the streaming metric that computes the same score as
+    the sklearn scorer called ``scoring``, or None if there is none.
+
+    The scoring callbacks use this to replace the following scorers
+    by streaming metrics:
+
+    * classification: 'accuracy', 'top_k_accuracy', 'roc_auc', and
+      'f1', 'precision', 'recall' with the suffixes '_micro',
+      '_macro', '_weighted'.
+    * regression: 'r2'.
+
+    Parameters
+    ----------
+    scoring : str
+      Name of the sklearn scorer.
+
+    task : str
+      Either 'classification' or 'regression'.
+
+    """
+    factory = _METRICS[task].get(scoring)
+    if factory is None:
+        return None
+    return factory()
@@ -1,21 +1,30 @@
 """Neural net classes."""
 
+from copy import deepcopy
 import fnmatch
+import io
 from itertools import chain
 import json
+import os
+from pathlib import Path
 import re
 import tempfile
+import time
 import warnings
 
 import numpy as np
 from sklearn.base import BaseEstimator
+from sklearn.metrics.scorer import check_scoring
 import torch
 from torch.utils.data import DataLoader
+from torch.utils.data import Subset
 
+from skorch.callbacks import Callback
 from skorch.callbacks import EpochTimer
 from skorch.callbacks import PrintLog
 from skorch.callbacks import EpochScoring
-from skorch.callbacks import BatchScoring
+from skorch.callbacks import PassthroughScoring
+from skorch.callbacks.scoring import convert_sklearn_metric_function
 from skorch.dataset import Dataset
 from skorch.dataset import CVSplit
 from skorch.dataset import get_len
@@ -25,9 +34,12 @@ from skorch.history import History
 from skorch.utils import duplicate_items
 from skorch.utils import get_dim
 from skorch.utils import is_dataset
-from skorch.utils import noop
+from skorch.utils import multi_indexing
 from skorch.utils import open_file_like
 from skorch.utils import params_for
+from skorch.utils import select_outputs
+from skorch.utils import TeeGenerator
+from skorch.utils import to_device
 from skorch.utils import to_numpy
 from skorch.utils import to_tensor
 
@@ -42,6 +54,82 @@ def valid_loss_score(net, X=None, y=None):
     return net.history[-1, 'batches', -1, 'valid_loss']
 
 
+def _is_npz_path(f):
+    return isinstance(f, (str, Path)) and str(f).endswith('.npz')
+
+
+def _overrides_callback_method(cb, method_name):
+    """Whether the callback does anything on the given ``on_*``
+    method, i.e. it does not just inherit the no-op from
+    ``Callback``.
+
+    """
+    if method_name in getattr(cb, '__dict__', {}):
+        return True
+    method_cls = getattr(type(cb), method_name, None)
+    return method_cls is not getattr(Callback, method_name)
+
+
+# torch.inference_mode is not available before PyTorch 1.9
+_inference_mode = getattr(torch, 'inference_mode', torch.no_grad)
+
+
+def _copy_to_tensor(X):
+    """Copy a batch of arrays or tensors to torch tensors, like the
+    ``DataLoader`` does, so that the module cannot modify the data in
+    place."""
+    if isinstance(X, dict):
+        return {key: _copy_to_tensor(val) for key, val in X.items()}
+    if isinstance(X, (list, tuple)):
+        return [_copy_to_tensor(x) for x in X]
+    if isinstance(X, torch.Tensor):
+        return X.clone()
+    return torch.tensor(X)
+
+
+def _add_batch_dim(x):
+    """Turn a single sample into a batch of one sample."""
+    if isinstance(x, dict):
+        return {key: _add_batch_dim(val) for key, val in x.items()}
+    if isinstance(x, (list, tuple)):
+        return [_add_batch_dim(val) for val in x]
+    if isinstance(x, torch.Tensor):
+        return x.unsqueeze(0)
+    return np.asarray(x)[None]
+
+
+def _argmax(y_proba):
+    return y_proba.max(-1)[-1]
+
+
+def _nbytes(module):
+    """Size of the serialized state dict of the module in bytes."""
+    buffer = io.BytesIO()
+    torch.save(module.state_dict(), buffer)
+    return buffer.tell()
+
+
+def _write_progress(path, n_samples):
+    """Atomically record the number of predictions that were written."""
+    tmp = path.with_name(path.name + '.tmp')
+    with open(str(tmp), 'w') as fp:
+        json.dump({'n_samples': n_samples}, fp)
+    os.replace(str(tmp), str(path))
+
+
+def _shard_name(i):
+    return 'part-{:05d}.npy'.format(i)
+
+
+def _skip_samples(data, start):
+    """Return the data without its first ``start`` samples."""
+    if not start:
+        return data
+    if is_dataset(data):
+        return Subset(data, range(start, len(data)))
+    return multi_indexing(data, slice(start, None))
+
+
 # pylint: disable=too-many-instance-attributes
 class NeuralNet(object):
     # pylint: disable=anomalous-backslash-in-string
@@ -163,6 +251,17 @@ class NeuralNet(object):
       tensors will be pushed to cuda tensors before being sent to the
       module.
 
+    predict_batch_size : int or None (default=1024)
+      Mini-batch size used for inference, i.e. by ``forward_iter``,
+      ``forward``, ``predict`` and ``predict_proba``, if the data are
+      numpy arrays or torch tensors, or dicts, lists or tuples of
+      them, and the default ``dataset`` and ``iterator_valid`` are
+      used. In that case, the batches are sliced directly from the
+      data. Since no gradients are needed for inference, it can use
+      larger batches than training. If -1, a single batch with all
+      the data is used; if None, the batch size of the validation
+      data is used.
+
     Attributes
     ----------
     prefixes\_ : list of str
@@ -194,6 +293,10 @@ class NeuralNet(object):
     prefixes_ = ['module', 'iterator_train', 'iterator_valid', 'optimizer',
                  'criterion', 'callbacks', 'dataset']
 
+    callback_methods_ = ['on_train_begin', 'on_train_end', 'on_epoch_begin',
+                         'on_epoch_end', 'on_batch_begin', 'on_batch_end',
+                         'on_grad_computed']
+
     cuda_dependent_attributes_ = ['module_', 'optimizer_']
 
     # pylint: disable=too-many-arguments
@@ -213,6 +316,7 @@ class NeuralNet(object):
             warm_start=False,
             verbose=1,
             device='cpu',
+            predict_batch_size=1024,
             **kwargs
     ):
         self.module = module
@@ -229,6 +333,7 @@ class NeuralNet(object):
         self.warm_start = warm_start
         self.verbose = verbose
         self.device = device
+        self.predict_batch_size = predict_batch_size
 
         self._check_deprecated_params(**kwargs)
         history = kwargs.pop('history', None)
@@ -257,16 +362,12 @@ class NeuralNet(object):
     def _default_callbacks(self):
         return [
             ('epoch_timer', EpochTimer()),
-            ('train_loss', BatchScoring(
-                train_loss_score,
+            ('train_loss', PassthroughScoring(
                 name='train_loss',
                 on_train=True,
-                target_extractor=noop,
             )),
-            ('valid_loss', BatchScoring(
-                valid_loss_score,
+            ('valid_loss', PassthroughScoring(
                 name='valid_loss',
-                target_extractor=noop,
             )),
             ('print_log', PrintLog()),
         ]
@@ -285,11 +386,37 @@ class NeuralNet(object):
         * on_epoch_end
         * on_batch_begin
         * on_batch_end
+        * on_grad_computed
+
+        Only callbacks that actually implement the given method are
+        called (see ``initialize_callbacks_dispatch``).
 
         """
         getattr(self, method_name)(self, **cb_kwargs)
-        for _, cb in self.callbacks_:
-            getattr(cb, method_name)(self, **cb_kwargs)
+        for method in self._get_callbacks_dispatch()[method_name]:
+            method(self, **cb_kwargs)
+
+    def _get_callbacks_dispatch(self):
+        if getattr(self, '_callbacks_dispatch_source', None) != (
+                self.callbacks_):
+            # callbacks_ was changed without going through
+            # initialize_callbacks, e.g. by the user
+            self.initialize_callbacks_dispatch()
+        return self._callbacks_dispatch
+
+    def _is_notified(self, method_name):
+        """Whether calling ``notify`` with the given method name has
+        any effect, i.e. whether the net itself or any callback
+        implements this method.
+
+        Use this to avoid computing expensive arguments for callback
+        methods nobody listens to.
+
+        """
+        method_net = getattr(type(self), method_name)
+        if method_net is not getattr(NeuralNet, method_name):
+            return True
+        return bool(self._get_callbacks_dispatch()[method_name])
 
     # pylint: disable=unused-argument
     def on_train_begin(self, net, **kwargs):
@@ -394,6 +521,32 @@ class NeuralNet(object):
             callbacks_.append((name, cb))
 
         self.callbacks_ = callbacks_
+        self.initialize_callbacks_dispatch()
+        return self
+
+    def initialize_callbacks_dispatch(self):
+        """Build a dispatch table from the callbacks in
+        ``callbacks_``.
+
+        For each callback method (e.g. ``on_batch_end``), the table
+        contains the bound methods of those callbacks that override
+        the no-op defined on ``Callback``. ``notify`` only calls these
+        methods, which saves a lot of overhead when many callbacks are
+        used with small batches.
+
+        The table is not a parameter of the net and is rebuilt
+        whenever ``callbacks_`` changes.
+
+        """
+        # pylint: disable=attribute-defined-outside-init
+        self._callbacks_dispatch = {
+            method_name: [
+                getattr(cb, method_name) for _, cb in self.callbacks_
+                if cb is not None and
+                _overrides_callback_method(cb, method_name)]
+            for method_name in self.callback_methods_
+        }
+        self._callbacks_dispatch_source = list(self.callbacks_)
         return self
 
     def initialize_criterion(self):
@@ -509,16 +662,18 @@ class NeuralNet(object):
           the module and to the train_split call.
 
         """
-        self.module_.train()
+        if not self.module_.training:
+            self.module_.train()
         self.optimizer_.zero_grad()
         y_pred = self.infer(Xi, **fit_params)
         loss = self.get_loss(y_pred, yi, X=Xi, training=True)
         loss.backward()
 
-        self.notify(
-            'on_grad_computed',
-            named_parameters=list(self.module_.named_parameters())
-        )
+        if self._is_notified('on_grad_computed'):
+            self.notify(
+                'on_grad_computed',
+                named_parameters=TeeGenerator(self.module_.named_parameters())
+            )
 
         self.optimizer_.step()
         return {
@@ -536,10 +691,20 @@ class NeuralNet(object):
 
         """
         with torch.set_grad_enabled(training):
-            self.module_.train(training)
+            if self.module_.training != training:
+                self.module_.train(training)
             return self.infer(Xi)
 
-    def fit_loop(self, X, y=None, epochs=None, **fit_params):
+    # pylint: disable=too-many-locals
+    def fit_loop(
+            self,
+            X,
+            y=None,
+            epochs=None,
+            time_budget=None,
+            sample_budget=None,
+            **fit_params
+    ):
         """The proper fit loop.
 
         Contains the logic of what actually happens during the fit
@@ -569,6 +734,14 @@ class NeuralNet(object):
           If int, train for this number of epochs; if None, use
           ``self.max_epochs``.
 
+        time_budget : float or None (default=None)
+          If not None, the maximum wall-clock time in seconds that
+          this fit loop may use. See ``partial_fit`` for details.
+
+        sample_budget : int or None (default=None)
+          If not None, the maximum number of training samples that
+          this fit loop may process. See ``partial_fit`` for details.
+
         **fit_params : dict
           Additional parameters passed to the ``forward`` method of
           the module and to the train_split call.
@@ -576,6 +749,9 @@ class NeuralNet(object):
         """
         self.check_data(X, y)
         epochs = epochs if epochs is not None else self.max_epochs
+        time_start = time.time()
+        samples_seen = 0
+        budget_exhausted = False
 
         dataset_train, dataset_valid = self.get_split_datasets(
             X, y, **fit_params)
@@ -585,33 +761,93 @@ class NeuralNet(object):
         }
 
         for _ in range(epochs):
+            if budget_exhausted or not self._epoch_fits_budget(
+                    time_start, time_budget, samples_seen, sample_budget):
+                break
+
+            self._running_losses = {}
             self.notify('on_epoch_begin', **on_epoch_kwargs)
 
             for Xi, yi in self.get_iterator(dataset_train, training=True):
                 self.notify('on_batch_begin', X=Xi, y=yi, training=True)
                 step = self.train_step(Xi, yi, **fit_params)
-                self.history.record_batch(
-                    'train_loss', step['loss'].data.item())
-                self.history.record_batch('train_batch_size', get_len(Xi))
+                batch_size = get_len(Xi)
+                self._record_batch_loss('train_loss', step['loss'], batch_size)
+                self.history.record_batch('train_batch_size', batch_size)
                 self.notify('on_batch_end', X=Xi, y=yi, training=True, **step)
 
-            if dataset_valid is None:
-                self.notify('on_epoch_end', **on_epoch_kwargs)
-                continue
-
-            for Xi, yi in self.get_iterator(dataset_valid, training=False):
-                self.notify('on_batch_begin', X=Xi, y=yi, training=False)
-                step = self.validation_step(Xi, yi, **fit_params)
-                self.history.record_batch(
-                    'valid_loss', step['loss'].data.item())
-                self.history.record_batch('valid_batch_size', get_len(Xi))
-                self.notify('on_batch_end', X=Xi, y=yi, training=False, **step)
+                samples_seen += batch_size
+                budget_exhausted = (
+                    (time_budget is not None and
+                     time.time() - time_start >= time_budget) or
+                    (sample_budget is not None and
+                     samples_seen >= sample_budget)
+                )
+                if budget_exhausted:
+                    break
+
+            if dataset_valid is not None:
+                for Xi, yi in self.get_iterator(dataset_valid, training=False):
+                    self.notify('on_batch_begin', X=Xi, y=yi, training=False)
+                    step = self.validation_step(Xi, yi, **fit_params)
+                    batch_size = get_len(Xi)
+                    self._record_batch_loss(
+                        'valid_loss', step['loss'], batch_size)
+                    self.history.record_batch('valid_batch_size', batch_size)
+                    self.notify(
+                        'on_batch_end', X=Xi, y=yi, training=False, **step)
 
             self.notify('on_epoch_end', **on_epoch_kwargs)
+            self._running_losses = {}
         return self
 
+    def _record_batch_loss(self, name, loss, batch_size):
+        """Record the loss of a batch in the history and add it to the
+        running sums of the epoch, from which ``PassthroughScoring``
+        determines the average loss without going through the
+        history."""
+        loss = loss.item()
+        self.history.record_batch(name, loss)
+        totals = self._running_losses.setdefault(name, [0.0, 0])
+        totals[0] += loss * batch_size
+        totals[1] += batch_size
+
+    def _epoch_fits_budget(
+            self, time_start, time_budget, samples_seen, sample_budget):
+        """Determine whether the remaining budget allows to start
+        another epoch.
+
+        The time needed for the next epoch is forecast from the
+        duration of the last epoch, as recorded by ``EpochTimer``. If
+        no duration is available, the epoch is started and training
+        stops once the budget is exhausted.
+
+        """
+        if sample_budget is not None and samples_seen >= sample_budget:
+            return False
+        if time_budget is None:
+            return True
+
+        time_left = time_budget - (time.time() - time_start)
+        if time_left <= 0:
+            return False
+
+        try:
+            dur_last = self.history[-1, 'dur']
+        except (IndexError, KeyError):
+            return True
+        return dur_last <= time_left
+
     # pylint: disable=unused-argument
-    def partial_fit(self, X, y=None, classes=None, **fit_params):
+    def partial_fit(
+            self,
+            X,
+            y=None,
+            classes=None,
+            time_budget=None,
+            sample_budget=None,
+            **fit_params
+    ):
         """Fit the module.
 
         If the module is initialized, it is not re-initialized, which
@@ -641,6 +877,23 @@ class NeuralNet(object):
         classes : array, sahpe (n_classes,)
           Solely for sklearn compatibility, currently unused.
 
+        time_budget : float or None (default=None)
+          If not None, the maximum wall-clock time in seconds that
+          training may take. Training stops at the first batch
+          boundary after the time budget is exhausted. The validation
+          data of that last epoch is still evaluated and the
+          ``on_epoch_end`` and ``on_train_end`` callbacks are still
+          called, so that the history remains consistent. Moreover,
+          no new epoch is started if the duration of the previous
+          epoch indicates that it would not fit into the remaining
+          budget.
+
+        sample_budget : int or None (default=None)
+          If not None, the maximum number of training samples that may
+          be processed. Training stops at the first batch boundary
+          after this number of samples has been reached, with the same
+          semantics as for ``time_budget``.
+
         **fit_params : dict
           Additional parameters passed to the ``forward`` method of
           the module and to the train_split call.
@@ -651,13 +904,20 @@ class NeuralNet(object):
 
         self.notify('on_train_begin')
         try:
-            self.fit_loop(X, y, **fit_params)
+            self.fit_loop(
+                X,
+                y,
+                time_budget=time_budget,
+                sample_budget=sample_budget,
+                **fit_params
+            )
         except KeyboardInterrupt:
             pass
         self.notify('on_train_end')
         return self
 
-    def fit(self, X, y=None, **fit_params):
+    def fit(self, X, y=None, time_budget=None, sample_budget=None,
+            **fit_params):
         """Initialize and fit the module.
 
         If the module was already initialized, by calling fit, the
@@ -683,6 +943,14 @@ class NeuralNet(object):
           a Dataset that contains the target, ``y`` may be set to
           None.
 
+        time_budget : float or None (default=None)
+          If not None, the maximum wall-clock time in seconds that
+          training may take. See ``partial_fit`` for details.
+
+        sample_budget : int or None (default=None)
+          If not None, the maximum number of training samples that may
+          be processed. See ``partial_fit`` for details.
+
         **fit_params : dict
           Additional parameters passed to the ``forward`` method of
           the module and to the train_split call.
@@ -691,14 +959,28 @@ class NeuralNet(object):
         if not self.warm_start or not self.initialized_:
             self.initialize()
 
-        self.partial_fit(X, y, **fit_params)
+        self.partial_fit(
+            X,
+            y,
+            time_budget=time_budget,
+            sample_budget=sample_budget,
+            **fit_params
+        )
         return self
 
-    def forward_iter(self, X, training=False, device='cpu'):
+    def forward_iter(
+            self, X, training=False, device='cpu', outputs=None, reducer=None):
         """Yield outputs of module forward calls on each batch of data.
         The storage device of the yielded tensors is determined
         by the ``device`` parameter.
 
+        If the module returns several outputs, ``outputs`` and
+        ``reducer`` determine which of them are kept and how they are
+        reduced, see :func:`~skorch.utils.select_outputs`. This
+        happens on the compute device, before anything is moved to
+        ``device``, so that large outputs that are not needed, e.g.
+        attention maps, are never copied or kept.
+
         Parameters
         ----------
         X : input data, compatible with skorch.dataset.Dataset
@@ -724,22 +1006,105 @@ class NeuralNet(object):
           this might be changed to a specific CUDA device,
           e.g. 'cuda:0'.
 
+        outputs : int, str, list/tuple of int or str, or None
+          (default=None)
+          The outputs of the module to keep, by index, or by name if
+          the module returns a dict or a namedtuple. For a single int
+          or str, only that output is yielded, for a list or tuple, a
+          tuple of the selected outputs. If None, all outputs are
+          yielded.
+
+        reducer : callable, list/tuple of callables, or None
+          (default=None)
+          Applied to each kept output of each batch, e.g.
+          ``lambda y: y.argmax(-1)``, ``lambda y: y.topk(5).indices``
+          or ``lambda y: y[:, :10]``. A list or tuple gives one reducer
+          per output in ``outputs``.
+
         Yields
         ------
         yp : torch tensor
-          Result from a forward call on an individual batch.
+          Result from a forward call on an individual batch. If
+          ``training=False``, the module is run in
+          :func:`torch.inference_mode`, so the result cannot be
+          modified in place or used for backpropagation.
 
         """
+        if training:
+            batches = self._iter_batches(X, training=True)
+            grad_mode = torch.enable_grad
+        else:
+            batches = self._iter_predict_batches(X)
+            grad_mode = _inference_mode
+        for Xi in batches:
+            # Don't keep the grad mode while the generator is
+            # suspended, it would leak into the caller's code.
+            with grad_mode():
+                yp = self.evaluation_step(Xi, training=training)
+                yp = select_outputs(yp, outputs, reducer)
+            yield to_device(yp, device)
+
+    def _iter_batches(self, X, training=False):
+        """Yield the batches of ``X`` from ``dataset`` and
+        ``iterator_train`` or ``iterator_valid``, without targets."""
         dataset = X if is_dataset(X) else self.get_dataset(X)
         iterator = self.get_iterator(dataset, training=training)
         for Xi, _ in iterator:
-            yp = self.evaluation_step(Xi, training=training)
-            if isinstance(yp, tuple):
-                yield tuple(n.to(device) for n in yp)
-            else:
-                yield yp.to(device)
+            yield Xi
+
+    def _can_slice_batches(self, X):
+        """Whether inference batches can be sliced directly from ``X``,
+        i.e. ``X`` consists of arrays or tensors and neither the
+        dataset nor the iterator is customized."""
+        if (
+                self.dataset is not Dataset or
+                self._get_params_for('dataset') or
+                self.iterator_valid is not DataLoader or
+                set(self._get_params_for('iterator_valid')) - {'batch_size'}
+        ):
+            return False
+        if any(
+                getattr(type(self), method) is not getattr(NeuralNet, method)
+                for method in ('get_dataset', 'get_iterator')
+        ):
+            return False
+
+        if isinstance(X, dict):
+            values = list(X.values())
+        elif isinstance(X, (list, tuple)):
+            values = list(X)
+        else:
+            values = [X]
+        return bool(values) and all(
+            isinstance(v, (np.ndarray, torch.Tensor)) and v.ndim
+            for v in values)
+
+    def _iter_predict_batches(self, X):
+        """Yield the batches of ``X`` for inference.
 
-    def forward(self, X, training=False, device='cpu'):
+        For arrays and tensors, slice the batches directly, which
+        avoids indexing every sample separately, adding placeholder
+        targets and collating, see ``predict_batch_size``. Otherwise,
+        go through ``dataset`` and ``iterator_valid``.
+
+        """
+        if not self._can_slice_batches(X):
+            yield from self._iter_batches(X, training=False)
+            return
+
+        n_samples = get_len(X)
+        batch_size = self.predict_batch_size
+        if batch_size is None:
+            batch_size = self._get_params_for('iterator_valid').get(
+                'batch_size', self.batch_size)
+        if batch_size == -1:
+            batch_size = n_samples
+        for start in range(0, n_samples, batch_size):
+            yield _copy_to_tensor(
+                multi_indexing(X, slice(start, start + batch_size)))
+
+    def forward(
+            self, X, training=False, device='cpu', outputs=None, reducer=None):
         """Gather and concatenate the output from forward call with
         input data.
 
@@ -747,7 +1112,9 @@ class NeuralNet(object):
         compute device specified by ``device`` and then concatenated
         using PyTorch :func:`~torch.cat`. If multiple outputs are
         returned by ``self.module_.forward``, each one of them must be
-        able to be concatenated this way.
+        able to be concatenated this way. Use ``outputs`` to only
+        gather some of them, and ``reducer`` to reduce them batch by
+        batch, see :meth:`forward_iter`.
 
         Parameters
         ----------
@@ -774,14 +1141,28 @@ class NeuralNet(object):
           this might be changed to a specific CUDA device,
           e.g. 'cuda:0'.
 
+        outputs : int, str, list/tuple of int or str, or None
+          (default=None)
+          The outputs of the module to keep, see :meth:`forward_iter`.
+
+        reducer : callable, list/tuple of callables, or None
+          (default=None)
+          Applied to each kept output of each batch, see
+          :meth:`forward_iter`.
+
         Returns
         -------
         y_infer : torch tensor
           The result from the forward step.
 
         """
-        y_infer = list(self.forward_iter(X, training=training, device=device))
+        y_infer = list(self.forward_iter(
+            X, training=training, device=device, outputs=outputs,
+            reducer=reducer))
 
+        if y_infer and isinstance(y_infer[0], dict):
+            return {key: torch.cat([yp[key] for yp in y_infer])
+                    for key in y_infer[0]}
         is_multioutput = len(y_infer) > 0 and isinstance(y_infer[0], tuple)
         if is_multioutput:
             return tuple(map(torch.cat, zip(*y_infer)))
@@ -817,7 +1198,7 @@ class NeuralNet(object):
             return self.module_(**x_dict)
         return self.module_(x, **fit_params)
 
-    def predict_proba(self, X):
+    def predict_proba(self, X, out=None):
         """Return the output of the module's forward method as a numpy
         array.
 
@@ -840,19 +1221,261 @@ class NeuralNet(object):
           If this doesn't work with your data, you have to pass a
           ``Dataset`` that can deal with the data.
 
+        out : numpy ndarray or None (default=None)
+          If given, the predictions are written into this array,
+          which is then returned. It must have one row per sample,
+          the other dimensions must match the output of the module.
+          Use this to reuse a buffer between calls or to write to a
+          memory mapped array.
+
         Returns
         -------
         y_proba : numpy ndarray
 
         """
-        y_probas = []
-        for yp in self.forward_iter(X, training=False):
-            yp = yp[0] if isinstance(yp, tuple) else yp
-            y_probas.append(to_numpy(yp))
-        y_proba = np.concatenate(y_probas, 0)
-        return y_proba
+        return self._gather_predictions(X, out=out)
+
+    def _get_predict_data(self, X):
+        """Return the data to predict on and the number of samples, or
+        None if it is unknown.
+
+        The data is ``X`` itself if the batches can be sliced from it
+        (see ``predict_batch_size``) and the dataset otherwise, so
+        that it is only created once.
+
+        """
+        if self._can_slice_batches(X):
+            return X, get_len(X)
+        dataset = X if is_dataset(X) else self.get_dataset(X)
+        try:
+            n_samples = len(dataset)
+        except TypeError:
+            n_samples = None
+        return dataset, n_samples
+
+    def _predict_batches(self, data, transform=None):
+        """Yield the first output of the module for each batch of
+        ``data`` as a numpy array, after applying ``transform``."""
+        # only the first output is moved off the compute device
+        batches = self.forward_iter(data, training=False, outputs=0)
+        if transform is not None:
+            batches = map(transform, batches)
+        return map(to_numpy, batches)
+
+    def predict_proba_to_file(self, X, f, shard_size=None, resume=True):
+        """Write the output of :meth:`predict_proba` to disk, batch
+        by batch, for data whose predictions don't fit into memory.
+
+        If ``shard_size`` is None, the predictions are written to a
+        memory mapped ``.npy`` file at ``f``. The progress is recorded
+        in a file next to it, ``<f>.progress``, which is removed once
+        all predictions are written. Otherwise, ``f`` is a directory
+        and the predictions are written to the files
+        ``part-00000.npy``, ``part-00001.npy``, etc. in it, each with
+        ``shard_size`` samples except for the last one. A shard only
+        appears once it is complete.
+
+        Memory usage is bounded by a batch of predictions, or by a
+        shard if ``shard_size`` is given. Load the predictions with
+        ``numpy.load(f, mmap_mode='r')`` to keep it that way.
+
+        If the inference is interrupted, calling this method again
+        with the same arguments continues where it stopped. This
+        requires that ``X`` yields the samples in the same order and
+        supports indexing, which is the case for the data types listed
+        below.
+
+        Parameters
+        ----------
+        X : input data, compatible with skorch.dataset.Dataset
+          By default, you should be able to pass:
+
+            * numpy arrays
+            * torch tensors
+            * pandas DataFrame or Series
+            * a dictionary of the former three
+            * a list/tuple of the former three
+            * a Dataset
+
+          If this doesn't work with your data, you have to pass a
+          ``Dataset`` that can deal with the data.
+
+        f : str or pathlib.Path
+          Path of the ``.npy`` file, or of the directory of the shards
+          if ``shard_size`` is given.
+
+        shard_size : int or None (default=None)
+          If not None, write shards of this many samples instead of a
+          single file.
+
+        resume : bool (default=True)
+          Whether to continue writing predictions that were
+          interrupted. Complete predictions are not computed again.
+          If False, existing predictions are overwritten.
+
+        Returns
+        -------
+        y_proba : numpy.memmap or list of str
+          The predictions, opened read-only, or the paths of the
+          shards if ``shard_size`` is given.
 
-    def predict(self, X):
+        """
+        data, n_samples = self._get_predict_data(X)
+        if n_samples is None:
+            raise ValueError(
+                "Cannot write predictions to a file for data without a "
+                "length.")
+        if shard_size is None:
+            return self._predict_to_npy(
+                data, n_samples, Path(f), resume=resume)
+        if shard_size < 1:
+            raise ValueError(
+                "shard_size should be a positive int, got {} instead."
+                .format(shard_size))
+        return self._predict_to_shards(
+            data, n_samples, Path(f), shard_size=shard_size, resume=resume)
+
+    def _predict_to_npy(self, data, n_samples, path, resume):
+        path_progress = path.with_name(path.name + '.progress')
+        start, out = 0, None
+
+        if resume and path.exists():
+            if path_progress.exists():
+                with open(str(path_progress)) as fp:
+                    start = json.load(fp)['n_samples']
+                out = np.lib.format.open_memmap(str(path), mode='r+')
+            else:
+                out = np.load(str(path), mmap_mode='r')
+            if len(out) != n_samples:
+                raise ValueError(
+                    "{} contains {} predictions but there are {} samples, "
+                    "use resume=False to overwrite it.".format(
+                        path, len(out), n_samples))
+            if not path_progress.exists():
+                # nothing to do
+                return out
+
+        # The progress is recorded before the file is created, so that
+        # an existing file without progress is always complete.
+        _write_progress(path_progress, start)
+        for batch in self._predict_batches(_skip_samples(data, start)):
+            if out is None:
+                out = np.lib.format.open_memmap(
+                    str(path), mode='w+', dtype=batch.dtype,
+                    shape=(n_samples,) + batch.shape[1:])
+            stop = start + len(batch)
+            out[start:stop] = batch
+            out.flush()
+            _write_progress(path_progress, stop)
+            start = stop
+
+        if start != n_samples:
+            raise ValueError(
+                "Expected {} predictions but got {}.".format(
+                    n_samples, start))
+        del out
+        path_progress.unlink()
+        return np.load(str(path), mmap_mode='r')
+
+    def _predict_to_shards(self, data, n_samples, path, shard_size, resume):
+        path.mkdir(parents=True, exist_ok=True)
+        shards = []
+        if resume:
+            while (path / _shard_name(len(shards))).exists():
+                shards.append(str(path / _shard_name(len(shards))))
+        else:
+            for shard in path.glob('part-*.npy'):
+                shard.unlink()
+
+        def write_shard(arr):
+            target = path / _shard_name(len(shards))
+            tmp = target.with_name(target.name + '.tmp')
+            with open(str(tmp), 'wb') as fp:
+                np.save(fp, arr)
+            os.replace(str(tmp), str(target))
+            shards.append(str(target))
+
+        start = len(shards) * shard_size
+        if start >= n_samples:
+            return shards
+
+        buffer, pos = None, 0
+        for batch in self._predict_batches(_skip_samples(data, start)):
+            while len(batch):
+                if buffer is None:
+                    buffer = np.empty(
+                        (shard_size,) + batch.shape[1:], dtype=batch.dtype)
+                n = min(len(batch), shard_size - pos)
+                buffer[pos:pos + n] = batch[:n]
+                batch = batch[n:]
+                pos += n
+                if pos == shard_size:
+                    write_shard(buffer)
+                    pos = 0
+        if pos:
+            write_shard(buffer[:pos])
+        return shards
+
+    def _gather_predictions(self, X, out=None, transform=None):
+        """Return the first output of the module for all batches of
+        ``X`` as one numpy array, after applying ``transform`` to the
+        output of each batch.
+
+        Instead of collecting the batches and concatenating them, which
+        needs twice the memory of the result, the result is allocated
+        once, when the first batch reveals its shape and dtype, and
+        filled in place. A single batch, e.g. the cached predictions
+        of a whole epoch, is returned without copying.
+
+        """
+        data, n_samples = self._get_predict_data(X)
+        batches = self._predict_batches(data, transform=transform)
+        first = next(batches, None)
+        if first is None:
+            if out is not None:
+                return out
+            raise ValueError("Cannot predict, there is no data.")
+        second = next(batches, None)
+        if second is None and out is None:
+            return first
+        head = [first] if second is None else [first, second]
+
+        if out is None:
+            if n_samples is None or n_samples < len(first):
+                # size unknown, e.g. for an iterable dataset
+                return np.concatenate(head + list(batches), 0)
+            out = np.empty((n_samples,) + first.shape[1:], dtype=first.dtype)
+            user_out = False
+        else:
+            if out.shape[1:] != first.shape[1:]:
+                raise ValueError(
+                    "out should have shape (n_samples, {}), got {} "
+                    "instead.".format(
+                        ', '.join(map(str, first.shape[1:])), out.shape))
+            user_out = True
+
+        start = 0
+        for batch in chain(head, batches):
+            stop = start + len(batch)
+            if stop > len(out):
+                if user_out:
+                    raise ValueError(
+                        "out has room for {} samples, but there are more "
+                        "predictions.".format(len(out)))
+                # the dataset yields more samples than its length
+                return np.concatenate([out[:start], batch] + list(batches), 0)
+            out[start:stop] = batch
+            start = stop
+
+        if start < len(out):
+            if user_out:
+                raise ValueError(
+                    "out has room for {} samples, but there are only {} "
+                    "predictions.".format(len(out), start))
+            out = out[:start]
+        return out
+
+    def predict(self, X, out=None):
         """Where applicable, return class labels for samples in X.
 
         If the module's forward method returns multiple outputs as a
@@ -874,12 +1497,253 @@ class NeuralNet(object):
           If this doesn't work with your data, you have to pass a
           ``Dataset`` that can deal with the data.
 
+        out : numpy ndarray or None (default=None)
+          If given, the predictions are written into this array,
+          which is then returned. It must have one row per sample,
+          the other dimensions must match the output of the module.
+          Use this to reuse a buffer between calls or to write to a
+          memory mapped array.
+
         Returns
         -------
         y_pred : numpy ndarray
 
         """
-        return self.predict_proba(X)
+        return self.predict_proba(X, out=out)
+
+    def predict_proba_batch(self, X):
+        """Return the output of the module's forward method for a
+        single batch of data as a numpy array.
+
+        In contrast to :meth:`predict_proba`, no dataset and no
+        iterator are involved: the data is converted with
+        ``to_tensor`` and passed to ``evaluation_step`` in inference
+        mode. Use this for small batches with low latency, e.g. to
+        serve predictions online.
+
+        If forward returns multiple outputs as a tuple, it is assumed
+        that the first output contains the relevant information. The
+        other values are ignored.
+
+        Parameters
+        ----------
+        X : numpy array, torch tensor, or a dict, list or tuple of them
+          A batch of input data, with the samples along the first
+          dimension. Lists and tuples are treated as multiple inputs
+          to the module.
+
+        Returns
+        -------
+        y_proba : numpy ndarray
+
+        """
+        return self._predict_one_batch(X)
+
+    def predict_batch(self, X):
+        """Where applicable, return class labels for a single batch of
+        data.
+
+        See :meth:`predict_proba_batch` for details.
+
+        Parameters
+        ----------
+        X : numpy array, torch tensor, or a dict, list or tuple of them
+          A batch of input data, with the samples along the first
+          dimension. Lists and tuples are treated as multiple inputs
+          to the module.
+
+        Returns
+        -------
+        y_pred : numpy ndarray
+
+        """
+        return self.predict_proba_batch(X)
+
+    def predict_proba_one(self, x):
+        """Return the output of the module's forward method for a
+        single sample as a numpy array.
+
+        See :meth:`predict_proba_batch` for details.
+
+        Parameters
+        ----------
+        x : numpy array, torch tensor, or a dict, list or tuple of them
+          A single sample, without the batch dimension. Lists and
+          tuples are treated as multiple inputs to the module.
+
+        Returns
+        -------
+        y_proba : numpy ndarray
+          The output for the sample, without the batch dimension.
+
+        """
+        return self.predict_proba_batch(_add_batch_dim(x))[0]
+
+    def predict_one(self, x):
+        """Where applicable, return the class label for a single
+        sample.
+
+        See :meth:`predict_proba_batch` for details.
+
+        Parameters
+        ----------
+        x : numpy array, torch tensor, or a dict, list or tuple of them
+          A single sample, without the batch dimension. Lists and
+          tuples are treated as multiple inputs to the module.
+
+        Returns
+        -------
+        y_pred : numpy ndarray or scalar
+          The prediction for the sample, without the batch dimension.
+
+        """
+        return self.predict_batch(_add_batch_dim(x))[0]
+
+    def _predict_one_batch(self, X, transform=None):
+        with _inference_mode():
+            yp = self.evaluation_step(X, training=False)
+            yp = yp[0] if isinstance(yp, tuple) else yp
+            if transform is not None:
+                yp = transform(yp)
+        return to_numpy(yp)
+
+    def quantize(
+            self,
+            X_valid=None,
+            y_valid=None,
+            scoring=None,
+            X_calibrate=None,
+            layers=(torch.nn.Linear, torch.nn.LSTM),
+            dtype=torch.qint8,
+    ):
+        """Return a copy of the net with a quantized module for fast
+        inference on the CPU.
+
+        By default, the weights of the ``layers`` are converted to
+        ``dtype`` and their activations are quantized on the fly
+        (dynamic quantization, see
+        :func:`torch.ao.quantization.quantize_dynamic`). If
+        ``X_calibrate`` is given, the whole module is quantized
+        statically instead, with the ranges of the activations
+        observed while predicting ``X_calibrate`` with
+        :meth:`forward_iter`. This requires that the module can be
+        traced with ``torch.fx`` and uses the quantized engine set in
+        ``torch.backends.quantized.engine``.
+
+        The original net is not modified. The copy shares the
+        hyper-parameters and callbacks with it and has a copy of its
+        history, but no optimizer: it is meant for prediction only.
+        Its module is also stored as ``module``, so that it can be
+        pickled and its parameters can be saved with
+        :meth:`save_params` and loaded with :meth:`load_params` into
+        another quantized net.
+
+        The copy has an attribute ``quantization_report_``, a dict
+        with the size of the serialized parameters before and after
+        quantization (``'nbytes'`` and ``'nbytes_quantized'``). If
+        validation data is given, it also contains the score of both
+        nets on it (``'score'`` and ``'score_quantized'``) and the
+        difference (``'score_delta'``).
+
+        Parameters
+        ----------
+        X_valid : input data, compatible with skorch.dataset.Dataset
+          Validation data to compare the original and the quantized
+          net on.
+
+        y_valid : target data, compatible with skorch.dataset.Dataset
+          The targets of the validation data.
+
+        scoring : None, str, or callable (default=None)
+          How to compare the nets on the validation data. If None, the
+          average loss as determined by the criterion is used.
+          Otherwise, a sklearn scoring name like ``'accuracy'``, a
+          sklearn metric function, or a scorer with the signature
+          ``scorer(net, X, y)``.
+
+        X_calibrate : input data, compatible with skorch.dataset.Dataset
+          If given, a representative sample of the data that is used
+          to calibrate static quantization.
+
+        layers : tuple of torch.nn.Module classes
+          (default=(torch.nn.Linear, torch.nn.LSTM))
+          The types of layers to quantize with dynamic quantization.
+
+        dtype : torch.dtype (default=torch.qint8)
+          The type of the quantized weights with dynamic quantization,
+          ``torch.qint8`` or ``torch.float16``.
+
+        Returns
+        -------
+        net : NeuralNet
+          The net with the quantized module.
+
+        """
+        if not hasattr(self, 'module_'):
+            raise NotInitializedError(
+                "Cannot quantize an un-initialized model. "
+                "Please initialize first by calling .initialize() "
+                "or by fitting the model with .fit(...).")
+        try:
+            from torch.ao import quantization
+            from torch.ao.quantization import quantize_fx
+        except ImportError:  # torch < 1.10
+            from torch import quantization
+            from torch.quantization import quantize_fx
+
+        module = deepcopy(self.module_).cpu().eval()
+        net = type(self).__new__(type(self))
+        net.__dict__.update(self.__dict__)
+        net.__dict__.pop('optimizer_', None)
+        net.history = deepcopy(self.history)
+        net.callbacks_ = list(self.callbacks_)
+        net.device = 'cpu'
+
+        if X_calibrate is None:
+            module = quantization.quantize_dynamic(
+                module, set(layers), dtype=dtype)
+        else:
+            qconfig = quantization.get_default_qconfig_mapping(
+                torch.backends.quantized.engine)
+            Xi, _ = next(iter(self.get_iterator(
+                self.get_dataset(X_calibrate), training=False)))
+            Xi = to_tensor(Xi, device='cpu')
+            example_inputs = (
+                tuple(Xi.values()) if isinstance(Xi, dict) else (Xi,))
+            net.module_ = quantize_fx.prepare_fx(
+                module, qconfig, example_inputs)
+            for _ in net.forward_iter(X_calibrate):
+                pass
+            module = quantize_fx.convert_fx(net.module_)
+        net.module = net.module_ = module
+
+        report = {
+            'nbytes': _nbytes(self.module_),
+            'nbytes_quantized': _nbytes(module),
+        }
+        if X_valid is not None:
+            report['score'] = self._quantization_score(
+                X_valid, y_valid, scoring)
+            report['score_quantized'] = net._quantization_score(
+                X_valid, y_valid, scoring)
+            report['score_delta'] = (
+                report['score_quantized'] - report['score'])
+        net.quantization_report_ = report
+        return net
+
+    def _quantization_score(self, X, y, scoring):
+        if scoring is not None:
+            scorer = check_scoring(
+                self, convert_sklearn_metric_function(scoring))
+            return float(scorer(self, X, y))
+
+        dataset = self.get_dataset(X, y)
+        loss, n_samples = 0, 0
+        for Xi, yi in self.get_iterator(dataset, training=False):
+            batch_size = get_len(Xi)
+            loss += self.validation_step(Xi, yi)['loss'].item() * batch_size
+            n_samples += batch_size
+        return loss / n_samples
 
     # pylint: disable=unused-argument
     def get_loss(self, y_pred, y_true, X=None, training=False):
@@ -1088,7 +1952,7 @@ class NeuralNet(object):
         return [pgroups], kwargs
 
     def _get_param_names(self):
-        return self.__dict__.keys()
+        return (key for key in self.__dict__ if not key.startswith('_'))
 
     def _get_params_callbacks(self, deep=True):
         """sklearn's .get_params checks for `hasattr(value,
@@ -1213,6 +2077,7 @@ class NeuralNet(object):
                 callbacks_new[i] = (name, new_val)
                 break
         setattr(self, 'callbacks_', callbacks_new)
+        self.initialize_callbacks_dispatch()
 
     def __getstate__(self):
         state = self.__dict__.copy()
@@ -1333,6 +2198,11 @@ class NeuralNet(object):
         Python data structures. Numpy and PyTorch types should not
         be in the history.
 
+        If ``f`` is a path ending in ``.npz``, the history is saved in
+        a compact binary format instead, which is much faster to save
+        and load for long training runs (see
+        :meth:`~skorch.history.History.to_npz`).
+
         Parameters
         ----------
         f : file-like object or str
@@ -1350,18 +2220,33 @@ class NeuralNet(object):
         >>> after.fit(X, y, epoch=2) # Train for another 2 epochs
 
         """
+        if _is_npz_path(f):
+            self.history.to_npz(f)
+            return
+
         with open_file_like(f, 'w') as fp:
             json.dump(self.history.to_list(), fp)
 
-    def load_history(self, f):
+    def load_history(self, f, mmap_mode=None):
         """Load the history of a ``NeuralNet`` from a json file. See
         ``save_history`` for examples.
 
         Parameters
         ----------
         f : file-like object or str
+          If a path ending in ``.npz``, the history is loaded from
+          the binary format written by ``save_history``.
+
+        mmap_mode : None or str (default=None)
+          Only for the binary format: memory-map the batch values
+          instead of loading them (see
+          :meth:`~skorch.history.History.from_npz`).
 
         """
+        if _is_npz_path(f):
+            self.history = History.from_npz(f, mmap_mode=mmap_mode)
+            return
+
         with open_file_like(f, 'r') as fp:
             self.history = History(json.load(fp))
 
@@ -1445,16 +2330,12 @@ class NeuralNetClassifier(NeuralNet):
     def _default_callbacks(self):
         return [
             ('epoch_timer', EpochTimer()),
-            ('train_loss', BatchScoring(
-                train_loss_score,
+            ('train_loss', PassthroughScoring(
                 name='train_loss',
                 on_train=True,
-                target_extractor=noop,
             )),
-            ('valid_loss', BatchScoring(
-                valid_loss_score,
+            ('valid_loss', PassthroughScoring(
                 name='valid_loss',
-                target_extractor=noop,
             )),
             ('valid_acc', EpochScoring(
                 'accuracy',
@@ -1499,7 +2380,7 @@ class NeuralNetClassifier(NeuralNet):
         # https://github.com/PyCQA/pylint/issues/1085
         return super(NeuralNetClassifier, self).fit(X, y, **fit_params)
 
-    def predict_proba(self, X):
+    def predict_proba(self, X, out=None):
         """Where applicable, return probability estimates for
         samples.
 
@@ -1522,6 +2403,13 @@ class NeuralNetClassifier(NeuralNet):
           If this doesn't work with your data, you have to pass a
           ``Dataset`` that can deal with the data.
 
+        out : numpy ndarray or None (default=None)
+          If given, the predictions are written into this array,
+          which is then returned. It must have one row per sample,
+          the other dimensions must match the output of the module.
+          Use this to reuse a buffer between calls or to write to a
+          memory mapped array.
+
         Returns
         -------
         y_proba : numpy ndarray
@@ -1529,9 +2417,9 @@ class NeuralNetClassifier(NeuralNet):
         """
         # Only the docstring changed from parent.
         # pylint: disable=useless-super-delegation
-        return super().predict_proba(X)
+        return super().predict_proba(X, out=out)
 
-    def predict(self, X):
+    def predict(self, X, out=None):
         """Where applicable, return class labels for samples in X.
 
         If the module's forward method returns multiple outputs as a
@@ -1553,17 +2441,40 @@ class NeuralNetClassifier(NeuralNet):
           If this doesn't work with your data, you have to pass a
           ``Dataset`` that can deal with the data.
 
+        out : numpy ndarray or None (default=None)
+          If given, the predictions are written into this array,
+          which is then returned. It must have one row per sample,
+          the other dimensions must match the output of the module.
+          Use this to reuse a buffer between calls or to write to a
+          memory mapped array.
+
         Returns
         -------
         y_pred : numpy ndarray
 
         """
-        y_preds = []
-        for yp in self.forward_iter(X, training=False):
-            yp = yp[0] if isinstance(yp, tuple) else yp
-            y_preds.append(to_numpy(yp.max(-1)[-1]))
-        y_pred = np.concatenate(y_preds, 0)
-        return y_pred
+        return self._gather_predictions(X, out=out, transform=_argmax)
+
+    def predict_batch(self, X):
+        """Where applicable, return class labels for a single batch of
+        data.
+
+        See :meth:`~skorch.net.NeuralNet.predict_proba_batch` for
+        details.
+
+        Parameters
+        ----------
+        X : numpy array, torch tensor, or a dict, list or tuple of them
+          A batch of input data, with the samples along the first
+          dimension. Lists and tuples are treated as multiple inputs
+          to the module.
+
+        Returns
+        -------
+        y_pred : numpy ndarray
+
+        """
+        return self._predict_one_batch(X, transform=_argmax)
 
 
 ######################
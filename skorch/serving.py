@@ -0,0 +1,779 @@
+"""Serve predictions of a fitted net to many concurrent requests.
+
+Predicting single samples one by one leaves most of the throughput of
+the module unused, since the overhead per call dominates and the
+module could process many samples at once. :class:`MicroBatcher`
+collects concurrent requests into batches (dynamic micro-batching),
+runs the module once per batch, and hands the results back to the
+waiting callers. The extra latency per request is bounded by
+``max_wait``.
+
+:class:`MicroBatcher` is an ``asyncio`` component, to be used from a
+coroutine, e.g. in an asynchronous web server:
+
+    >>> batcher = MicroBatcher(net, max_batch_size=64, max_wait=0.005)
+    >>> async def handle(request):
+    ...     x = parse(request)
+    ...     y_proba = await batcher.predict(x)
+    ...     return respond(y_proba)
+
+To use it from regular, possibly multi-threaded code, e.g. in tests,
+use :class:`InProcessClient`, which runs the batcher in an event loop
+in a background thread.
+
+For the opposite case, one large ``X`` instead of many small requests,
+:func:`predict_parallel` splits ``X`` into chunks and predicts them in
+a thread pool, and :func:`predict_multiprocess` predicts one shard of
+``X`` per forked worker process.
+
+If the same samples are predicted again and again, put a
+:class:`PredictionCache` in front of the net.
+
+"""
+
+import asyncio
+from collections import deque
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+import mmap
+import multiprocessing
+import os
+import threading
+import zlib
+
+import numpy as np
+import torch
+from torch.utils.data import Subset
+
+from skorch.dataset import get_len
+from skorch.utils import is_dataset
+from skorch.utils import is_pandas_ndframe
+from skorch.utils import multi_indexing
+from skorch.utils import to_numpy
+
+
+__all__ = [
+    'MicroBatcher', 'InProcessClient', 'predict_parallel',
+    'predict_multiprocess', 'PredictionCache',
+]
+
+
+def _stack(samples):
+    """Stack single samples into a batch, with the same structure as
+    the samples."""
+    first = samples[0]
+    if isinstance(first, dict):
+        return {key: _stack([x[key] for x in samples]) for key in first}
+    if isinstance(first, (list, tuple)):
+        return [_stack([x[i] for x in samples]) for i in range(len(first))]
+    if isinstance(first, torch.Tensor):
+        return torch.stack(samples)
+    return np.stack([np.asarray(x) for x in samples])
+
+
+class MicroBatcher:
+    """Collect concurrent prediction requests into batches.
+
+    Requests are single samples, without the batch dimension, like for
+    :meth:`~skorch.net.NeuralNet.predict_one`. Pending requests are
+    collected until there are ``max_batch_size`` of them or until
+    ``max_wait`` seconds have passed since the first one arrived. They
+    are then stacked and predicted in one go with
+    :meth:`~skorch.net.NeuralNet.predict_proba_batch` or
+    :meth:`~skorch.net.NeuralNet.predict_batch`, i.e. with one call to
+    ``evaluation_step``, and each caller gets its row of the result.
+
+    The module runs in a worker thread, so that the event loop keeps
+    collecting the next batch in the meantime. There is only one
+    worker thread, so the net is never used concurrently.
+
+    The batcher is started automatically by the first request, or
+    explicitly with :meth:`start`, and has to be stopped with
+    :meth:`stop`. It can also be used as an asynchronous context
+    manager:
+
+        >>> async with MicroBatcher(net) as batcher:
+        ...     y_proba = await batcher.predict(x)
+
+    Parameters
+    ----------
+    net : skorch.NeuralNet
+      The initialized or fitted net.
+
+    max_batch_size : int (default=64)
+      The maximum number of requests that are predicted together.
+
+    max_wait : float (default=0.005)
+      The maximum time in seconds to wait for more requests after the
+      first request of a batch arrived.
+
+    method : str (default='predict_proba')
+      Either 'predict_proba' or 'predict', whether to return the
+      output of the module or, where applicable, the class label.
+
+    Attributes
+    ----------
+    n_requests_ : int
+      The number of requests that were predicted.
+
+    n_batches_ : int
+      The number of batches that were predicted.
+
+    """
+    def __init__(
+            self,
+            net,
+            max_batch_size=64,
+            max_wait=0.005,
+            method='predict_proba',
+    ):
+        if method not in ('predict_proba', 'predict'):
+            raise ValueError(
+                "method should be 'predict_proba' or 'predict', got '{}' "
+                "instead.".format(method))
+        if max_batch_size < 1:
+            raise ValueError(
+                "max_batch_size should be a positive int, got {} instead."
+                .format(max_batch_size))
+        self.net = net
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.method = method
+
+        self.n_requests_ = 0
+        self.n_batches_ = 0
+        self._queue = None
+        self._worker = None
+        self._executor = None
+        self._stopping = False
+
+    def start(self):
+        """Start collecting and predicting requests in the running
+        event loop."""
+        if self._worker is not None:
+            return self
+        self._stopping = False
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._worker = asyncio.get_event_loop().create_task(self._run())
+        return self
+
+    async def stop(self):
+        """Predict the pending requests, then stop."""
+        if self._worker is None:
+            return
+        self._stopping = True
+        await self._queue.put(None)
+        await self._worker
+        self._executor.shutdown()
+        self._worker = self._queue = self._executor = None
+
+    async def predict(self, x):
+        """Return the prediction for a single sample ``x``, once the
+        batch it is part of has been predicted.
+
+        Parameters
+        ----------
+        x : numpy array, torch tensor, or a dict, list or tuple of them
+          A single sample, without the batch dimension. All samples
+          must have the same structure and shapes, so that they can be
+          stacked.
+
+        Returns
+        -------
+        y : numpy ndarray or scalar
+          The row of the batch's result for this sample.
+
+        """
+        if self._stopping:
+            raise RuntimeError("The MicroBatcher was stopped.")
+        self.start()
+        future = asyncio.get_event_loop().create_future()
+        await self._queue.put((x, future))
+        return await future
+
+    async def _collect(self):
+        """Wait for a request, then collect more until the batch is
+        full or ``max_wait`` has passed. Returns None when stopping."""
+        item = await self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                # take what is already there without waiting
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(
+                        self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is None:
+                # predict what we have, then stop
+                self._queue.put_nowait(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _predict(self, samples):
+        predict_batch = getattr(self.net, self.method + '_batch')
+        return predict_batch(_stack(samples))
+
+    async def _run(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = await self._collect()
+            if batch is None:
+                return
+            # skip requests whose callers gave up waiting
+            batch = [(x, fut) for x, fut in batch if not fut.done()]
+            if not batch:
+                continue
+
+            samples = [x for x, _ in batch]
+            try:
+                y = await loop.run_in_executor(
+                    self._executor, self._predict, samples)
+            except Exception as exc:  # pylint: disable=broad-except
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                continue
+
+            self.n_batches_ += 1
+            self.n_requests_ += len(batch)
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result(y[i])
+
+    async def __aenter__(self):
+        return self.start()
+
+    async def __aexit__(self, *exc_info):
+        await self.stop()
+
+
+class InProcessClient:
+    """Synchronous client of a :class:`MicroBatcher` that runs in an
+    event loop in a background thread.
+
+    :meth:`predict` may be called from many threads at once; concurrent
+    calls are batched. This is useful to use micro-batching without an
+    asynchronous server, and for tests.
+
+        >>> with InProcessClient(MicroBatcher(net)) as client:
+        ...     y_proba = client.predict(x)
+
+    Parameters
+    ----------
+    batcher : MicroBatcher
+      The batcher to send requests to. It is started in the background
+      thread and stopped by :meth:`close`.
+
+    """
+    def __init__(self, batcher):
+        self.batcher = batcher
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._call(self._start())
+
+    async def _start(self):
+        self.batcher.start()
+
+    def _call(self, coro, timeout=None):
+        future = asyncio.run_coroutine_threadsafe(coro, self._loop)
+        return future.result(timeout)
+
+    def predict(self, x, timeout=None):
+        """Return the prediction for a single sample ``x``, see
+        :meth:`MicroBatcher.predict`. Blocks until the prediction is
+        done or ``timeout`` seconds have passed."""
+        return self._call(self.batcher.predict(x), timeout=timeout)
+
+    def close(self):
+        """Stop the batcher after predicting the pending requests, then
+        stop the event loop."""
+        if self._loop.is_closed():
+            return
+        self._call(self.batcher.stop())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _get_chunk(X, start, stop):
+    if is_dataset(X):
+        return Subset(X, range(start, stop))
+    return multi_indexing(X, slice(start, stop))
+
+
+def predict_parallel(
+        net,
+        X,
+        n_jobs=None,
+        num_threads=None,
+        chunk_size=None,
+        method='predict_proba',
+):
+    """Predict a large ``X`` with several threads that share the net.
+
+    ``X`` is split into consecutive chunks, which are predicted
+    concurrently by ``n_jobs`` threads with the same net, and the
+    results are written in order into one preallocated array. At most
+    ``2 * n_jobs`` chunks are in flight at any time, so the memory
+    needed besides the result is bounded.
+
+    Prediction is thread-safe as long as the net is not trained at
+    the same time (see :ref:`thread-safety`). Since the module runs
+    outside of the GIL, the threads predict in parallel.
+
+    Parameters
+    ----------
+    net : skorch.NeuralNet
+      The initialized or fitted net.
+
+    X : input data, compatible with skorch.dataset.Dataset
+      The data to predict, e.g. a numpy array, a torch tensor, a dict
+      of them, a pandas DataFrame, or a torch Dataset.
+
+    n_jobs : int or None (default=None)
+      The number of threads. If None, the number of CPUs is used.
+
+    num_threads : int or None (default=None)
+      The number of threads torch uses for intra-op parallelism while
+      predicting, see ``torch.set_num_threads``. This is a global
+      setting of the process, it is restored afterwards. If None, the
+      current number of intra-op threads is divided among the
+      ``n_jobs`` threads, so that the CPUs are not oversubscribed.
+
+    chunk_size : int or None (default=None)
+      The number of samples per chunk. If None, ``X`` is split into
+      ``4 * n_jobs`` chunks, so that the threads stay busy even if
+      chunks take different times. Each chunk is predicted in batches
+      of the net's ``predict_batch_size``.
+
+    method : str (default='predict_proba')
+      Either 'predict_proba' or 'predict', the method of the net that
+      is called on each chunk.
+
+    Returns
+    -------
+    y : numpy ndarray
+      The concatenated results of ``method`` for all chunks.
+
+    """
+    if method not in ('predict_proba', 'predict'):
+        raise ValueError(
+            "method should be 'predict_proba' or 'predict', got '{}' "
+            "instead.".format(method))
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_samples = len(X) if is_dataset(X) else get_len(X)
+    if not n_samples:
+        raise ValueError("Cannot predict, there is no data.")
+    if chunk_size is None:
+        chunk_size = -(-n_samples // (4 * n_jobs))
+    if chunk_size < 1:
+        raise ValueError(
+            "chunk_size should be a positive int, got {} instead."
+            .format(chunk_size))
+
+    # Switch to eval mode once here, instead of having the threads
+    # toggle the mode of the shared module.
+    if net.module_.training:
+        net.module_.train(False)
+    predict = getattr(net, method)
+    starts = iter(range(0, n_samples, chunk_size))
+
+    def submit(executor, start):
+        stop = min(start + chunk_size, n_samples)
+        future = executor.submit(predict, _get_chunk(X, start, stop))
+        pending.append((start, stop, future))
+
+    num_threads_before = torch.get_num_threads()
+    if num_threads is None:
+        num_threads = max(1, num_threads_before // n_jobs)
+    torch.set_num_threads(num_threads)
+    pending = deque()
+    out = None
+    try:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            try:
+                for _, start in zip(range(2 * n_jobs), starts):
+                    submit(executor, start)
+                while pending:
+                    start, stop, future = pending.popleft()
+                    y = future.result()
+                    if out is None:
+                        out = np.empty((n_samples,) + y.shape[1:], y.dtype)
+                    out[start:stop] = y
+                    start = next(starts, None)
+                    if start is not None:
+                        submit(executor, start)
+            finally:
+                for _, _, future in pending:
+                    future.cancel()
+    finally:
+        torch.set_num_threads(num_threads_before)
+    return out
+
+
+# The job of predict_multiprocess, inherited by the forked workers so
+# that neither the net nor X have to be pickled.
+_job = None
+
+
+def _predict_shard(start, stop):
+    net, X, out, method, num_threads = _job
+    torch.set_num_threads(num_threads)
+    getattr(net, method)(_get_chunk(X, start, stop), out=out[start:stop])
+
+
+def predict_multiprocess(
+        net,
+        X,
+        n_jobs=None,
+        num_threads=1,
+        method='predict_proba',
+):
+    """Predict a large ``X`` on the CPU with several worker processes.
+
+    ``X`` is split into ``n_jobs`` contiguous shards, and each shard is
+    predicted by its own forked process. The parameters of the module
+    are moved to shared memory first (see
+    :meth:`torch.nn.Module.share_memory`), and the workers write their
+    predictions directly into an output array in shared memory, so
+    that neither the net nor the data or the results are pickled.
+    Since every process has its own interpreter, this scales with the
+    number of cores even for small modules, for which intra-op
+    threading gives little.
+
+    The workers are started with the 'fork' start method, which is
+    not available on Windows. Only use it with a module on the CPU.
+
+    Parameters
+    ----------
+    net : skorch.NeuralNet
+      The initialized or fitted net.
+
+    X : input data, compatible with skorch.dataset.Dataset
+      The data to predict, e.g. a numpy array, a torch tensor, a dict
+      of them, a pandas DataFrame, or a torch Dataset.
+
+    n_jobs : int or None (default=None)
+      The number of worker processes and shards. If None, the number
+      of CPUs is used.
+
+    num_threads : int (default=1)
+      The number of threads torch uses for intra-op parallelism in
+      each worker, see ``torch.set_num_threads``.
+
+    method : str (default='predict_proba')
+      Either 'predict_proba' or 'predict', the method of the net that
+      is called on each shard.
+
+    Returns
+    -------
+    y : numpy ndarray
+      The results of ``method`` for all shards.
+
+    """
+    global _job  # pylint: disable=global-statement
+
+    if method not in ('predict_proba', 'predict'):
+        raise ValueError(
+            "method should be 'predict_proba' or 'predict', got '{}' "
+            "instead.".format(method))
+    if any(p.device.type != 'cpu' for p in net.module_.parameters()):
+        raise ValueError(
+            "predict_multiprocess only works with a module on the CPU.")
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_samples = len(X) if is_dataset(X) else get_len(X)
+    if not n_samples:
+        raise ValueError("Cannot predict, there is no data.")
+    n_jobs = min(n_jobs, n_samples)
+
+    if net.module_.training:
+        net.module_.train(False)
+    net.module_.share_memory()
+
+    # The first sample determines the shape and dtype of the output.
+    y_first = getattr(net, method)(_get_chunk(X, 0, 1))
+    shape = (n_samples,) + y_first.shape[1:]
+    nbytes = int(np.prod(shape)) * y_first.dtype.itemsize
+    # an anonymous mmap is shared with the forked workers
+    buffer = mmap.mmap(-1, max(nbytes, 1))
+    out = np.frombuffer(buffer, dtype=y_first.dtype, count=int(np.prod(shape)))
+    out = out.reshape(shape)
+
+    bounds = np.linspace(0, n_samples, n_jobs + 1).astype(int)
+    _job = (net, X, out, method, num_threads)
+    try:
+        with ProcessPoolExecutor(
+                max_workers=n_jobs,
+                mp_context=multiprocessing.get_context('fork'),
+        ) as executor:
+            futures = [executor.submit(_predict_shard, start, stop)
+                       for start, stop in zip(bounds[:-1], bounds[1:])]
+            for future in futures:
+                future.result()
+    finally:
+        _job = None
+    return out
+
+
+_multipliers = {}
+
+
+def _get_multipliers(seed, n_words):
+    """Random odd 64 bit multipliers, one per word of a row."""
+    key = seed, n_words
+    if key not in _multipliers:
+        rng = np.random.RandomState(seed)
+        words = rng.randint(0, 2**32, size=(n_words, 2)).astype(np.uint64)
+        _multipliers[key] = (words[:, 0] << np.uint64(32)) | words[:, 1] | 1
+    return _multipliers[key]
+
+
+def _hash_array(a, name):
+    """Hash each row of the array into an uint64. The hash depends on
+    the bytes of the row, the dtype, the shape of the row and
+    ``name``."""
+    a = to_numpy(a)
+    if a.dtype.hasobject:
+        raise TypeError(
+            "Cannot hash rows of arrays with dtype object, use a pandas "
+            "DataFrame instead.")
+    schema = repr((name, a.dtype.str, a.shape[1:])).encode()
+    a = np.ascontiguousarray(a).reshape(len(a), -1).view(np.uint8)
+    pad = -a.shape[1] % 8
+    if pad:
+        a = np.concatenate([a, np.zeros((len(a), pad), np.uint8)], axis=1)
+    words = a.view(np.uint64)
+    multipliers = _get_multipliers(zlib.crc32(schema), words.shape[1])
+    # a random linear combination of the words, modulo 2**64
+    return (words * multipliers).sum(axis=1, dtype=np.uint64)
+
+
+def _hash_rows(X):
+    """Return a hash for each row (sample) of ``X`` as a list of ints.
+
+    ``X`` may be a numpy array, a torch tensor, a pandas DataFrame or
+    Series, or a dict, list or tuple of them.
+
+    """
+    if isinstance(X, dict):
+        parts = [_hash_part(X[key], key) for key in sorted(X)]
+    elif isinstance(X, (list, tuple)):
+        parts = [_hash_part(x, i) for i, x in enumerate(X)]
+    else:
+        parts = [_hash_part(X, None)]
+    h = parts[0]
+    for part in parts[1:]:
+        h = h * np.uint64(0x9e3779b97f4a7c15) + part
+    # finalize like splitmix64, so that all bits depend on all words
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xbf58476d1ce4e5b9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94d049bb133111eb)
+    h ^= h >> np.uint64(31)
+    return h.tolist()
+
+
+def _hash_part(x, name):
+    if is_pandas_ndframe(x):
+        # pandas hashes mixed and object columns, too
+        from pandas.util import hash_pandas_object
+        h = hash_pandas_object(x, index=False).values
+        columns = getattr(x, 'columns', [getattr(x, 'name', None)])
+        return _hash_array(h, (name, tuple(map(str, columns))))
+    return _hash_array(x, name)
+
+
+class PredictionCache:
+    """Cache the predictions of a net for individual samples.
+
+    Each sample (row) of ``X`` is identified by a 64 bit hash of its
+    content. Only the samples whose predictions are not cached yet
+    are passed on to the net, all at once, so that they are predicted
+    in batches as usual; samples that occur several times in ``X``
+    are predicted once. This saves time when the same samples are
+    predicted repeatedly, e.g. in a scoring service with many
+    identical requests.
+
+    At most ``max_size`` predictions are cached; when the cache is
+    full, the least recently used ones are evicted.
+
+    The cache is cleared automatically when the module's parameters
+    change, i.e. when the net is (partially) fit, when parameters are
+    loaded with :meth:`~skorch.net.NeuralNet.load_params`, or when the
+    module is re-initialized, e.g. by
+    :meth:`~skorch.net.NeuralNet.set_params`. To detect this, the
+    version counters of the module's parameters and buffers are
+    compared before each prediction. For other changes that affect
+    the predictions, call :meth:`clear`.
+
+        >>> cache = PredictionCache(net, max_size=100000)
+        >>> y_proba = cache.predict_proba(X)
+        >>> cache.hit_rate_
+
+    The cache may be used from several threads at once.
+
+    Parameters
+    ----------
+    net : skorch.NeuralNet
+      The initialized or fitted net.
+
+    max_size : int (default=65536)
+      The maximum number of cached predictions, per method.
+
+    Attributes
+    ----------
+    n_hits_ : int
+      The number of samples whose predictions were taken from the
+      cache.
+
+    n_misses_ : int
+      The number of samples that had to be predicted by the net.
+
+    n_evictions_ : int
+      The number of cached predictions that were evicted because the
+      cache was full.
+
+    n_invalidations_ : int
+      The number of times the cache was cleared because the module's
+      parameters changed.
+
+    hit_rate_ : float
+      The fraction of samples whose predictions were taken from the
+      cache.
+
+    """
+    def __init__(self, net, max_size=65536):
+        if max_size < 1:
+            raise ValueError(
+                "max_size should be a positive int, got {} instead."
+                .format(max_size))
+        self.net = net
+        self.max_size = max_size
+
+        self.n_hits_ = 0
+        self.n_misses_ = 0
+        self.n_evictions_ = 0
+        self.n_invalidations_ = 0
+        self._caches = {}
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    @property
+    def hit_rate_(self):
+        n_total = self.n_hits_ + self.n_misses_
+        return self.n_hits_ / n_total if n_total else 0.0
+
+    def __len__(self):
+        return sum(len(cache) for cache in self._caches.values())
+
+    def clear(self):
+        """Remove all cached predictions."""
+        with self._lock:
+            self._caches.clear()
+
+    def predict_proba(self, X):
+        """Return the cached or computed output of
+        :meth:`~skorch.net.NeuralNet.predict_proba` for ``X``.
+
+        Parameters
+        ----------
+        X : numpy array, torch tensor, pandas DataFrame or Series, or a
+          dict, list or tuple of them
+          The samples to predict.
+
+        Returns
+        -------
+        y_proba : numpy ndarray
+
+        """
+        return self._predict(X, 'predict_proba')
+
+    def predict(self, X):
+        """Return the cached or computed output of
+        :meth:`~skorch.net.NeuralNet.predict` for ``X``, see
+        :meth:`predict_proba`."""
+        return self._predict(X, 'predict')
+
+    def _get_fingerprint(self):
+        # Keep a reference to the module, so that the identity of a
+        # new module can't be the same as that of the old one.
+        module = self.net.module_
+        versions = tuple(
+            p._version for p in chain(module.parameters(), module.buffers()))
+        return module, versions
+
+    def _check_fingerprint(self):
+        """Clear the cache if the module or its parameters changed
+        since the last call; must hold the lock."""
+        fingerprint = self._get_fingerprint()
+        if self._fingerprint is None or (
+                fingerprint[0] is not self._fingerprint[0] or
+                fingerprint[1] != self._fingerprint[1]
+        ):
+            if self._fingerprint is not None and any(self._caches.values()):
+                self.n_invalidations_ += 1
+            self._caches.clear()
+            self._fingerprint = fingerprint
+
+    def _predict(self, X, method):
+        keys = _hash_rows(X)
+        with self._lock:
+            self._check_fingerprint()
+            fingerprint = self._fingerprint
+            cache = self._caches.setdefault(method, OrderedDict())
+            rows = [cache.get(key) for key in keys]
+            for key, row in zip(keys, rows):
+                if row is not None:
+                    cache.move_to_end(key)
+
+        # predict each missing sample only once
+        missing = {}
+        for i, (key, row) in enumerate(zip(keys, rows)):
+            if row is None and key not in missing:
+                missing[key] = i
+        if missing:
+            X_missing = multi_indexing(X, np.fromiter(
+                missing.values(), dtype=np.int64, count=len(missing)))
+            y_missing = getattr(self.net, method)(X_missing)
+            predicted = dict(zip(missing, y_missing))
+            rows = [predicted[key] if row is None else row
+                    for key, row in zip(keys, rows)]
+
+        with self._lock:
+            self.n_hits_ += len(keys) - len(missing)
+            self.n_misses_ += len(missing)
+            # don't store predictions of a module that changed meanwhile
+            if missing and (
+                    self._fingerprint is fingerprint and
+                    self._get_fingerprint() == fingerprint
+            ):
+                self._store(cache, predicted)
+        return np.stack(rows)
+
+    def _store(self, cache, predicted):
+        for key, row in predicted.items():
+            # copy, so that the cache doesn't keep the whole batch alive
+            cache[key] = np.copy(row)
+        while len(cache) > self.max_size:
+            cache.popitem(last=False)
+            self.n_evictions_ += 1
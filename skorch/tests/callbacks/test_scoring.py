@@ -7,6 +7,7 @@ from unittest.mock import patch
 
 import numpy as np
 from sklearn.metrics import accuracy_score, make_scorer
+from sklearn.metrics import f1_score, precision_score, recall_score, r2_score
 import pytest
 
 from skorch.utils import to_numpy
@@ -423,6 +424,550 @@ class TestEpochScoring:
             assert id(c1) == id(c2)
 
 
+    def test_shared_cache_converts_and_concatenates_once(
+            self, classifier_module, classifier_data):
+        from skorch.callbacks import EpochScoring
+        from skorch.callbacks.scoring import _concatenate_tensors
+        from skorch.net import NeuralNetClassifier
+
+        extracted = []
+
+        def target_extractor(y):
+            extracted.append(y)
+            return to_numpy(y)
+
+        def sklearn_score(net, X, y):
+            return accuracy_score(y, net.predict(X))
+
+        callbacks = [
+            ('s{}'.format(i), EpochScoring(
+                sklearn_score, name='s{}'.format(i),
+                target_extractor=target_extractor))
+            for i in range(4)]
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=callbacks,
+            callbacks__valid_acc=None,
+            batch_size=32,
+            max_epochs=2,
+        )
+        with patch('skorch.callbacks.scoring._concatenate_tensors',
+                   side_effect=_concatenate_tensors) as concatenate:
+            net.fit(*classifier_data)
+
+        n_batches = len(net.history[-1, 'batches', :, 'valid_loss'])
+        # 200 validation samples in batches of 32
+        assert n_batches == 7
+        assert len(extracted) == 2 * n_batches
+        assert concatenate.call_count == 2
+
+        scores = [net.history[:, 's{}'.format(i)] for i in range(4)]
+        assert all(score == scores[0] for score in scores)
+        _, ds_valid = net.get_split_datasets(*classifier_data)
+        y_valid = [y for _, y in ds_valid]
+        y_pred = net.predict(ds_valid)
+        assert np.isclose(scores[0][-1], accuracy_score(y_valid, y_pred))
+
+    def test_shared_cache_with_multiple_outputs(
+            self, multiouput_module, classifier_data):
+        import torch
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        class MyNet(NeuralNetClassifier):
+            def get_loss(self, y_pred, y_true, *args, **kwargs):
+                return super().get_loss(y_pred[0], y_true, *args, **kwargs)
+
+        def sklearn_score(net, X, y):
+            return accuracy_score(y, net.predict(X))
+
+        net = MyNet(
+            multiouput_module,
+            criterion=torch.nn.CrossEntropyLoss,
+            callbacks=[
+                ('s1', EpochScoring(sklearn_score, name='s1')),
+                ('s2', EpochScoring(sklearn_score, name='s2',
+                                    on_train=True)),
+            ],
+            max_epochs=1,
+        )
+        net.fit(*classifier_data)
+        assert 0 <= net.history[-1, 's1'] <= 1
+        assert 0 <= net.history[-1, 's2'] <= 1
+
+    def test_caching_does_not_iterate_data_again(
+            self, classifier_module, classifier_data):
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        iterated = []
+
+        class MyNet(NeuralNetClassifier):
+            def get_iterator(self, dataset, training=False):
+                iterated.append(training)
+                return super().get_iterator(dataset, training=training)
+
+        def sklearn_score(net, X, y):
+            return accuracy_score(y, net.predict(X))
+
+        net = MyNet(
+            classifier_module,
+            callbacks=[
+                ('s1', EpochScoring(sklearn_score, name='s1')),
+                ('s2', EpochScoring(sklearn_score, name='s2',
+                                    on_train=True)),
+                ('s3', EpochScoring('neg_mean_absolute_error', name='s3')),
+            ],
+            max_epochs=2,
+        )
+        net.fit(*classifier_data)
+
+        # one pass over the training and the validation data per epoch
+        assert iterated == [True, False, True, False]
+        assert all(np.isfinite(net.history[:, name]).all()
+                   for name in ('s1', 's2', 's3'))
+
+    def test_caching_does_not_modify_net(
+            self, classifier_module, classifier_data):
+        # The cached predictions are returned by a copy of the net, so
+        # that the net itself can be used concurrently while scoring.
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        patched = []
+
+        def sklearn_score(cached_net, X, y):
+            patched.append(
+                {'infer', 'forward_iter'} & set(net.__dict__))
+            assert cached_net is not net
+            return accuracy_score(y, cached_net.predict(X))
+
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[('acc', EpochScoring(sklearn_score))],
+            max_epochs=2,
+        )
+        net.fit(*classifier_data)
+
+        assert patched == [set(), set()]
+
+    def test_asynchronous_same_scores_as_synchronous(
+            self, classifier_module, classifier_data):
+        import torch
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        def sklearn_score(net, X, y):
+            return accuracy_score(y, net.predict(X))
+
+        scores = []
+        for asynchronous in (False, True):
+            torch.manual_seed(0)
+            net = NeuralNetClassifier(
+                classifier_module,
+                callbacks=[
+                    ('acc', EpochScoring(
+                        sklearn_score, lower_is_better=False, name='acc',
+                        asynchronous=asynchronous)),
+                ],
+                max_epochs=3,
+            )
+            net.fit(*classifier_data)
+            scores.append(net.history[:, ['acc', 'acc_best']])
+        assert scores[0] == scores[1]
+
+    def test_asynchronous_does_not_block_training(
+            self, classifier_module, classifier_data):
+        import threading
+        from skorch.callbacks import Callback
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        release = threading.Event()
+        seen = []
+
+        def blocking_score(net, X, y):
+            release.wait(5)
+            return accuracy_score(y, net.predict(X))
+
+        class Release(Callback):
+            def on_epoch_end(self, net, **kwargs):
+                # the first score cannot be done before it is released
+                seen.append('acc' in net.history[0])
+                if len(net.history) == 2:
+                    release.set()
+
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[
+                ('acc', EpochScoring(
+                    blocking_score, name='acc', asynchronous=True)),
+                ('release', Release()),
+            ],
+            max_epochs=2,
+        )
+        net.fit(*classifier_data)
+        assert seen == [False, False]
+        # all scores are recorded by the end of training
+        assert np.isfinite(net.history[:, 'acc']).all()
+        assert not dict(net.callbacks_)['acc'].pending_
+
+    def test_asynchronous_checkpoint_waits_for_score(
+            self, classifier_module, classifier_data, tmpdir):
+        import time
+        from skorch.callbacks import Checkpoint
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        saved = []
+
+        class MyNet(NeuralNetClassifier):
+            def save_params(self, f):
+                saved.append(len(self.history))
+
+        def slow_score(net, X, y):
+            time.sleep(0.05)
+            return accuracy_score(y, net.predict(X))
+
+        net = MyNet(
+            classifier_module,
+            callbacks=[
+                ('acc', EpochScoring(
+                    slow_score, lower_is_better=False, name='acc',
+                    asynchronous=True)),
+                ('cp', Checkpoint(
+                    monitor='acc_best', target=str(tmpdir.join('model.pt')))),
+            ],
+            max_epochs=3,
+        )
+        net.fit(*classifier_data)
+        best_epochs = [epoch for epoch, is_best in enumerate(
+            net.history[:, 'acc_best'], start=1) if is_best]
+        assert saved == best_epochs
+
+    def test_asynchronous_print_log_prints_all_rows(
+            self, classifier_module, classifier_data):
+        import time
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        lines = []
+
+        def slow_score(net, X, y):
+            time.sleep(0.05)
+            return accuracy_score(y, net.predict(X))
+
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[
+                ('acc', EpochScoring(
+                    slow_score, name='acc', asynchronous=True)),
+            ],
+            callbacks__print_log__sink=lines.append,
+            max_epochs=3,
+        )
+        net.fit(*classifier_data)
+        rows = [line.split()[0] for line in lines[2:]]
+        assert rows == ['1', '2', '3']
+        assert 'acc' in lines[0]
+
+    def test_asynchronous_requires_caching(
+            self, classifier_module, classifier_data):
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[EpochScoring(
+                'accuracy', use_caching=False, asynchronous=True)],
+            max_epochs=1,
+        )
+        with pytest.raises(ValueError) as exc:
+            net.fit(*classifier_data)
+        assert 'use_caching=True' in str(exc.value)
+
+    def test_asynchronous_callback_can_be_pickled(
+            self, classifier_module, classifier_data):
+        import pickle
+        from skorch.callbacks import Callback
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        pickled = []
+
+        class PickleScoring(Callback):
+            def on_epoch_end(self, net, **kwargs):
+                # while the executor and a job are pending
+                pickled.append(pickle.dumps(dict(net.callbacks_)['acc']))
+
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[
+                ('acc', EpochScoring(
+                    accuracy_score, name='acc', asynchronous=True)),
+                ('pickle', PickleScoring()),
+            ],
+            max_epochs=1,
+        )
+        net.fit(*classifier_data)
+        cb = pickle.loads(pickled[0])
+        assert cb.executor_ is None
+        assert cb.pending_ == []
+
+    @pytest.fixture
+    def onehot_data(self):
+        # the predicted class is the target, the accuracy is only 1 if
+        # targets and predictions are sampled together
+        y = np.arange(1000) % 2
+        X = np.eye(2, dtype=np.float32)[y] + np.linspace(
+            0, 0.1, 1000, dtype=np.float32)[:, None]
+        return X, y
+
+    @pytest.fixture
+    def onehot_module(self):
+        import torch
+
+        class Identity(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.weight = torch.nn.Parameter(torch.zeros(1))
+
+            def forward(self, X):
+                return torch.softmax(X + self.weight, dim=-1)
+
+        return Identity
+
+    @pytest.mark.parametrize('use_caching', [True, False])
+    def test_max_samples_scores_sample(
+            self, onehot_module, onehot_data, use_caching):
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        sizes = []
+
+        def score(net, X, y):
+            y_pred = net.predict(X)
+            sizes.append((len(y_pred), len(y)))
+            return accuracy_score(y, y_pred)
+
+        net = NeuralNetClassifier(
+            onehot_module,
+            callbacks=[('acc', EpochScoring(
+                score, on_train=True, name='acc', max_samples=100,
+                use_caching=use_caching))],
+            max_epochs=2,
+            batch_size=64,
+            iterator_train__shuffle=True,
+        )
+        net.fit(*onehot_data)
+        assert sizes == [(100, 100), (100, 100)]
+        assert net.history[:, 'acc'] == [1.0, 1.0]
+
+    def test_max_samples_fraction(self, onehot_module, onehot_data):
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        sizes = []
+
+        def score(net, X, y):
+            sizes.append(len(y))
+            return accuracy_score(y, net.predict(X))
+
+        net = NeuralNetClassifier(
+            onehot_module,
+            callbacks=[EpochScoring(
+                score, on_train=True, max_samples=0.25)],
+            max_epochs=1,
+        )
+        net.fit(*onehot_data)
+        # 800 training samples
+        assert sizes == [200]
+
+    def test_max_samples_without_caching_same_subset(
+            self, onehot_module, onehot_data):
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        Xs = []
+
+        def score(net, X, y):
+            Xs.append(X)
+            return accuracy_score(y, net.predict(X))
+
+        net = NeuralNetClassifier(
+            onehot_module,
+            callbacks=[('acc', EpochScoring(
+                score, on_train=True, name='acc', max_samples=50,
+                use_caching=False, random_state=0))],
+            max_epochs=3,
+        )
+        net.fit(*onehot_data)
+        assert len(Xs[0]) == 50
+        assert (Xs[0] == Xs[1]).all()
+        assert (Xs[0] == Xs[2]).all()
+
+        # reproducible with the same random state
+        indices = dict(net.callbacks_)['acc'].sample_indices_
+        net.initialize().fit(*onehot_data)
+        assert (dict(net.callbacks_)['acc'].sample_indices_ == indices).all()
+
+    def test_max_samples_reservoir_is_uniform(self):
+        import torch
+        from skorch.callbacks import EpochScoring
+
+        scoring = EpochScoring(
+            'accuracy', on_train=True, max_samples=10, random_state=0)
+        scoring.initialize()
+        scoring.y_is_placeholder_ = False
+        counts = np.zeros(100)
+        for _ in range(1000):
+            scoring._initialize_cache()
+            scoring.sample_size_ = 10
+            for start in range(0, 100, 16):
+                y = torch.arange(start, min(start + 16, 100))
+                scoring._sample_batch(y, y.float()[:, None])
+                scoring.n_samples_cached_ += len(y)
+            sample = scoring.y_true_sample_
+            assert len(set(sample)) == 10
+            assert (scoring.y_pred_sample_[:, 0].numpy() == sample).all()
+            counts[sample] += 1
+        # each sample is drawn with probability 0.1
+        assert 60 < counts.min() <= counts.max() < 140
+
+    @pytest.mark.parametrize('kwargs, msg', [
+        ({'max_samples': 10}, "max_samples requires on_train=True."),
+        ({'max_samples': 0, 'on_train': True},
+         "max_samples should be a positive int"),
+        ({'max_samples': 1.5, 'on_train': True},
+         "max_samples should be a positive int"),
+        ({'max_samples': '10', 'on_train': True},
+         "max_samples should be a positive int"),
+    ])
+    def test_max_samples_invalid(self, kwargs, msg):
+        from skorch.callbacks import EpochScoring
+
+        with pytest.raises(ValueError) as exc:
+            EpochScoring('accuracy', **kwargs).initialize()
+        assert str(exc.value).startswith(msg)
+
+    @pytest.mark.parametrize('on_train', [False, True])
+    def test_streaming_metric_same_as_sklearn_scorer(
+            self, classifier_module, classifier_data, on_train):
+        from skorch.callbacks import EpochScoring
+        from skorch.metrics import Accuracy
+        from skorch.net import NeuralNetClassifier
+
+        metric = Accuracy()
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[
+                ('acc', EpochScoring(
+                    'accuracy', name='acc', on_train=on_train,
+                    lower_is_better=False)),
+                ('acc_streaming', EpochScoring(
+                    metric, name='acc_streaming', on_train=on_train,
+                    lower_is_better=False)),
+            ],
+            max_epochs=3,
+        )
+        net.fit(*classifier_data)
+
+        assert np.allclose(net.history[:, 'acc'],
+                           net.history[:, 'acc_streaming'])
+        assert (net.history[:, 'acc_best'] ==
+                net.history[:, 'acc_streaming_best'])
+        # the metric passed by the user is not modified
+        assert metric.count_ == 0
+
+    def test_streaming_metric_does_not_cache(
+            self, classifier_module, classifier_data):
+        from skorch.callbacks import EpochScoring
+        from skorch.metrics import Accuracy
+        from skorch.net import NeuralNetClassifier
+
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[('acc', EpochScoring(Accuracy(), name='acc'))],
+            max_epochs=1,
+        )
+        with patch('skorch.callbacks.scoring.EpochScoring.on_train_end',
+                   lambda *x, **y: None):
+            net.fit(*classifier_data)
+
+        cb = dict(net.callbacks_)['acc']
+        assert cb.y_preds_ == []
+        assert cb.y_trues_ == []
+        assert cb.scoring_.count_ == 200
+
+    @pytest.mark.parametrize('scoring, metric_func', [
+        ('accuracy', accuracy_score),
+        ('f1', f1_score),
+        ('f1_macro', partial(f1_score, average='macro')),
+        ('precision_micro', partial(precision_score, average='micro')),
+        ('recall', recall_score),
+    ])
+    def test_scorer_name_uses_metric_classifier(
+            self, classifier_module, classifier_data, scoring, metric_func):
+        from skorch.callbacks import EpochScoring
+        from skorch.metrics import StreamingMetric
+        from skorch.net import NeuralNetClassifier
+
+        def sklearn_score(net, X, y):
+            return metric_func(y, net.predict(X))
+
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[
+                ('metric', EpochScoring(scoring, name='metric')),
+                ('sklearn', EpochScoring(sklearn_score, name='sklearn')),
+            ],
+            max_epochs=2,
+        )
+        net.fit(*classifier_data)
+
+        assert isinstance(dict(net.callbacks_)['metric'].scoring_,
+                          StreamingMetric)
+        assert np.allclose(net.history[:, 'metric'],
+                           net.history[:, 'sklearn'])
+
+    def test_scorer_name_uses_metric_regressor(self, regression_data):
+        import torch
+        from skorch.callbacks import EpochScoring
+        from skorch.metrics import R2
+        from skorch.net import NeuralNetRegressor
+
+        def sklearn_score(net, X, y):
+            return r2_score(y, net.predict(X))
+
+        net = NeuralNetRegressor(
+            torch.nn.Linear,
+            module__in_features=20,
+            module__out_features=1,
+            callbacks=[
+                ('r2', EpochScoring('r2')),
+                ('sklearn', EpochScoring(sklearn_score, name='sklearn')),
+            ],
+            max_epochs=2,
+        )
+        net.fit(*regression_data)
+
+        assert isinstance(dict(net.callbacks_)['r2'].scoring_, R2)
+        assert np.allclose(net.history[:, 'r2'], net.history[:, 'sklearn'])
+
+    def test_scorer_name_without_caching_does_not_use_metric(
+            self, classifier_module, classifier_data):
+        from skorch.callbacks import EpochScoring
+        from skorch.net import NeuralNetClassifier
+
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[('acc', EpochScoring('accuracy', use_caching=False))],
+            max_epochs=1,
+        )
+        net.fit(*classifier_data)
+        assert dict(net.callbacks_)['acc'].scoring_ == 'accuracy'
+
+
 class TestBatchScoring:
     @pytest.fixture
     def scoring_cls(self):
@@ -747,3 +1292,127 @@ class TestBatchScoring:
         # the bug, the cache would be exhausted early because of the
         # train split, and we would get back less.
         assert len(y_pred) == len(X)
+
+    def test_scorer_name_uses_metric_classifier(
+            self, scoring_cls, classifier_module, classifier_data):
+        from skorch.metrics import Accuracy
+        from skorch.net import NeuralNetClassifier
+
+        def sklearn_score(net, X, y):
+            return accuracy_score(y, net.predict(X))
+
+        net = NeuralNetClassifier(
+            classifier_module,
+            callbacks=[
+                ('metric', scoring_cls('accuracy', name='metric')),
+                ('sklearn', scoring_cls(sklearn_score, name='sklearn')),
+            ],
+            max_epochs=2,
+        )
+        net.fit(*classifier_data)
+
+        assert isinstance(dict(net.callbacks_)['metric'].scoring_, Accuracy)
+        assert np.allclose(net.history[:, 'batches', :, 'metric'],
+                           net.history[:, 'batches', :, 'sklearn'])
+        assert np.allclose(net.history[:, 'metric'],
+                           net.history[:, 'sklearn'])
+
+
+class TestPassthroughScoring:
+    @pytest.fixture
+    def scoring_cls(self):
+        from skorch.callbacks import PassthroughScoring
+        return PassthroughScoring
+
+    @pytest.fixture
+    def net_cls(self):
+        from skorch.net import NeuralNetClassifier
+        return NeuralNetClassifier
+
+    def fit_with_seed(self, net):
+        import torch
+        torch.manual_seed(0)
+        return net.fit(*self.data)
+
+    @pytest.fixture(autouse=True)
+    def set_data(self, classifier_data):
+        self.data = classifier_data
+
+    def test_same_history_as_batch_scoring(self, net_cls, classifier_module):
+        from skorch.callbacks import BatchScoring
+        from skorch.net import train_loss_score
+        from skorch.net import valid_loss_score
+        from skorch.utils import noop
+
+        net_passthrough = self.fit_with_seed(
+            net_cls(classifier_module, max_epochs=3, batch_size=32))
+        net_batch_scoring = self.fit_with_seed(net_cls(
+            classifier_module,
+            max_epochs=3,
+            batch_size=32,
+            callbacks__train_loss=BatchScoring(
+                train_loss_score, name='train_loss', on_train=True,
+                target_extractor=noop),
+            callbacks__valid_loss=BatchScoring(
+                valid_loss_score, name='valid_loss',
+                target_extractor=noop),
+        ))
+
+        history, expected = net_passthrough.history, net_batch_scoring.history
+        for row, row_expected in zip(history, expected):
+            assert list(row) == list(row_expected)
+            assert row['batches'] == row_expected['batches']
+        for key in ('train_loss', 'valid_loss'):
+            assert np.allclose(history[:, key], expected[:, key],
+                               rtol=1e-12, atol=0)
+            assert history[:, key + '_best'] == expected[:, key + '_best']
+
+    def test_running_losses_are_weighted_average(
+            self, net_cls, classifier_module):
+        net = net_cls(classifier_module, max_epochs=1, batch_size=150)
+        net.fit(*self.data)
+
+        for key, bs_key in [('train_loss', 'train_batch_size'),
+                            ('valid_loss', 'valid_batch_size')]:
+            losses = net.history[-1, 'batches', :, key]
+            batch_sizes = net.history[-1, 'batches', :, bs_key]
+            assert len(set(batch_sizes)) > 1
+            assert np.isclose(net.history[-1, key],
+                              np.average(losses, weights=batch_sizes))
+
+    def test_score_from_history(
+            self, net_cls, classifier_module, scoring_cls):
+        from skorch.callbacks import Callback
+
+        class RecordBatchSize(Callback):
+            def on_batch_end(self, net, X, training, **kwargs):
+                if not training:
+                    net.history.record_batch('my_score', float(len(X)))
+
+        net = net_cls(
+            classifier_module,
+            batch_size=300,
+            max_epochs=2,
+            callbacks=[
+                ('record', RecordBatchSize()),
+                ('my_score', scoring_cls(
+                    'my_score', lower_is_better=False)),
+            ],
+        )
+        net.fit(*self.data)
+
+        # 200 validation samples in batches of 200
+        assert net.history[:, 'my_score'] == [200, 200]
+        assert net.history[:, 'my_score_best'] == [True, False]
+
+    def test_no_valid_data(self, net_cls, classifier_module):
+        net = net_cls(
+            classifier_module,
+            max_epochs=1,
+            train_split=None,
+            callbacks__valid_acc=None,
+        )
+        net.fit(*self.data)
+
+        assert 'train_loss' in net.history[-1]
+        assert 'valid_loss' not in net.history[-1]
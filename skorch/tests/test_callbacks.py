@@ -7,6 +7,7 @@ from unittest.mock import patch
 
 import numpy as np
 import pytest
+import torch
 
 from skorch.utils import to_numpy
 
@@ -381,6 +382,142 @@ class TestProgressBar:
         net.fit(*data)
 
 
+class TestHistoryLogger:
+    @pytest.fixture
+    def history_logger_cls(self):
+        from skorch.callbacks import HistoryLogger
+        return HistoryLogger
+
+    @pytest.fixture
+    def net_cls(self):
+        """very simple network that trains for 5 epochs"""
+        from skorch.net import NeuralNetRegressor
+        import torch
+
+        class Module(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.p = torch.nn.Linear(1, 1)
+            # pylint: disable=arguments-differ
+            def forward(self, x):
+                return self.p(x)
+
+        return partial(
+            NeuralNetRegressor,
+            module=Module,
+            max_epochs=5,
+            batch_size=10)
+
+    @pytest.fixture(scope='module')
+    def data(self):
+        X = np.zeros((20, 1), dtype='float32')
+        y = np.zeros((20, 1), dtype='float32')
+        return X, y
+
+    @pytest.fixture
+    def f_log(self, tmpdir):
+        return str(tmpdir.join('history.jsonl'))
+
+    def test_all_epochs_logged(self, net_cls, history_logger_cls, data, f_log):
+        from skorch.history import History
+
+        net = net_cls(callbacks=[history_logger_cls(f_log)])
+        net.fit(*data)
+
+        history = History.from_log(f_log)
+        assert history.to_list() == net.history.to_list()
+
+    def test_keep_last_epochs_in_memory(
+            self, net_cls, history_logger_cls, data, f_log):
+        from skorch.history import LoggedEpoch
+
+        net = net_cls(callbacks=[history_logger_cls(f_log, keep_last=2)])
+        net.fit(*data)
+
+        types = [type(epoch) for epoch in list.__iter__(net.history)]
+        assert types == [LoggedEpoch] * 3 + [dict] * 2
+
+        # older epochs are read back from the log
+        assert len(net.history) == 5
+        assert net.history[:, 'epoch'] == [1, 2, 3, 4, 5]
+        assert len(net.history[:, 'batches', :, 'train_loss']) == 5
+
+    def test_continue_training_appends(
+            self, net_cls, history_logger_cls, data, f_log):
+        from skorch.history import History
+
+        net = net_cls(callbacks=[history_logger_cls(f_log, keep_last=1)])
+        net.fit(*data)
+        net.partial_fit(*data)
+
+        history = History.from_log(f_log)
+        assert history[:, 'epoch'] == list(range(1, 11))
+        assert history.to_list() == net.history.to_list()
+
+
+class TestBatchRetention:
+    @pytest.fixture
+    def batch_retention_cls(self):
+        from skorch.callbacks import BatchRetention
+        return BatchRetention
+
+    @pytest.fixture
+    def net_cls(self):
+        """very simple network that trains for 3 epochs"""
+        from skorch.net import NeuralNetRegressor
+        import torch
+
+        class Module(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.p = torch.nn.Linear(1, 1)
+            # pylint: disable=arguments-differ
+            def forward(self, x):
+                return self.p(x)
+
+        return partial(
+            NeuralNetRegressor,
+            module=Module,
+            max_epochs=3,
+            batch_size=2)
+
+    @pytest.fixture(scope='module')
+    def data(self):
+        X = np.zeros((20, 1), dtype='float32')
+        y = np.zeros((20, 1), dtype='float32')
+        return X, y
+
+    def test_epoch_scores_unchanged(self, net_cls, batch_retention_cls, data):
+        torch.manual_seed(0)
+        net = net_cls().fit(*data)
+        torch.manual_seed(0)
+        net_summary = net_cls(
+            callbacks=[batch_retention_cls('summary')]).fit(*data)
+
+        for key in ['train_loss', 'valid_loss']:
+            assert np.allclose(net.history[:, key],
+                               net_summary.history[:, key])
+        # 8 train and 2 valid batches
+        assert net_summary.history[:, 'n_batches'] == [10, 10, 10]
+        assert len(net_summary.history[-1, 'batches']) == 0
+
+    def test_every(self, net_cls, batch_retention_cls, data):
+        net = net_cls(callbacks=[batch_retention_cls('every', every=3)])
+        net.fit(*data)
+        assert [len(batches) for batches in net.history[:, 'batches']] == [
+            4, 4, 4]
+
+    def test_cyclic_lr_batch_idx_after_retention(
+            self, net_cls, batch_retention_cls, data):
+        from skorch.callbacks import LRScheduler
+
+        net = net_cls(callbacks=[batch_retention_cls('every', every=5)])
+        net.fit(*data)
+        scheduler = LRScheduler()
+        # pylint: disable=protected-access
+        assert scheduler._get_batch_idx(net) == 2 * 10 + 9
+
+
 class TestGradientNormClipping:
     @pytest.yield_fixture
     def grad_clip_cls_and_mock(self):
@@ -1,5 +1,9 @@
 """Tests for history.py."""
 
+import json
+import pickle
+
+import numpy as np
 import pytest
 
 from skorch.net import History
@@ -152,3 +156,317 @@ class TestHistory:
         # pylint: disable=unidiomatic-typecheck
         assert type(values) == tuple
         assert values == expected
+
+    def test_batches_stored_as_columns(self, history):
+        from skorch.history import BatchColumns
+
+        batches = history[0, 'batches']
+        assert isinstance(batches, BatchColumns)
+        assert batches.columns_['loss'].values.dtype == np.int64
+        assert batches.columns_['loss'].mask[:4].all()
+        assert batches.columns_['extra_batch'].mask[:4].tolist() == [
+            True, False, True, False]
+
+    def test_to_list_contains_plain_lists_and_dicts(self, history):
+        ref = history.to_list()
+        # pylint: disable=unidiomatic-typecheck
+        assert all(type(epoch['batches']) is list for epoch in ref)
+        assert ref[0]['batches'][0] == {'loss': 0, 'extra_batch': 23}
+        assert ref[0]['batches'][1] == {'loss': 1}
+        assert ref[2]['batches'][0] == {'loss': 2}
+        assert json.loads(json.dumps(ref)) == ref
+
+    def test_history_from_list_roundtrip(self, history):
+        ref = history.to_list()
+        history_new = History(ref)
+
+        assert history_new.to_list() == ref
+        assert history_new[:, 'batches', :, 'loss'] == (
+            history[:, 'batches', :, 'loss'])
+
+    def test_batch_values_keep_their_types(self):
+        h = History()
+        h.new_epoch()
+        values = [1, 2.5, True, 'foo', None, [1, 2]]
+        for value in values:
+            h.new_batch()
+            h.record_batch('mixed', value)
+            h.record_batch('int', 3)
+
+        assert h[-1, 'batches', :, 'mixed'] == values
+        assert [type(v) for v in h[-1, 'batches', :, 'mixed']] == (
+            [type(v) for v in values])
+        # pylint: disable=unidiomatic-typecheck
+        assert all(type(v) is int for v in h[-1, 'batches', :, 'int'])
+
+    def test_write_to_batch_row(self, history):
+        row = history[-1, 'batches', -1]
+        row['new_key'] = 123
+        row['loss'] = -1
+
+        assert history[-1, 'batches', -1, 'new_key'] == 123
+        assert history[-1, 'batches', :, 'loss'][-1] == -1
+        assert history[-1, 'batches', :, 'new_key'] == [123]
+
+        del row['new_key']
+        with pytest.raises(KeyError):
+            # pylint: disable=pointless-statement
+            history[-1, 'batches', -1, 'new_key']
+
+    def test_pickle_roundtrip(self, history):
+        history_new = pickle.loads(pickle.dumps(history))
+        assert history_new.to_list() == history.to_list()
+
+        # history can still grow after unpickling
+        history_new.new_batch()
+        history_new.record_batch('loss', 100)
+        assert history_new[-1, 'batches', -1, 'loss'] == 100
+
+    def test_legacy_list_batches_still_supported(self, history):
+        # e.g. histories pickled before batches were stored as columns
+        legacy = History()
+        legacy.extend(history.to_list())
+
+        assert legacy[:, 'batches', :, 'loss'] == (
+            history[:, 'batches', :, 'loss'])
+        legacy.new_batch()
+        legacy.record_batch('loss', 100)
+        assert legacy[-1, 'batches', -1, 'loss'] == 100
+
+    def test_batch_count(self, history):
+        batches = history[0, 'batches']
+        assert batches.count('loss') == 4
+        assert batches.count('extra_batch') == 2
+        assert batches.count('non-existing') == 0
+
+        del batches[0]['extra_batch']
+        assert batches.count('extra_batch') == 1
+
+    @pytest.mark.parametrize('weights_key', [None, 'extra_batch'])
+    def test_weighted_average(self, history, ref, weights_key):
+        batches = history[1, 'batches']
+        rows = [row for row in ref[1]['batches']
+                if weights_key is None or weights_key in row]
+        weights = [row[weights_key] if weights_key else 1 for row in rows]
+        expected = np.average([row['loss'] for row in rows], weights=weights)
+
+        assert np.isclose(batches.weighted_average('loss', weights_key),
+                          expected)
+
+    def test_weighted_average_updated_incrementally(self):
+        h = History()
+        h.new_epoch()
+        batches = h[-1, 'batches']
+        with pytest.raises(KeyError):
+            batches.weighted_average('loss', 'size')
+
+        h.new_batch()
+        h.record_batch('loss', 10)
+        h.record_batch('size', 1)
+        assert batches.weighted_average('loss', 'size') == 10
+
+        h.new_batch()
+        h.record_batch('loss', 40)
+        h.record_batch('size', 2)
+        assert batches.weighted_average('loss', 'size') == 30
+
+        # overwriting a value
+        h.record_batch('loss', 10)
+        assert batches.weighted_average('loss', 'size') == 10
+
+        # removing a value
+        del batches[-1]['size']
+        assert batches.weighted_average('loss', 'size') == 10
+        assert batches.weighted_average('loss') == 10
+
+    def test_aggregates_maintained_for_new_epoch(self, history):
+        history[-1, 'batches'].weighted_average('loss')
+        history.new_epoch()
+        batches = history[-1, 'batches']
+        assert batches.aggregate_keys() == [('loss', None)]
+
+        history.new_batch()
+        history.record_batch('loss', 3)
+        history.new_batch()
+        history.record_batch('loss', 5)
+        assert batches.weighted_average('loss') == 4
+
+    def test_weighted_average_non_numeric_raises(self):
+        h = History()
+        h.new_epoch()
+        h.new_batch()
+        h.record_batch('loss', 1.0)
+        assert h[-1, 'batches'].weighted_average('loss') == 1.0
+
+        h.new_batch()
+        h.record_batch('loss', 'foo')
+        with pytest.raises(TypeError):
+            h[-1, 'batches'].weighted_average('loss')
+
+    def test_log_completed_epochs(self, history, ref, tmpdir):
+        f = str(tmpdir.join('history.jsonl'))
+        history.log_to(f)
+        # the current epoch is not completed yet
+        assert History.from_log(f).to_list() == ref[:-1]
+
+        history.new_epoch()
+        history.record('np_value', np.float32(0.5))
+        assert History.from_log(f).to_list() == ref
+
+        history.flush()
+        assert History.from_log(f)[-1, 'np_value'] == 0.5
+
+    def test_log_keep_last(self, history, ref, tmpdir):
+        from skorch.history import LoggedEpoch
+
+        f = str(tmpdir.join('history.jsonl'))
+        history.log_to(f, keep_last=1)
+        assert isinstance(list.__getitem__(history, 0), LoggedEpoch)
+        assert isinstance(list.__getitem__(history, 1), LoggedEpoch)
+        assert isinstance(list.__getitem__(history, 2), dict)
+
+        # queries work as before
+        assert history.to_list() == ref
+        assert history[0, 'total_loss'] == ref[0]['total_loss']
+        assert history[:, 'extra'] == [42]
+        assert history[:, 'batches', :, 'loss'] == [
+            [b['loss'] for b in epoch['batches']] for epoch in ref]
+        assert history[0]['batches'] == ref[0]['batches']
+
+    def test_log_keep_last_invalid(self, history, tmpdir):
+        with pytest.raises(ValueError):
+            history.log_to(str(tmpdir.join('history.jsonl')), keep_last=0)
+
+    def test_retain_batches_all(self, history, ref):
+        history.retain_batches('all')
+        history.flush()
+        assert history.to_list() == ref
+
+    def test_retain_batches_every(self, history, ref):
+        history.retain_batches('every', every=2)
+        # the current epoch is not completed yet
+        assert len(history[0, 'batches']) == 2
+        assert len(history[-1, 'batches']) == 4
+
+        assert history[0, 'batches'] == ref[0]['batches'][::2]
+        assert history[0, 'n_batches'] == 4
+
+        history.flush()
+        assert history[-1, 'batches'] == ref[-1]['batches'][::2]
+
+        # applying the policy again doesn't drop more batches
+        history.retain_batches('every', every=2)
+        history.flush()
+        assert history[-1, 'batches'] == ref[-1]['batches'][::2]
+
+    def test_retain_batches_reservoir(self, history, ref):
+        history.retain_batches('reservoir', size=3, random_state=0)
+        history.flush()
+
+        for epoch, epoch_ref in zip(history, ref):
+            batches = epoch['batches'].to_list()
+            assert len(batches) == 3
+            assert all(batch in epoch_ref['batches'] for batch in batches)
+
+    def test_retain_batches_summary(self, history):
+        history.retain_batches('summary')
+        history.flush()
+
+        assert history[:, 'n_batches'] == [4, 4, 4]
+        assert all(len(batches) == 0 for batches in history[:, 'batches'])
+        summary = history[0, 'batches_summary']
+        assert summary['loss'] == {
+            'count': 4, 'mean': 1.5, 'std': np.std([0, 1, 2, 3]),
+            'min': 0.0, 'max': 3.0}
+        assert summary['extra_batch']['count'] == 2
+        assert 'extra_batch' not in history[-1, 'batches_summary']
+
+    def test_retain_batches_new_epoch_keeps_current(self, history):
+        history.retain_batches('summary')
+        history.new_epoch()
+        history.new_batch()
+        history.record_batch('loss', 1)
+        # batches of the current epoch are still available
+        assert history[-1, 'batches', :, 'loss'] == [1]
+        assert 'batches_summary' in history[-2]
+
+    @pytest.mark.parametrize('kwargs', [
+        {'policy': 'unknown'},
+        {'policy': 'every'},
+        {'policy': 'every', 'every': 0},
+        {'policy': 'reservoir'},
+    ])
+    def test_retain_batches_invalid(self, history, kwargs):
+        with pytest.raises(ValueError):
+            history.retain_batches(**kwargs)
+
+    @pytest.mark.parametrize('mmap_mode', [None, 'r', 'c'])
+    def test_npz_roundtrip(self, history, ref, tmpdir, mmap_mode):
+        history.new_epoch()
+        history.record('np_value', np.float32(0.5))
+        history.new_batch()
+        history.record_batch('loss', 0.5)
+        history.record_batch('name', 'foo')
+        history.record_batch('flag', True)
+        f = str(tmpdir.join('history.npz'))
+        history.to_npz(f)
+
+        history_new = History.from_npz(f, mmap_mode=mmap_mode)
+        assert history_new.to_list() == history.to_list()
+        assert history_new[:, 'batches', :, 'loss'] == (
+            history[:, 'batches', :, 'loss'])
+
+    def test_npz_memory_mapped(self, history, tmpdir):
+        f = str(tmpdir.join('history.npz'))
+        history.to_npz(f)
+
+        history_new = History.from_npz(f, mmap_mode='c')
+        values = history_new[0, 'batches'].columns_['loss'].values
+        assert isinstance(values, np.memmap)
+
+        # copy on write: history can be changed and grow
+        history_new[0, 'batches'][0]['loss'] = 100
+        history_new.new_batch()
+        history_new.record_batch('loss', 200)
+        assert history_new[0, 'batches', 0, 'loss'] == 100
+        assert history_new[-1, 'batches', -1, 'loss'] == 200
+        assert History.from_npz(f)[0, 'batches', 0, 'loss'] == 0
+
+    def test_npz_file_obj(self, history, tmpdir):
+        f = str(tmpdir.join('history.npz'))
+        with open(f, 'wb') as fp:
+            history.to_npz(fp)
+        with open(f, 'rb') as fp:
+            history_new = History.from_npz(fp)
+        assert history_new.to_list() == history.to_list()
+
+    def test_npz_logged_epochs(self, history, ref, tmpdir):
+        history.log_to(str(tmpdir.join('history.jsonl')), keep_last=1)
+        f = str(tmpdir.join('history.npz'))
+        history.to_npz(f)
+        assert History.from_npz(f).to_list() == ref
+
+    def test_to_arrays(self, history, ref):
+        arrays = history.to_arrays()
+
+        assert arrays['epoch_idx'].tolist() == [0] * 4 + [1] * 4 + [2] * 4
+        assert arrays['loss'].tolist() == [
+            b['loss'] for epoch in ref for b in epoch['batches']]
+        assert arrays['extra_batch'].tolist() == (
+            [23, None, 23, None] * 2 + [None] * 4)
+
+    def test_to_dataframe(self, history, ref):
+        pytest.importorskip('pandas')
+
+        df = history.to_dataframe()
+        assert df['total_loss'].tolist() == [n['total_loss'] for n in ref]
+        assert 'batches' not in df
+
+        df = history.to_dataframe('batch')
+        assert len(df) == 12
+        assert df['loss'].tolist() == [
+            b['loss'] for epoch in ref for b in epoch['batches']]
+        assert df['extra_batch'].isnull().sum() == 8
+
+        with pytest.raises(ValueError):
+            history.to_dataframe('unknown')
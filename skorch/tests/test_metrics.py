@@ -0,0 +1,269 @@
+"""Tests for metrics.py"""
+
+import numpy as np
+import pytest
+from sklearn import metrics
+import torch
+
+
+def update_in_batches(metric, y_true, y_pred, batch_size=64):
+    for i in range(0, len(y_true), batch_size):
+        metric.update(y_true[i:i + batch_size], y_pred[i:i + batch_size])
+    return metric
+
+
+class TestStreamingMetrics:
+    @pytest.fixture(scope='module')
+    def multiclass_data(self):
+        rng = np.random.RandomState(0)
+        y_true = rng.randint(0, 4, 500)
+        y_proba = rng.dirichlet(np.ones(4), 500)
+        return y_true, y_proba
+
+    @pytest.fixture(scope='module')
+    def binary_data(self):
+        rng = np.random.RandomState(1)
+        y_true = rng.randint(0, 2, 500)
+        y_proba = np.clip(0.3 * y_true + 0.7 * rng.rand(500), 0, 1)
+        return y_true, y_proba
+
+    @pytest.fixture(scope='module')
+    def regression_data(self):
+        rng = np.random.RandomState(2)
+        return rng.randn(500), rng.randn(500, 1)
+
+    def test_accuracy(self, multiclass_data):
+        from skorch.metrics import Accuracy
+
+        y_true, y_proba = multiclass_data
+        score = update_in_batches(Accuracy(), y_true, y_proba).compute()
+        expected = metrics.accuracy_score(y_true, y_proba.argmax(1))
+        assert np.isclose(score, expected)
+
+    @pytest.mark.parametrize('k', [1, 2, 3])
+    def test_top_k_accuracy(self, multiclass_data, k):
+        from skorch.metrics import TopKAccuracy
+
+        y_true, y_proba = multiclass_data
+        score = update_in_batches(TopKAccuracy(k=k), y_true, y_proba).compute()
+        expected = metrics.top_k_accuracy_score(y_true, y_proba, k=k)
+        assert np.isclose(score, expected)
+
+    def test_log_loss_multiclass(self, multiclass_data):
+        from skorch.metrics import LogLoss
+
+        y_true, y_proba = multiclass_data
+        score = update_in_batches(LogLoss(), y_true, y_proba).compute()
+        assert np.isclose(score, metrics.log_loss(y_true, y_proba))
+
+    def test_log_loss_binary(self, binary_data):
+        from skorch.metrics import LogLoss
+
+        y_true, y_proba = binary_data
+        score = update_in_batches(LogLoss(), y_true, y_proba).compute()
+        assert np.isclose(score, metrics.log_loss(y_true, y_proba))
+
+    @pytest.mark.parametrize('metric_name, sklearn_metric', [
+        ('MeanSquaredError', metrics.mean_squared_error),
+        ('MeanAbsoluteError', metrics.mean_absolute_error),
+    ])
+    def test_regression(self, regression_data, metric_name, sklearn_metric):
+        import skorch.metrics
+
+        y_true, y_pred = regression_data
+        metric = getattr(skorch.metrics, metric_name)()
+        score = update_in_batches(metric, y_true, y_pred).compute()
+        assert np.isclose(score, sklearn_metric(y_true, y_pred[:, 0]))
+
+    def test_r2(self, regression_data):
+        from skorch.metrics import R2
+
+        y_true, y_pred = regression_data
+        score = update_in_batches(R2(), y_true, y_pred).compute()
+        assert np.isclose(score, metrics.r2_score(y_true, y_pred[:, 0]))
+
+    def test_r2_multioutput(self):
+        from skorch.metrics import R2
+
+        rng = np.random.RandomState(3)
+        y_true = rng.randn(500, 3) * [1, 10, 100] + [0, 1e4, -5]
+        y_pred = y_true + rng.randn(500, 3)
+        score = update_in_batches(R2(), y_true, y_pred).compute()
+        assert np.isclose(score, metrics.r2_score(y_true, y_pred))
+
+    def test_r2_constant_target(self):
+        from skorch.metrics import R2
+
+        y_true = np.ones(10)
+        assert R2().update(y_true, y_true).compute() == 1.0
+        assert R2().update(y_true, y_true + 1).compute() == 0.0
+
+    def test_confusion_matrix(self, multiclass_data):
+        from skorch.metrics import ConfusionMatrix
+
+        y_true, y_proba = multiclass_data
+        matrix = update_in_batches(
+            ConfusionMatrix(), y_true, y_proba).compute()
+        expected = metrics.confusion_matrix(y_true, y_proba.argmax(1))
+        assert (matrix == expected).all()
+
+    @pytest.mark.parametrize('metric_name, sklearn_metric', [
+        ('Precision', metrics.precision_score),
+        ('Recall', metrics.recall_score),
+        ('F1', metrics.f1_score),
+    ])
+    @pytest.mark.parametrize('average', ['micro', 'macro', 'weighted'])
+    def test_confusion_matrix_scores_multiclass(
+            self, multiclass_data, metric_name, sklearn_metric, average):
+        import skorch.metrics
+
+        y_true, y_proba = multiclass_data
+        metric = getattr(skorch.metrics, metric_name)(average=average)
+        score = update_in_batches(metric, y_true, y_proba).compute()
+        expected = sklearn_metric(y_true, y_proba.argmax(1), average=average)
+        assert np.isclose(score, expected)
+
+    @pytest.mark.parametrize('metric_name, sklearn_metric', [
+        ('Precision', metrics.precision_score),
+        ('Recall', metrics.recall_score),
+        ('F1', metrics.f1_score),
+    ])
+    def test_confusion_matrix_scores_binary(
+            self, binary_data, metric_name, sklearn_metric):
+        import skorch.metrics
+
+        y_true, y_proba = binary_data
+        y_pred = (y_proba > 0.5).astype(int)
+        metric = getattr(skorch.metrics, metric_name)()
+        score = update_in_batches(metric, y_true, y_pred).compute()
+        assert np.isclose(score, sklearn_metric(y_true, y_pred))
+
+    def test_roc_auc_close_to_exact(self, binary_data):
+        from skorch.metrics import ROCAUC
+
+        y_true, y_proba = binary_data
+        score = update_in_batches(ROCAUC(), y_true, y_proba).compute()
+        assert np.isclose(score, metrics.roc_auc_score(y_true, y_proba),
+                          atol=1e-3)
+
+    def test_roc_auc_exact_without_shared_bins(self):
+        from skorch.metrics import ROCAUC
+
+        y_true = np.array([0, 0, 1, 1, 0, 1])
+        y_proba = np.array([0.1, 0.4, 0.35, 0.8, 0.2, 0.9])
+        score = ROCAUC(n_bins=100).update(y_true, y_proba).compute()
+        assert np.isclose(score, metrics.roc_auc_score(y_true, y_proba))
+
+    def test_binary_average_with_multiclass_raises(self, multiclass_data):
+        from skorch.metrics import F1
+
+        y_true, y_proba = multiclass_data
+        with pytest.raises(ValueError):
+            F1().update(y_true, y_proba).compute()
+
+    def test_roc_auc_outside_unit_interval_raises(self):
+        from skorch.metrics import ROCAUC
+
+        with pytest.raises(ValueError):
+            ROCAUC().update([0, 1], [-2.3, 1.5]).compute()
+
+    def test_roc_auc_one_class_raises(self):
+        from skorch.metrics import ROCAUC
+
+        with pytest.raises(ValueError):
+            ROCAUC().update([1, 1], [0.2, 0.7]).compute()
+
+    @pytest.mark.parametrize('metric_name', [
+        'Accuracy', 'LogLoss', 'ConfusionMatrix', 'F1', 'ROCAUC'])
+    def test_merge_same_as_single_metric(self, binary_data, metric_name):
+        import skorch.metrics
+
+        cls = getattr(skorch.metrics, metric_name)
+        y_true, y_proba = binary_data
+        y_proba = np.stack([1 - y_proba, y_proba], axis=1)
+
+        expected = cls().update(y_true, y_proba).compute()
+        metric = cls().update(y_true[:200], y_proba[:200])
+        metric.merge(cls().update(y_true[200:], y_proba[200:]))
+        assert np.allclose(metric.compute(), expected)
+
+    def test_merge_different_metrics_raises(self):
+        from skorch.metrics import Accuracy
+        from skorch.metrics import LogLoss
+
+        with pytest.raises(TypeError):
+            Accuracy().merge(LogLoss())
+
+    def test_reset(self, multiclass_data):
+        from skorch.metrics import Accuracy
+
+        y_true, y_proba = multiclass_data
+        metric = Accuracy().update(y_true, y_proba)
+        metric.reset()
+        with pytest.raises(ValueError):
+            metric.compute()
+
+    @pytest.mark.parametrize('metric_name', [
+        'Accuracy', 'TopKAccuracy', 'LogLoss', 'F1', 'ROCAUC'])
+    def test_tensors_same_as_arrays(self, multiclass_data, metric_name):
+        import skorch.metrics
+
+        cls = getattr(skorch.metrics, metric_name)
+        y_true, y_proba = multiclass_data
+        # binary problem so that all metrics are defined
+        y_true = (y_true == 0).astype(int)
+        y_proba = np.stack([1 - y_proba[:, 0], y_proba[:, 0]], axis=1)
+
+        expected = update_in_batches(cls(), y_true, y_proba).compute()
+        score = update_in_batches(
+            cls(), torch.as_tensor(y_true),
+            torch.as_tensor(y_proba, dtype=torch.float32)).compute()
+        assert np.isclose(score, expected)
+
+    @pytest.mark.skipif(not torch.cuda.is_available(), reason="no cuda")
+    @pytest.mark.parametrize('metric_name', [
+        'Accuracy', 'F1', 'R2', 'ROCAUC'])
+    def test_state_stays_on_device(self, binary_data, metric_name):
+        import skorch.metrics
+
+        cls = getattr(skorch.metrics, metric_name)
+        y_true, y_proba = binary_data
+        expected = cls().update(y_true, y_proba).compute()
+
+        metric = cls().update(
+            torch.as_tensor(y_true), torch.as_tensor(y_proba).cuda())
+        tensors = [v for v in vars(metric).values()
+                   if isinstance(v, torch.Tensor)]
+        assert tensors
+        assert all(v.is_cuda for v in tensors)
+        assert np.isclose(metric.compute(), expected)
+
+
+class TestGetMetric:
+    @pytest.mark.parametrize('scoring, task, cls_name, average', [
+        ('accuracy', 'classification', 'Accuracy', None),
+        ('top_k_accuracy', 'classification', 'TopKAccuracy', None),
+        ('roc_auc', 'classification', 'ROCAUC', None),
+        ('f1', 'classification', 'F1', 'binary'),
+        ('f1_macro', 'classification', 'F1', 'macro'),
+        ('precision_micro', 'classification', 'Precision', 'micro'),
+        ('recall_weighted', 'classification', 'Recall', 'weighted'),
+        ('r2', 'regression', 'R2', None),
+    ])
+    def test_known_scorers(self, scoring, task, cls_name, average):
+        import skorch.metrics
+
+        metric = skorch.metrics.get_metric(scoring, task)
+        assert type(metric) is getattr(skorch.metrics, cls_name)
+        if average is not None:
+            assert metric.average == average
+
+    @pytest.mark.parametrize('scoring, task', [
+        ('neg_median_absolute_error', 'regression'),
+        ('r2', 'classification'),
+        ('accuracy', 'regression'),
+    ])
+    def test_unknown_scorers(self, scoring, task):
+        from skorch.metrics import get_metric
+
+        assert get_metric(scoring, task) is None
@@ -1,6 +1,7 @@
 """Tests for net.py"""
 
 from functools import partial
+import json
 import pickle
 from unittest.mock import Mock
 from unittest.mock import patch
@@ -190,6 +191,255 @@ class TestNeuralNet:
         y_pred = net_fit.predict(X)
         assert np.allclose(np.argmax(y_proba, 1), y_pred, rtol=1e-7)
 
+    def test_predict_proba_same_as_forward(self, net_fit, data):
+        X = data[0]
+        y_proba = net_fit.predict_proba(X)
+        assert y_proba.shape == (len(X), 2)
+        assert np.allclose(y_proba, to_numpy(net_fit.forward(X)))
+
+    @pytest.mark.parametrize('method', ['predict_proba', 'predict'])
+    def test_predict_into_out(self, net_fit, data, method):
+        X = data[0]
+        expected = getattr(net_fit, method)(X)
+        out = np.zeros_like(expected)
+        result = getattr(net_fit, method)(X, out=out)
+        assert result is out
+        assert (out == expected).all()
+
+    def test_predict_proba_does_not_concatenate(self, net_fit, data):
+        X = data[0]
+        with patch('numpy.concatenate', side_effect=AssertionError):
+            y_proba = net_fit.predict_proba(X)
+            y_pred = net_fit.predict(X)
+        assert len(y_proba) == len(y_pred) == len(X)
+
+    @pytest.mark.parametrize('shape, msg', [
+        ((10, 3), "out should have shape (n_samples, 2)"),
+        ((10, 2), "out has room for 10 samples, but there are more"),
+        ((2000, 2), "out has room for 2000 samples, but there are only"),
+    ])
+    def test_predict_proba_out_wrong_shape_raises(
+            self, net_fit, data, shape, msg):
+        X = data[0]
+        out = np.zeros(shape, dtype=np.float32)
+        with pytest.raises(ValueError) as exc:
+            net_fit.predict_proba(X, out=out)
+        assert str(exc.value).startswith(msg)
+
+    @pytest.fixture
+    def interrupted_net(self, net_cls, module_cls):
+        """Return a function that makes a net fail on the n-th batch of
+        the next inference and count the batches."""
+        net = net_cls(module_cls, predict_batch_size=128).initialize()
+
+        def interrupt_at(n):
+            evaluation_step = type(net).evaluation_step
+
+            def step(Xi, training=False):
+                net.batches_seen += 1
+                if net.batches_seen == n:
+                    raise KeyboardInterrupt
+                return evaluation_step(net, Xi, training=training)
+            net.evaluation_step = step
+            net.batches_seen = 0
+            return net
+
+        return interrupt_at
+
+    def test_predict_proba_to_file(self, net_fit, data, tmpdir):
+        X = data[0]
+        f = tmpdir.join('y_proba.npy')
+        y_proba = net_fit.predict_proba_to_file(X, str(f))
+        assert isinstance(y_proba, np.memmap)
+        assert np.allclose(y_proba, net_fit.predict_proba(X))
+        assert np.allclose(np.load(str(f)), y_proba)
+        assert tmpdir.listdir() == [f]
+
+    def test_predict_proba_to_file_resume(
+            self, interrupted_net, data, tmpdir):
+        X = data[0]
+        f = str(tmpdir.join('y_proba.npy'))
+        net = interrupted_net(5)
+        with pytest.raises(KeyboardInterrupt):
+            net.predict_proba_to_file(X, f)
+        with open(f + '.progress') as fp:
+            assert json.load(fp) == {'n_samples': 4 * 128}
+
+        net = interrupted_net(0)
+        y_proba = net.predict_proba_to_file(X, f)
+        assert net.batches_seen == 8 - 4
+        del net.evaluation_step
+        assert np.allclose(y_proba, net.predict_proba(X))
+        assert not tmpdir.join('y_proba.npy.progress').exists()
+
+        # complete, nothing is computed
+        net = interrupted_net(0)
+        net.predict_proba_to_file(X, f)
+        assert net.batches_seen == 0
+
+    def test_predict_proba_to_file_wrong_length_raises(
+            self, net_fit, data, tmpdir):
+        X = data[0]
+        f = str(tmpdir.join('y_proba.npy'))
+        net_fit.predict_proba_to_file(X[:100], f)
+        with pytest.raises(ValueError) as exc:
+            net_fit.predict_proba_to_file(X, f)
+        assert 'use resume=False to overwrite it' in str(exc.value)
+        y_proba = net_fit.predict_proba_to_file(X, f, resume=False)
+        assert len(y_proba) == len(X)
+
+    def test_predict_proba_to_shards(self, net_fit, data, tmpdir):
+        X = data[0]
+        shards = net_fit.predict_proba_to_file(
+            X, str(tmpdir), shard_size=300)
+        assert [Path(shard).name for shard in shards] == [
+            'part-00000.npy', 'part-00001.npy', 'part-00002.npy',
+            'part-00003.npy']
+        y_probas = [np.load(shard) for shard in shards]
+        assert [len(y_proba) for y_proba in y_probas] == [300, 300, 300, 100]
+        assert np.allclose(
+            np.concatenate(y_probas), net_fit.predict_proba(X))
+
+    def test_predict_proba_to_shards_resume(
+            self, interrupted_net, data, tmpdir):
+        X = data[0]
+        net = interrupted_net(7)
+        with pytest.raises(KeyboardInterrupt):
+            net.predict_proba_to_file(X, str(tmpdir), shard_size=300)
+        # 6 batches of 128 samples make 2 complete shards
+        assert sorted(p.basename for p in tmpdir.listdir()) == [
+            'part-00000.npy', 'part-00001.npy']
+
+        net = interrupted_net(0)
+        shards = net.predict_proba_to_file(X, str(tmpdir), shard_size=300)
+        assert len(shards) == 4
+        # the remaining 400 samples
+        assert net.batches_seen == 4
+        del net.evaluation_step
+        assert np.allclose(
+            np.concatenate([np.load(shard) for shard in shards]),
+            net.predict_proba(X))
+
+        shards = net.predict_proba_to_file(
+            X[:500], str(tmpdir), shard_size=300, resume=False)
+        assert sorted(p.basename for p in tmpdir.listdir()) == [
+            'part-00000.npy', 'part-00001.npy']
+
+    @pytest.mark.parametrize('make_X', [
+        lambda X: X,
+        torch.as_tensor,
+        lambda X: {'X': X},
+        lambda X: [X],
+    ])
+    def test_predict_slices_batches(self, net_cls, data, make_X):
+        from skorch.dataset import Dataset
+
+        class MyModule(nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.dense = nn.Linear(20, 2)
+
+            def forward(self, X):
+                X = X[0] if isinstance(X, list) else X
+                return F.softmax(self.dense(X), dim=-1)
+
+        net = net_cls(MyModule, predict_batch_size=300).initialize()
+        X = data[0]
+        y_expected = net.predict_proba(Dataset(X))
+
+        X = make_X(X)
+        with patch.object(Dataset, '__getitem__') as getitem:
+            y_proba = net.predict_proba(X)
+            sizes = [len(yp) for yp in net.forward_iter(X)]
+        assert not getitem.called
+        assert np.allclose(y_proba, y_expected)
+        assert sizes == [300, 300, 300, 100]
+
+    @pytest.mark.parametrize('kwargs, sizes', [
+        ({'predict_batch_size': -1}, [1000]),
+        ({'predict_batch_size': None}, [400, 400, 200]),
+        ({'predict_batch_size': None, 'iterator_valid__batch_size': 300},
+         [300, 300, 300, 100]),
+    ])
+    def test_predict_batch_size(
+            self, net_cls, module_cls, data, kwargs, sizes):
+        net = net_cls(module_cls, batch_size=400, **kwargs).initialize()
+        assert [len(yp) for yp in net.forward_iter(data[0])] == sizes
+
+    def test_predict_custom_iterator_uses_dataset(
+            self, net_cls, module_cls, data):
+        from torch.utils.data.dataloader import default_collate
+        collate_fn = Mock(side_effect=default_collate)
+        net = net_cls(
+            module_cls, iterator_valid__collate_fn=collate_fn).initialize()
+        net.predict_proba(data[0])
+        # batches of the validation batch size
+        assert collate_fn.call_count == 8
+
+    def test_predict_inference_mode_does_not_modify_X(self, net_cls, data):
+        class InPlace(nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.dense = nn.Linear(20, 2)
+
+            def forward(self, X):
+                return F.softmax(self.dense(X.mul_(0)), dim=-1)
+
+        net = net_cls(InPlace).initialize()
+        X = torch.as_tensor(data[0])
+        X_copy = X.clone()
+        for yp in net.forward_iter(X):
+            if hasattr(torch, 'is_inference'):
+                assert torch.is_inference(yp)
+            # the grad mode doesn't leak out of the generator
+            assert torch.is_grad_enabled()
+        assert (X == X_copy).all()
+
+    def test_module_mode_not_toggled_per_batch(
+            self, net_cls, module_cls, data):
+        net = net_cls(module_cls, predict_batch_size=100).initialize()
+        train = Mock(wraps=net.module_.train)
+        with patch.object(net.module_, 'train', train):
+            net.predict_proba(data[0])
+            net.predict_proba(data[0])
+        assert train.call_count == 1
+
+    def test_predict_one_and_batch(self, net_fit, data):
+        X = data[0]
+        y_proba = net_fit.predict_proba(X[:10])
+        y_pred = net_fit.predict(X[:10])
+
+        assert np.allclose(net_fit.predict_proba_batch(X[:10]), y_proba)
+        assert (net_fit.predict_batch(X[:10]) == y_pred).all()
+        assert np.allclose(net_fit.predict_proba_one(X[3]), y_proba[3])
+        assert net_fit.predict_one(X[3]) == y_pred[3]
+        assert net_fit.predict_one(torch.as_tensor(X[3])) == y_pred[3]
+
+    def test_predict_one_without_dataset_and_iterator(self, net_fit, data):
+        with patch('skorch.net.Dataset') as dataset:
+            with patch.object(net_fit, 'get_iterator') as get_iterator:
+                y_proba = net_fit.predict_proba_one(data[0][0])
+        assert y_proba.shape == (2,)
+        assert not dataset.called
+        assert not get_iterator.called
+
+    def test_predict_one_multiple_inputs(self, net_cls, data):
+        class TwoInputs(nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.dense = nn.Linear(20, 2)
+
+            def forward(self, X0, X1):
+                return F.softmax(self.dense(X0 + X1), dim=-1)
+
+        net = net_cls(TwoInputs).initialize()
+        X = data[0][:5]
+        X_dict = {'X0': X, 'X1': X}
+        y_proba = net.predict_proba(X_dict)
+        assert np.allclose(net.predict_proba_batch(X_dict), y_proba)
+        assert np.allclose(
+            net.predict_proba_one({'X0': X[1], 'X1': X[1]}), y_proba[1])
+
     def test_dropout(self, net_fit, data):
         # Note: does not test that dropout is really active during
         # training.
@@ -219,6 +469,93 @@ class TestNeuralNet:
         score_after = accuracy_score(y, net_new.predict(X))
         assert np.isclose(score_after, score_before)
 
+    def test_quantize_dynamic(self, net_fit, data):
+        X, y = data
+        net_q = net_fit.quantize(X, y, scoring='accuracy')
+
+        # the original net is not modified
+        assert type(net_fit.module_.dense0) is nn.Linear
+        assert net_q.module_.dense0._get_name() == 'DynamicQuantizedLinear'
+        assert net_q.module is net_q.module_
+        assert not hasattr(net_q, 'optimizer_')
+
+        report = net_q.quantization_report_
+        assert np.isclose(
+            report['score'], accuracy_score(y, net_fit.predict(X)))
+        assert np.isclose(
+            report['score_quantized'], accuracy_score(y, net_q.predict(X)))
+        assert abs(report['score_delta']) < 0.05
+        assert np.allclose(
+            net_q.predict_proba(X), net_fit.predict_proba(X), atol=0.05)
+
+    def test_quantize_report_loss_by_default(self, net_fit, data):
+        X, y = data
+        report = net_fit.quantize(X[:200], y[:200]).quantization_report_
+        assert np.isclose(
+            report['score'],
+            net_fit.get_loss(net_fit.forward(X[:200]), y[:200]).item(),
+            rtol=1e-4)
+        assert np.isclose(
+            report['score_delta'],
+            report['score_quantized'] - report['score'])
+
+    def test_quantize_without_validation_data(self, net_cls):
+        module = nn.Sequential(
+            nn.Linear(20, 500), nn.Linear(500, 2), nn.Softmax(dim=-1))
+        report = net_cls(module).initialize().quantize().quantization_report_
+        assert set(report) == {'nbytes', 'nbytes_quantized'}
+        # int8 instead of float32 weights
+        assert report['nbytes_quantized'] < report['nbytes'] / 2
+
+    def test_quantize_static_calibrates_with_forward_iter(
+            self, net_cls, module_cls, data):
+        X, y = data
+        calibrated = []
+
+        class MyNet(net_cls):
+            def forward_iter(self, X, *args, **kwargs):
+                calibrated.append(len(X))
+                return super().forward_iter(X, *args, **kwargs)
+
+        net = MyNet(module_cls, max_epochs=5, lr=0.1).fit(X, y)
+        calibrated.clear()
+        net_q = net.quantize(X, y, scoring='accuracy', X_calibrate=X[:300])
+
+        assert calibrated[0] == 300
+        assert isinstance(net_q.module_, torch.fx.GraphModule)
+        assert abs(net_q.quantization_report_['score_delta']) < 0.05
+
+    def test_quantize_save_and_load_params(
+            self, net_cls, module_cls, net_fit, data, tmpdir):
+        X = data[0]
+        net_q = net_fit.quantize()
+        p = tmpdir.mkdir('skorch').join('quantized.pt')
+        net_q.save_params(str(p))
+
+        other = net_cls(module_cls).initialize().quantize()
+        assert not np.allclose(other.predict_proba(X), net_q.predict_proba(X))
+
+        other.load_params(str(p))
+        assert np.allclose(other.predict_proba(X), net_q.predict_proba(X))
+
+    def test_quantize_pickle_save_load(self, net_pickleable, data, tmpdir):
+        X = data[0]
+        net_q = net_pickleable.quantize()
+        y_proba = net_q.predict_proba(X)
+
+        p = tmpdir.mkdir('skorch').join('quantized.pkl')
+        with open(str(p), 'wb') as f:
+            pickle.dump(net_q, f)
+        with open(str(p), 'rb') as f:
+            net_new = pickle.load(f)
+
+        assert np.allclose(net_new.predict_proba(X), y_proba)
+
+    def test_quantize_not_initialized_raises(self, net_cls, module_cls):
+        from skorch.exceptions import NotInitializedError
+        with pytest.raises(NotInitializedError):
+            net_cls(module_cls).quantize()
+
     @pytest.mark.parametrize('device', ['cpu', 'cuda'])
     def test_device_torch_device(self, net_cls, module_cls, device):
         # Check if native torch.device works as well.
@@ -376,6 +713,20 @@ class TestNeuralNet:
 
         assert net.history == history_before
 
+    @pytest.mark.parametrize('converter', [str, Path])
+    @pytest.mark.parametrize('mmap_mode', [None, 'r'])
+    def test_save_load_history_npz(
+            self, net_cls, module_cls, net_fit, tmpdir, converter, mmap_mode):
+        net = net_cls(module_cls).initialize()
+        history_before = net_fit.history
+
+        p = tmpdir.mkdir('skorch').join('history.npz')
+        net_fit.save_history(converter(p))
+        net.load_history(converter(p), mmap_mode=mmap_mode)
+
+        assert net.history == history_before
+        assert net.history.to_list() == history_before.to_list()
+
     @pytest.mark.parametrize('method, call_count', [
         ('on_train_begin', 1),
         ('on_train_end', 1),
@@ -802,6 +1153,53 @@ class TestNeuralNet:
         for p0, p1 in zip(params_before, params_after):
             assert (p0 == p1).data.all()
 
+    def test_fit_sample_budget_stops_at_batch_boundary(
+            self, net_cls, module_cls, data):
+        from skorch.callbacks import EpochScoring
+
+        net = net_cls(
+            module_cls,
+            batch_size=128,
+            callbacks=[EpochScoring(
+                'accuracy', name='train_acc', on_train=True,
+                lower_is_better=False)],
+        )
+        # 800 training samples per epoch, 128 samples per batch
+        net.fit(*data, sample_budget=1000)
+
+        assert len(net.history) == 2
+        assert net.history[:, 'batches', :, 'train_batch_size'][1] == [128, 128]
+        # validation is still performed for the last epoch
+        assert len(net.history[:, 'valid_loss']) == 2
+        # not enough cached train predictions, no score recorded
+        assert len(net.history[:, 'train_acc']) == 1
+
+    def test_fit_time_budget_stops_at_batch_boundary(
+            self, net_cls, module_cls, data):
+        from itertools import count
+
+        net = net_cls(module_cls, batch_size=128, max_epochs=10)
+        # each call to time advances the clock by one second
+        with patch('skorch.net.time') as time_mock:
+            time_mock.time.side_effect = count()
+            net.fit(*data, time_budget=1.5)
+
+        assert len(net.history) == 1
+        assert len(net.history[-1, 'batches', :, 'train_loss']) == 1
+        assert 'valid_loss' in net.history[-1]
+
+    @pytest.mark.parametrize('dur, expected', [(10, False), (1, True)])
+    def test_epoch_forecast_uses_last_duration(
+            self, net_cls, module_cls, dur, expected):
+        import time
+
+        net = net_cls(module_cls).initialize()
+        net.history.new_epoch()
+        net.history.record('dur', dur)
+        fits = net._epoch_fits_budget(
+            time.time(), time_budget=5, samples_seen=0, sample_budget=None)
+        assert fits is expected
+
     @pytest.mark.skipif(not torch.cuda.is_available(), reason="no cuda device")
     def test_binary_classification_with_cuda(self, net_cls, module_cls, data):
         X, y = data
@@ -825,8 +1223,6 @@ class TestNeuralNet:
             dataset=MyDataset,
             dataset__foo=123,
             max_epochs=1,
-            callbacks__train_loss__use_caching=use_caching,
-            callbacks__valid_loss__use_caching=use_caching,
             callbacks__valid_acc__use_caching=use_caching,
         )
         net.fit(*data)
@@ -1116,7 +1512,8 @@ class TestNeuralNet:
 
         assert isinstance(y_infer, tuple)
         assert len(y_infer) == 3
-        assert y_infer[0].shape[0] == min(len(X), multiouput_net.batch_size)
+        assert y_infer[0].shape[0] == min(
+            len(X), multiouput_net.predict_batch_size)
 
     def test_multioutput_forward(self, multiouput_net, data):
         X = data[0]
@@ -1171,6 +1568,61 @@ class TestNeuralNet:
         assert y_proba.min() >= 0
         assert y_proba.max() <= 1
 
+    def test_multioutput_forward_selected_outputs(self, multiouput_net, data):
+        X = data[0]
+        y_all = multiouput_net.forward(X)
+
+        y_infer = multiouput_net.forward(X, outputs=1)
+        assert torch.allclose(y_infer, y_all[1])
+
+        y_infer = multiouput_net.forward(X, outputs=[2, 0])
+        assert isinstance(y_infer, tuple)
+        assert torch.allclose(y_infer[0], y_all[2])
+        assert torch.allclose(y_infer[1], y_all[0])
+
+    def test_multioutput_forward_iter_reducer(self, multiouput_net, data):
+        X = data[0]
+        y_infer = list(multiouput_net.forward_iter(
+            X, outputs=[0, 0], reducer=[
+                lambda y: y.argmax(-1),
+                lambda y: y.topk(1, dim=-1).values,
+            ]))
+        y_pred = torch.cat([yp[0] for yp in y_infer])
+        y_top = torch.cat([yp[1] for yp in y_infer])
+
+        assert (y_pred.numpy() == multiouput_net.predict(X)).all()
+        assert np.allclose(
+            y_top.numpy()[:, 0], multiouput_net.predict_proba(X).max(-1))
+
+    def test_multioutput_predict_proba_moves_only_first_output(
+            self, multiouput_net, data):
+        from skorch.utils import to_device
+
+        with patch('skorch.net.to_device', wraps=to_device) as mock:
+            multiouput_net.predict_proba(data[0])
+        assert mock.call_count > 0
+        assert all(isinstance(call_args[0][0], torch.Tensor)
+                   for call_args in mock.call_args_list)
+
+    def test_forward_named_outputs(self, net_cls, data):
+        class DictOutput(nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.dense = nn.Linear(20, 2)
+
+            def forward(self, X):
+                y = F.softmax(self.dense(X), dim=-1)
+                return {'proba': y, 'attention': X[:, None] * X[..., None]}
+
+        net = net_cls(DictOutput, predict_batch_size=128).initialize()
+        X = data[0]
+        y_infer = net.forward(X)
+        assert set(y_infer) == {'proba', 'attention'}
+        assert y_infer['attention'].shape == (len(X), 20, 20)
+
+        y_proba = net.forward(X, outputs='proba')
+        assert torch.allclose(y_proba, y_infer['proba'])
+
     def test_setting_callback_possible(self, net_cls, module_cls):
         from skorch.callbacks import EpochTimer, PrintLog
 
@@ -1193,6 +1645,59 @@ class TestNeuralNet:
         net.set_params(callbacks__print_log=EpochTimer())
         assert isinstance(dict(net.callbacks_)['print_log'], EpochTimer)
 
+    def test_callbacks_dispatch_skips_methods_not_overridden(
+            self, net_cls, module_cls):
+        from skorch.callbacks import Callback
+
+        class OnEpochEnd(Callback):
+            # pylint: disable=arguments-differ
+            def on_epoch_end(self, net, **kwargs):
+                pass
+
+        cb = OnEpochEnd()
+        net = net_cls(module_cls, callbacks=[('mycb', cb)]).initialize()
+
+        # pylint: disable=protected-access
+        dispatch = net._callbacks_dispatch
+        assert cb.on_epoch_end in dispatch['on_epoch_end']
+        for method_name in ['on_train_begin', 'on_epoch_begin',
+                            'on_batch_begin', 'on_batch_end',
+                            'on_grad_computed']:
+            assert not any(method.__self__ is cb
+                           for method in dispatch[method_name])
+
+    def test_callbacks_dispatch_rebuilt_after_set_params(
+            self, net_cls, module_cls, data):
+        from skorch.callbacks import Callback
+
+        class CountBatches(Callback):
+            def initialize(self):
+                self.batches_ = 0
+                return self
+
+            # pylint: disable=arguments-differ
+            def on_batch_end(self, net, **kwargs):
+                self.batches_ += 1
+
+        X, y = data[0][:30], data[1][:30]
+        net = net_cls(
+            module_cls, max_epochs=1, batch_size=10,
+            callbacks=[('mycb', Callback())],
+        ).initialize()
+        cb = CountBatches().initialize()
+        net.set_params(callbacks__mycb=cb)
+        net.partial_fit(X, y)
+
+        # 3 training and 1 validation batch
+        assert cb.batches_ == 4
+
+    def test_callbacks_dispatch_not_a_param(self, net_cls, module_cls):
+        net = net_cls(module_cls).initialize()
+        params = net.get_params()
+        assert not any(key.startswith('_') for key in params)
+        # does not raise
+        clone(net)
+
     def test_setting_callback_to_none_possible(self, net_cls, module_cls, data):
         from skorch.callbacks import Callback
 
@@ -1373,6 +1878,42 @@ class TestNeuralNet:
         net = net_cls(module_cls, max_epochs=1, callbacks=[mock_cb])
         net.fit(*data)
 
+    def test_named_parameters_not_collected_without_grad_hook(
+            self, net_cls, module_cls, data):
+        X, y = data[0][:30], data[1][:30]
+        net = net_cls(module_cls, max_epochs=1).initialize()
+        net.module_.named_parameters = Mock(
+            side_effect=net.module_.named_parameters)
+        net.partial_fit(X, y)
+
+        assert net.module_.named_parameters.call_count == 0
+
+    def test_named_parameters_passed_to_grad_hook(
+            self, net_cls, module_cls, data):
+        from skorch.callbacks import Callback
+
+        class CollectParams(Callback):
+            def initialize(self):
+                self.names_ = []
+                return self
+
+            # pylint: disable=arguments-differ
+            def on_grad_computed(self, net, named_parameters, **kwargs):
+                # iterating more than once is possible
+                assert list(named_parameters) == list(named_parameters)
+                self.names_.append([name for name, _ in named_parameters])
+
+        X, y = data[0][:30], data[1][:30]
+        cb = CollectParams()
+        net = net_cls(
+            module_cls, max_epochs=1, batch_size=30, train_split=None,
+            callbacks=[cb],
+        )
+        net.fit(X, y)
+
+        expected = [name for name, _ in net.module_.named_parameters()]
+        assert cb.names_ == [expected]
+
     @pytest.mark.parametrize('training', [True, False])
     def test_no_grad_during_evaluation_unless_training(
             self, net_cls, module_cls, data, training):
@@ -0,0 +1,406 @@
+"""Tests for serving.py"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import io
+
+import numpy as np
+import pytest
+import torch
+
+from skorch.tests.conftest import pandas_installed
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+class TestMicroBatcher:
+    @pytest.fixture(scope='module')
+    def net(self, classifier_module):
+        from skorch import NeuralNetClassifier
+        return NeuralNetClassifier(classifier_module).initialize()
+
+    @pytest.fixture(scope='module')
+    def X(self, classifier_data):
+        return classifier_data[0][:32]
+
+    @pytest.fixture
+    def batcher_cls(self):
+        from skorch.serving import MicroBatcher
+        return MicroBatcher
+
+    def test_concurrent_requests_are_batched(self, net, X, batcher_cls):
+        batcher = batcher_cls(net, max_batch_size=8, max_wait=1)
+
+        async def predict_all():
+            async with batcher:
+                return await asyncio.gather(*(batcher.predict(x) for x in X))
+
+        y_probas = run(predict_all())
+        assert np.allclose(np.stack(y_probas), net.predict_proba(X))
+        assert batcher.n_requests_ == 32
+        assert batcher.n_batches_ == 4
+
+    def test_predict_class_labels(self, net, X, batcher_cls):
+        batcher = batcher_cls(net, method='predict')
+
+        async def predict_all():
+            async with batcher:
+                return await asyncio.gather(*(batcher.predict(x) for x in X))
+
+        y_preds = run(predict_all())
+        assert (np.array(y_preds) == net.predict(X)).all()
+
+    def test_single_request_waits_at_most_max_wait(
+            self, net, X, batcher_cls):
+        batcher = batcher_cls(net, max_batch_size=8, max_wait=0.05)
+
+        async def predict_one():
+            async with batcher:
+                tic = time.time()
+                y_proba = await batcher.predict(X[0])
+                return y_proba, time.time() - tic
+
+        y_proba, duration = run(predict_one())
+        assert np.allclose(y_proba, net.predict_proba(X[:1])[0])
+        assert 0.05 <= duration < 1
+
+    def test_stacks_dicts_and_tensors(self, batcher_cls):
+        from skorch import NeuralNet
+
+        class TwoInputs(torch.nn.Module):
+            def __init__(self):
+                super().__init__()
+                self.scale = torch.nn.Parameter(torch.ones(1))
+
+            def forward(self, X0, X1):
+                return self.scale * (X0 + X1)
+
+        net = NeuralNet(TwoInputs, criterion=torch.nn.MSELoss).initialize()
+        batcher = batcher_cls(net)
+        samples = [{'X0': torch.ones(3) * i, 'X1': torch.ones(3)}
+                   for i in range(5)]
+
+        async def predict_all():
+            async with batcher:
+                return await asyncio.gather(
+                    *(batcher.predict(x) for x in samples))
+
+        y_preds = run(predict_all())
+        assert np.allclose(np.stack(y_preds), np.arange(1, 6)[:, None])
+
+    def test_errors_are_passed_to_all_callers(self, net, X, batcher_cls):
+        batcher = batcher_cls(net)
+
+        async def predict_all():
+            async with batcher:
+                # wrong number of features
+                return await asyncio.gather(
+                    *(batcher.predict(x[:5]) for x in X[:3]),
+                    return_exceptions=True)
+
+        results = run(predict_all())
+        assert len(results) == 3
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_stop_predicts_pending_requests(self, net, X, batcher_cls):
+        batcher = batcher_cls(net, max_wait=10)
+
+        async def predict_and_stop():
+            tasks = [asyncio.ensure_future(batcher.predict(x)) for x in X]
+            await asyncio.sleep(0)
+            await batcher.stop()
+            with pytest.raises(RuntimeError) as exc:
+                await batcher.predict(X[0])
+            assert str(exc.value) == "The MicroBatcher was stopped."
+            return await asyncio.gather(*tasks)
+
+        y_probas = run(predict_and_stop())
+        assert np.allclose(np.stack(y_probas), net.predict_proba(X))
+
+    @pytest.mark.parametrize('kwargs, msg', [
+        ({'method': 'forward'}, "method should be 'predict_proba' or"),
+        ({'max_batch_size': 0}, "max_batch_size should be a positive int"),
+    ])
+    def test_invalid_arguments_raise(self, net, batcher_cls, kwargs, msg):
+        with pytest.raises(ValueError) as exc:
+            batcher_cls(net, **kwargs)
+        assert str(exc.value).startswith(msg)
+
+
+class TestInProcessClient:
+    @pytest.fixture(scope='module')
+    def net(self, classifier_module):
+        from skorch import NeuralNetClassifier
+        return NeuralNetClassifier(classifier_module).initialize()
+
+    def test_predict_from_threads(self, net, classifier_data):
+        from skorch.serving import InProcessClient
+        from skorch.serving import MicroBatcher
+
+        X = classifier_data[0][:100]
+        batcher = MicroBatcher(net, max_batch_size=16, max_wait=0.01)
+        with InProcessClient(batcher) as client:
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                y_probas = list(executor.map(client.predict, X))
+
+        assert np.allclose(np.stack(y_probas), net.predict_proba(X))
+        assert batcher.n_requests_ == 100
+        assert batcher.n_batches_ < 100
+
+
+class TestPredictParallel:
+    @pytest.fixture(scope='module')
+    def net(self, classifier_module):
+        from skorch import NeuralNetClassifier
+        return NeuralNetClassifier(
+            classifier_module, predict_batch_size=64).initialize()
+
+    @pytest.fixture
+    def predict_parallel(self):
+        from skorch.serving import predict_parallel
+        return predict_parallel
+
+    @pytest.mark.parametrize('n_jobs, chunk_size', [
+        (1, None), (4, None), (3, 7), (8, 10000),
+    ])
+    def test_same_as_predict_proba(
+            self, net, classifier_data, predict_parallel, n_jobs, chunk_size):
+        X = classifier_data[0]
+        y_proba = predict_parallel(
+            net, X, n_jobs=n_jobs, chunk_size=chunk_size)
+        assert np.allclose(y_proba, net.predict_proba(X))
+
+    def test_predict_class_labels(self, net, classifier_data, predict_parallel):
+        X = classifier_data[0]
+        y_pred = predict_parallel(net, X, n_jobs=4, method='predict')
+        assert (y_pred == net.predict(X)).all()
+
+    def test_dataset_and_dict(self, net, classifier_data, predict_parallel):
+        from skorch.dataset import Dataset
+
+        X = classifier_data[0]
+        y_proba = net.predict_proba(X)
+        assert np.allclose(
+            predict_parallel(net, Dataset(X), n_jobs=3), y_proba)
+        assert np.allclose(
+            predict_parallel(net, {'X': X}, n_jobs=3), y_proba)
+
+    def test_num_threads_restored(
+            self, net, classifier_data, predict_parallel, monkeypatch):
+        num_threads = []
+        original = torch.set_num_threads
+        monkeypatch.setattr(
+            torch, 'set_num_threads',
+            lambda n: num_threads.append(n) or original(n))
+        before = torch.get_num_threads()
+
+        predict_parallel(net, classifier_data[0], n_jobs=2, num_threads=1)
+        assert num_threads == [1, before]
+        assert torch.get_num_threads() == before
+
+    def test_concurrent_calls_on_shared_net(self, net, classifier_data):
+        X = classifier_data[0][:200]
+        expected = net.predict_proba(X)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(
+                lambda i: net.predict_proba(X[i:]), range(16)))
+        assert all(np.allclose(y, expected[i:]) for i, y in enumerate(results))
+
+    def test_errors_propagate(self, net, classifier_data, predict_parallel):
+        X = classifier_data[0][:, :5]  # wrong number of features
+        with pytest.raises(RuntimeError):
+            predict_parallel(net, X, n_jobs=2)
+
+    @pytest.mark.parametrize('kwargs, msg', [
+        ({'method': 'forward'}, "method should be 'predict_proba' or"),
+        ({'chunk_size': 0}, "chunk_size should be a positive int"),
+    ])
+    def test_invalid_arguments_raise(
+            self, net, classifier_data, predict_parallel, kwargs, msg):
+        with pytest.raises(ValueError) as exc:
+            predict_parallel(net, classifier_data[0], **kwargs)
+        assert str(exc.value).startswith(msg)
+
+
+class TestPredictMultiprocess:
+    @pytest.fixture(scope='module')
+    def net(self, classifier_module):
+        from skorch import NeuralNetClassifier
+        return NeuralNetClassifier(classifier_module).initialize()
+
+    @pytest.fixture
+    def predict_multiprocess(self):
+        from skorch.serving import predict_multiprocess
+        return predict_multiprocess
+
+    @pytest.mark.parametrize('n_jobs', [1, 3])
+    def test_same_as_predict_proba(
+            self, net, classifier_data, predict_multiprocess, n_jobs):
+        X = classifier_data[0]
+        y_proba = predict_multiprocess(net, X, n_jobs=n_jobs)
+        assert np.allclose(y_proba, net.predict_proba(X))
+
+    def test_predict_class_labels(
+            self, net, classifier_data, predict_multiprocess):
+        X = classifier_data[0]
+        y_pred = predict_multiprocess(net, X, n_jobs=2, method='predict')
+        assert y_pred.dtype == net.predict(X).dtype
+        assert (y_pred == net.predict(X)).all()
+
+    def test_parameters_in_shared_memory(
+            self, net, classifier_data, predict_multiprocess):
+        predict_multiprocess(net, classifier_data[0][:10], n_jobs=2)
+        assert all(p.is_shared() for p in net.module_.parameters())
+
+    def test_more_jobs_than_samples(
+            self, net, classifier_data, predict_multiprocess):
+        X = classifier_data[0][:3]
+        y_proba = predict_multiprocess(net, X, n_jobs=8)
+        assert np.allclose(y_proba, net.predict_proba(X))
+
+    def test_errors_propagate(
+            self, net, classifier_data, predict_multiprocess):
+        from skorch.dataset import Dataset
+
+        class FailingDataset(Dataset):
+            def __getitem__(self, i):
+                if i == 50:
+                    raise IndexError("bad sample")
+                return super().__getitem__(i)
+
+        X = FailingDataset(classifier_data[0][:100])
+        with pytest.raises(IndexError) as exc:
+            predict_multiprocess(net, X, n_jobs=2)
+        assert str(exc.value) == "bad sample"
+
+
+class TestPredictionCache:
+    @pytest.fixture
+    def net(self, classifier_module):
+        from skorch import NeuralNetClassifier
+
+        class MyNet(NeuralNetClassifier):
+            """Records the number of samples passed to forward_iter"""
+            def forward_iter(self, X, *args, **kwargs):
+                self.n_forwarded.append(len(X))
+                return super().forward_iter(X, *args, **kwargs)
+
+        net = MyNet(classifier_module, max_epochs=1).initialize()
+        net.n_forwarded = []
+        return net
+
+    @pytest.fixture
+    def cache_cls(self):
+        from skorch.serving import PredictionCache
+        return PredictionCache
+
+    @pytest.fixture(scope='module')
+    def X(self, classifier_data):
+        return classifier_data[0][:100]
+
+    def test_same_predictions_as_net(self, net, X, cache_cls):
+        cache = cache_cls(net)
+        assert np.allclose(cache.predict_proba(X), net.predict_proba(X))
+        assert np.allclose(cache.predict_proba(X), net.predict_proba(X))
+        assert (cache.predict(X) == net.predict(X)).all()
+
+    def test_only_misses_are_predicted(self, net, X, cache_cls):
+        cache = cache_cls(net)
+        cache.predict_proba(X[:60])
+        # duplicates are predicted once
+        y_proba = cache.predict_proba(np.concatenate([X[40:], X[80:]]))
+
+        assert net.n_forwarded == [60, 40]
+        assert np.allclose(
+            y_proba, net.predict_proba(np.concatenate([X[40:], X[80:]])))
+        assert cache.n_misses_ == 100
+        assert cache.n_hits_ == 40
+        assert np.isclose(cache.hit_rate_, 40 / 140)
+        assert len(cache) == 100
+
+    def test_least_recently_used_are_evicted(self, net, X, cache_cls):
+        cache = cache_cls(net, max_size=3)
+        cache.predict_proba(X[:3])
+        cache.predict_proba(X[:1])
+        cache.predict_proba(X[3:5])
+        assert cache.n_evictions_ == 2
+        assert len(cache) == 3
+
+        net.n_forwarded.clear()
+        cache.predict_proba(X[[0, 3, 4]])
+        assert net.n_forwarded == []
+        cache.predict_proba(X[1:2])
+        assert net.n_forwarded == [1]
+
+    @pytest.mark.parametrize('change', [
+        lambda net, X: net.partial_fit(X, np.zeros(len(X), dtype=int)),
+        lambda net, X: net.set_params(module__num_units=20),
+        lambda net, X: net.initialize(),
+    ])
+    def test_invalidated_when_module_changes(self, net, X, cache_cls, change):
+        cache = cache_cls(net)
+        cache.predict_proba(X)
+        change(net, X)
+
+        net.n_forwarded.clear()
+        y_proba = cache.predict_proba(X)
+        assert net.n_forwarded == [len(X)]
+        assert np.allclose(y_proba, net.predict_proba(X))
+        assert cache.n_invalidations_ == 1
+
+    def test_invalidated_by_load_params(
+            self, net, X, cache_cls, classifier_module):
+        cache = cache_cls(net)
+        cache.predict_proba(X)
+
+        f = io.BytesIO()
+        type(net)(classifier_module).initialize().save_params(f)
+        f.seek(0)
+        net.load_params(f)
+
+        assert np.allclose(cache.predict_proba(X), net.predict_proba(X))
+        assert cache.n_invalidations_ == 1
+
+    def test_dict_and_tensor_inputs(self, net, X, cache_cls):
+        cache = cache_cls(net)
+        y_proba = net.predict_proba(X)
+        assert np.allclose(cache.predict_proba(torch.as_tensor(X)), y_proba)
+        # the same bytes in a different container are a different key
+        assert np.allclose(cache.predict_proba({'X': X}), y_proba)
+        assert cache.n_hits_ == 0
+
+    def test_row_hashes_distinguish_rows(self, X):
+        from skorch.serving import _hash_rows
+
+        hashes = _hash_rows(X)
+        assert len(set(hashes)) == len(X)
+        assert _hash_rows(X[5:10]) == hashes[5:10]
+        # dtype and shape are part of the hash
+        assert _hash_rows(X.view(np.int32)) != hashes
+        assert _hash_rows(X.reshape(len(X), 4, 5)) != hashes
+
+    @pytest.mark.skipif(not pandas_installed, reason='pandas not installed')
+    def test_dataframe_rows(self):
+        import pandas as pd
+        from skorch.serving import _hash_rows
+
+        df = pd.DataFrame({'a': [1, 2, 1], 'b': ['x', 'y', 'x']})
+        hashes = _hash_rows(df)
+        assert hashes[0] == hashes[2] != hashes[1]
+
+    def test_object_arrays_raise(self, cache_cls, net):
+        with pytest.raises(TypeError):
+            cache_cls(net).predict_proba(np.array([['a'], ['b']], dtype=object))
+
+    def test_invalid_max_size_raises(self, net, cache_cls):
+        with pytest.raises(ValueError) as exc:
+            cache_cls(net, max_size=0)
+        assert str(exc.value).startswith("max_size should be a positive int")
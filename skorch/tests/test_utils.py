@@ -29,6 +29,65 @@ class TestToTensor:
         assert t.device.type == 'cpu'
 
 
+class TestSelectOutputs:
+    @pytest.fixture
+    def select_outputs(self):
+        from skorch.utils import select_outputs
+        return select_outputs
+
+    @pytest.fixture
+    def y(self):
+        return torch.arange(6).view(3, 2), torch.zeros(3), torch.ones(3, 4)
+
+    def test_all_outputs_by_default(self, select_outputs, y):
+        assert select_outputs(y) is y
+
+    def test_select_by_index(self, select_outputs, y):
+        assert select_outputs(y, 2) is y[2]
+        assert select_outputs(y, -1) is y[2]
+        selected = select_outputs(y, [2, 0])
+        assert isinstance(selected, tuple)
+        assert selected[0] is y[2]
+        assert selected[1] is y[0]
+
+    def test_single_tensor_is_output_0(self, select_outputs, y):
+        assert select_outputs(y[0], 0) is y[0]
+        with pytest.raises(IndexError):
+            select_outputs(y[0], 1)
+
+    def test_select_by_name(self, select_outputs, y):
+        from collections import namedtuple
+
+        Output = namedtuple('Output', 'proba, hidden, attention')
+        assert select_outputs(Output(*y), 'attention') is y[2]
+        d = {'proba': y[0], 'attention': y[2]}
+        assert select_outputs(d, ['attention']) == (y[2],)
+        with pytest.raises(TypeError):
+            select_outputs(y, 'attention')
+
+    def test_reducers(self, select_outputs, y):
+        argmax = lambda y: y.argmax(-1)
+        assert (select_outputs(y, 0, argmax) == torch.ones(3)).all()
+
+        y0, y2 = select_outputs(y, [0, 2], [argmax, None])
+        assert (y0 == torch.ones(3)).all()
+        assert y2 is y[2]
+
+        reduced = select_outputs(y, reducer=lambda y: y[:1])
+        assert [len(yi) for yi in reduced] == [1, 1, 1]
+
+        with pytest.raises(ValueError):
+            select_outputs(y, [0, 2], [argmax])
+
+    def test_to_device_keeps_structure(self, y):
+        from collections import namedtuple
+        from skorch.utils import to_device
+
+        Output = namedtuple('Output', 'proba, hidden, attention')
+        assert isinstance(to_device(Output(*y), 'cpu'), Output)
+        assert set(to_device({'a': y[0]}, 'cpu')) == {'a'}
+
+
 class TestDuplicateItems:
     @pytest.fixture
     def duplicate_items(self):
@@ -417,3 +476,31 @@ class TestIsSkorchDataset:
         type_truth_table())
     def test_data_types(self, is_skorch_dataset, input_data, expected):
         assert is_skorch_dataset(input_data) == expected
+
+
+class TestTeeGenerator:
+    @pytest.fixture
+    def tee_generator_cls(self):
+        from skorch.utils import TeeGenerator
+        return TeeGenerator
+
+    def test_iterate_twice(self, tee_generator_cls):
+        gen = (i for i in range(3))
+        tee = tee_generator_cls(gen)
+
+        assert list(tee) == [0, 1, 2]
+        assert list(tee) == [0, 1, 2]
+
+    def test_lazy(self, tee_generator_cls):
+        side_effects = []
+
+        def gen():
+            for i in range(3):
+                side_effects.append(i)
+                yield i
+
+        tee = tee_generator_cls(gen())
+        assert side_effects == []
+
+        next(iter(tee))
+        assert side_effects == [0]
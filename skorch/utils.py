@@ -8,6 +8,7 @@ from collections.abc import Sequence
 from contextlib import contextmanager
 from enum import Enum
 from functools import partial
+from itertools import tee
 import pathlib
 
 import numpy as np
@@ -101,6 +102,91 @@ def to_numpy(X):
     return X.numpy()
 
 
+def to_device(X, device):
+    """Move the output of a module to ``device``.
+
+    Handles torch tensors and tuples (including namedtuples) and
+    dicts of them.
+
+    """
+    if isinstance(X, dict):
+        return {key: to_device(val, device) for key, val in X.items()}
+    if hasattr(X, '_fields'):
+        return type(X)(*(to_device(x, device) for x in X))
+    if isinstance(X, tuple):
+        return tuple(to_device(x, device) for x in X)
+    return X.to(device)
+
+
+def _get_output(y, key):
+    if isinstance(y, dict):
+        return y[key]
+    if isinstance(key, str):
+        if not hasattr(y, '_fields'):
+            raise TypeError(
+                "Outputs can only be selected by name if the module returns "
+                "a dict or a namedtuple, got {} instead."
+                .format(type(y).__name__))
+        return getattr(y, key)
+    if isinstance(y, tuple):
+        return y[key]
+    if key not in (0, -1):
+        raise IndexError(
+            "The module returns a single output, cannot select output {}."
+            .format(key))
+    return y
+
+
+def select_outputs(y, outputs=None, reducer=None):
+    """Select and reduce some of the outputs of a module.
+
+    Parameters
+    ----------
+    y : torch tensor, or a tuple, namedtuple or dict of torch tensors
+      The output of the module. A single tensor is treated as a single
+      output with index 0.
+
+    outputs : int, str, list/tuple of int or str, or None (default=None)
+      The outputs to keep, by index, or by name if the module returns
+      a dict or a namedtuple. For a single int or str, the selected
+      output itself is returned, for a list or tuple, a tuple of the
+      selected outputs. If None, all outputs are kept.
+
+    reducer : callable, list/tuple of callables, or None (default=None)
+      Applied to each kept output, e.g. ``lambda y: y.argmax(-1)``.
+      A list or tuple gives one reducer (or None) per output in
+      ``outputs``.
+
+    """
+    if outputs is None:
+        if reducer is None:
+            return y
+        if isinstance(y, dict):
+            return {key: reducer(val) for key, val in y.items()}
+        if hasattr(y, '_fields'):
+            return type(y)(*map(reducer, y))
+        if isinstance(y, tuple):
+            return tuple(map(reducer, y))
+        return reducer(y)
+
+    single = isinstance(outputs, (int, np.integer, str))
+    keys = [outputs] if single else list(outputs)
+    if isinstance(reducer, (list, tuple)):
+        if len(reducer) != len(keys):
+            raise ValueError(
+                "There should be one reducer per output, got {} reducers "
+                "for {} outputs.".format(len(reducer), len(keys)))
+        reducers = reducer
+    else:
+        reducers = [reducer] * len(keys)
+
+    selected = []
+    for key, reduce in zip(keys, reducers):
+        output = _get_output(y, key)
+        selected.append(output if reduce is None else reduce(output))
+    return selected[0] if single else tuple(selected)
+
+
 def get_dim(y):
     """Return the number of dimensions of a torch tensor or numpy
     array-like object.
@@ -289,3 +375,20 @@ def open_file_like(f, mode):
     finally:
         if new_fd:
             f.close()
+
+
+class TeeGenerator:
+    """Stores a generator and calls ``tee`` on it to create new generators
+    when ``TeeGenerator`` is iterated over to let you iterate over the given
+    generator more than once.
+
+    This allows to pass e.g. ``module.named_parameters()`` lazily,
+    without materializing a list of all parameters up front.
+
+    """
+    def __init__(self, gen):
+        self.gen = gen
+
+    def __iter__(self):
+        self.gen, it = tee(self.gen)
+        yield from it